@@ -0,0 +1,147 @@
+# Tasks/scheduler.py
+import json
+import random
+import time
+
+import config
+from database.backup import BACKUP_ENABLED, run_backup
+from database.models import db
+from database.catalog_sync import sync_catalog
+from database.ranking import ranking
+from utils.collage import COLLAGE_ENABLED, build_atlas
+from utils.image_cache import warmup_popular_cards
+from utils.metrics import metrics
+from utils.quota import quota
+
+# Intervalos em segundos (ajustáveis no config.py)
+FLUSH_INTERVAL = getattr(config, "SCHEDULE_FLUSH_SECONDS", 30)
+MAINTENANCE_INTERVAL = getattr(config, "SCHEDULE_DB_MAINTENANCE_SECONDS", 10 * 60)
+RESCAN_INTERVAL = getattr(config, "SCHEDULE_RESCAN_SECONDS", 15 * 60)
+WARMUP_INTERVAL = getattr(config, "SCHEDULE_WARMUP_SECONDS", 30 * 60)
+STATS_INTERVAL = getattr(config, "SCHEDULE_STATS_SECONDS", 15 * 60)
+RANKING_INTERVAL = getattr(config, "SCHEDULE_RANKING_SECONDS", 60 * 60)
+BACKUP_INTERVAL = getattr(config, "SCHEDULE_BACKUP_SECONDS", 6 * 60 * 60)
+
+
+class ScheduledTask:
+    """
+    Tarefa periódica do job queue com jitter, proteção contra sobreposição
+    (se a execução anterior ainda não terminou, esta é pulada) e métricas de tempo.
+    """
+
+    def __init__(self, name: str, func, interval: float, jitter: float = None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        # Jitter padrão de 10% do intervalo, para as tarefas não baterem juntas
+        self.jitter = interval * 0.1 if jitter is None else jitter
+        self.running = False
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+
+    async def __call__(self, context=None):
+        if self.running:
+            self.skipped += 1
+            return
+        self.running = True
+        started = time.perf_counter()
+        try:
+            await self.func()
+        except Exception as e:
+            self.failures += 1
+            print(f"❌ Tarefa '{self.name}' falhou: {e}")
+        finally:
+            elapsed = time.perf_counter() - started
+            self.running = False
+            self.runs += 1
+            self.total_seconds += elapsed
+            self.last_seconds = elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "avg_ms": round(self.total_seconds / self.runs * 1000, 1) if self.runs else 0,
+            "max_ms": round(self.max_seconds * 1000, 1),
+            "last_ms": round(self.last_seconds * 1000, 1),
+        }
+
+
+# ---------- tarefas ---------- #
+async def _flush_counters():
+    await quota.flush()
+
+
+async def _db_maintenance():
+    result = await db.maintenance()
+    print(f"🧹 WAL checkpoint {result} + PRAGMA optimize")
+
+
+async def _rescan_assets():
+    report = await sync_catalog()
+    if report.changed:
+        print(f"🔄 Catálogo atualizado: {report}")
+        # Cartas removidas baixam pontuações, o que o ranking em memória não acompanha
+        await ranking.load()
+        if COLLAGE_ENABLED:
+            await build_atlas()
+
+
+async def _rebuild_ranking():
+    await ranking.load()
+
+
+async def _backup():
+    await run_backup()
+
+
+async def _warmup_cache():
+    await warmup_popular_cards()
+
+
+async def _stats_snapshot():
+    # Import tardio: handlers.admin importa jobs_stats deste módulo
+    from handlers.admin import runtime_stats
+
+    snapshot = {**runtime_stats(), "metrics": metrics.snapshot()}
+    print(f"📊 {json.dumps(snapshot, ensure_ascii=False)}")
+
+
+TASKS = [
+    ScheduledTask("flush_counters", _flush_counters, FLUSH_INTERVAL, jitter=2),
+    ScheduledTask("db_maintenance", _db_maintenance, MAINTENANCE_INTERVAL),
+    ScheduledTask("rescan_assets", _rescan_assets, RESCAN_INTERVAL),
+    ScheduledTask("warmup_cache", _warmup_cache, WARMUP_INTERVAL),
+    ScheduledTask("rebuild_ranking", _rebuild_ranking, RANKING_INTERVAL),
+    ScheduledTask("stats_snapshot", _stats_snapshot, STATS_INTERVAL),
+]
+if BACKUP_ENABLED:
+    TASKS.append(ScheduledTask("backup", _backup, BACKUP_INTERVAL))
+
+
+def jobs_stats() -> dict:
+    return {task.name: task.stats() for task in TASKS}
+
+
+def register_jobs(app):
+    """Agenda as tarefas de manutenção no job queue da aplicação."""
+    if app.job_queue is None:
+        print('⚠️ JobQueue indisponível: instale "python-telegram-bot[job-queue]". Tarefas não agendadas.')
+        return
+
+    for task in TASKS:
+        app.job_queue.run_repeating(
+            task,
+            interval=task.interval,
+            # primeira execução espalhada dentro do primeiro intervalo
+            first=random.uniform(task.interval / 2, task.interval),
+            name=task.name,
+            job_kwargs={"jitter": task.jitter, "max_instances": 1, "coalesce": True},
+        )
+    print(f"⏰ {len(TASKS)} tarefas agendadas")
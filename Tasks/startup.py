@@ -0,0 +1,121 @@
+# Tasks/startup.py
+"""
+Boot preguiçoso: o bot começa a atender com o catálogo que já está no banco e
+a sincronização com a pasta de assets e o aquecimento do cache de imagens
+rodam depois, em segundo plano.
+
+STARTUP_MODE = "lazy" (padrão) ou "blocking" no config.py. No primeiro boot,
+com o banco ainda vazio, a sincronização é feita antes de atender mesmo no
+modo lazy, porque sem catálogo não há o que sortear.
+"""
+import asyncio
+import time
+
+import config
+from database.catalog import catalog
+from database.queries import load_series_and_cards
+from database.ranking import ranking
+from utils.collage import COLLAGE_ENABLED, build_atlas
+from utils.image_cache import warmup_popular_cards
+from utils.metrics import metrics
+
+STARTUP_MODE = getattr(config, "STARTUP_MODE", "lazy")
+# Intervalo mínimo entre duas linhas de progresso da mesma etapa, em segundos
+PROGRESS_LOG_INTERVAL = 2.0
+
+_tasks: set[asyncio.Task] = set()
+_status: dict[str, str] = {}  # etapa -> "pendente" / "rodando" / "ok" / "cancelada" / "falhou"
+
+
+def _progress_logger(label: str):
+    """Callback de progresso que loga no máximo a cada PROGRESS_LOG_INTERVAL (e sempre no fim)."""
+    last = [0.0]
+
+    def log(*args):
+        *stage, done, total = args
+        now = time.monotonic()
+        if done < total and now - last[0] < PROGRESS_LOG_INTERVAL:
+            return
+        last[0] = now
+        etapa = f" ({stage[0]})" if stage else ""
+        print(f"⏳ {label}{etapa}: {done}/{total}")
+
+    return log
+
+
+async def _run(name: str, start):
+    """Executa `start()` registrando o estado da etapa e o marco de boot quando termina."""
+    _status[name] = "rodando"
+    try:
+        await start()
+    except asyncio.CancelledError:
+        _status[name] = "cancelada"
+        print(f"⚠️ {name} cancelada")
+        raise
+    except Exception as e:
+        _status[name] = "falhou"
+        print(f"❌ {name} falhou: {e}")
+    else:
+        _status[name] = "ok"
+        metrics.mark_boot(name)
+
+
+def _sync():
+    return load_series_and_cards(progress=_progress_logger("Sincronizando catálogo"))
+
+
+def _warmup():
+    return warmup_popular_cards(progress=_progress_logger("Aquecendo cache de imagens"))
+
+
+async def _background_boot(sync: bool = True):
+    # Primeiro o catálogo (pode trazer ou tirar cartas), depois o que deriva dele
+    if sync:
+        await _run("catalog_sync", _sync)
+    await _run("ranking", ranking.load)
+    await _run("image_warmup", _warmup)
+    if COLLAGE_ENABLED:
+        await _run("thumbnails", build_atlas)
+
+
+async def boot_catalog():
+    """
+    Deixa o catálogo pronto para atender. No modo lazy carrega o índice do
+    banco e agenda sync, ranking, warmup e atlas em segundo plano; no blocking faz tudo antes.
+    """
+    if STARTUP_MODE == "blocking":
+        await load_series_and_cards()
+        await ranking.load()
+        await warmup_popular_cards()
+        if COLLAGE_ENABLED:
+            await build_atlas()
+        return
+
+    await catalog.load()
+    _status.update(catalog_sync="pendente", ranking="pendente", image_warmup="pendente")
+    if COLLAGE_ENABLED:
+        _status["thumbnails"] = "pendente"
+    if not catalog.series_by_id:
+        print("📂 Catálogo vazio no banco: sincronizando antes de atender")
+        await _run("catalog_sync", _sync)
+        task = asyncio.create_task(_background_boot(sync=False), name="background_boot")
+    else:
+        print(f"📂 Catálogo do último boot: {len(catalog.series_by_id)} séries; sincronizando em segundo plano")
+        task = asyncio.create_task(_background_boot(), name="background_boot")
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def cancel_background():
+    """Cancela o que ainda estiver rodando (chamado no shutdown, antes de fechar o banco)."""
+    tasks = list(_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for name, status in _status.items():
+        if status in ("pendente", "rodando"):
+            _status[name] = "cancelada"
+
+
+def startup_stats() -> dict:
+    return {"mode": STARTUP_MODE, "background": dict(_status), "boot_seconds": dict(metrics.boot)}
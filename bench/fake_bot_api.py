@@ -0,0 +1,197 @@
+# bench/fake_bot_api.py
+"""
+Servidor HTTP local que imita a Bot API do Telegram para benchmarks.
+
+Responde aos métodos que o bot usa com objetos válidos, gera file_ids para
+uploads e registra cada chamada (método, bytes enviados, teclado anexado).
+Aponte o bot para ele com BOT_API_URL = "http://127.0.0.1:<porta>/bot".
+"""
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter, defaultdict
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import parse_qsl
+
+BOT_USER = {"id": 999999, "is_bot": True, "first_name": "HomuBench", "username": "homubench_bot"}
+
+
+def _parse_body(content_type: str, body: bytes):
+    """Retorna (campos, arquivos_enviados) de um corpo urlencoded ou multipart."""
+    if content_type.startswith("multipart/form-data"):
+        msg = BytesParser(policy=HTTP).parsebytes(
+            b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body
+        )
+        fields, files = {}, {}
+        for part in msg.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            payload = part.get_payload(decode=True) or b""
+            if part.get_filename():
+                files[name] = len(payload)
+            else:
+                fields[name] = payload.decode()
+        return fields, files
+    if content_type.startswith("application/json"):
+        return {k: v if isinstance(v, str) else json.dumps(v) for k, v in json.loads(body or b"{}").items()}, {}
+    return dict(parse_qsl(body.decode())), {}
+
+
+class FakeBotAPI:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency  # atraso artificial por chamada, para simular a rede
+        self._server = None
+        self._message_ids = defaultdict(lambda: itertools.count(1))
+        self._file_ids = itertools.count(1)
+        self.calls = Counter()
+        self.bytes_uploaded = 0
+        self.uploads = 0
+        self.file_id_reuses = 0
+        # chat_id -> (mensagem, teclado inline) mais recente, para o usuário simulado "clicar"
+        self.keyboards: dict[int, tuple[dict, list]] = {}
+        self.listeners = []
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/bot"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def summary(self) -> dict:
+        return {
+            "calls": dict(self.calls),
+            "uploads": self.uploads,
+            "file_id_reuses": self.file_id_reuses,
+            "bytes_uploaded": self.bytes_uploaded,
+        }
+
+    # ---------- HTTP ---------- #
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                _, path, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode().partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                method = path.rstrip("/").rsplit("/", 1)[-1]
+                fields, files = _parse_body(headers.get("content-type", ""), body)
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                result = self._dispatch(method, fields, files, len(body))
+
+                payload = json.dumps({"ok": True, "result": result}).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(payload)).encode() + b"\r\n\r\n" + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # ---------- Bot API ---------- #
+    def _message(self, chat_id: int, message_id: int = None, **extra) -> dict:
+        return {
+            "message_id": message_id or next(self._message_ids[chat_id]),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            **extra,
+        }
+
+    def _media(self, fields, files, field: str, body_size: int):
+        """Devolve o file_id do envio: novo se houve upload, o mesmo se veio um file_id."""
+        if field in files or fields.get(field, "").startswith("attach://"):
+            self.uploads += 1
+            self.bytes_uploaded += body_size
+            return f"fake-{field}-{next(self._file_ids)}"
+        self.file_id_reuses += 1
+        return fields[field]
+
+    def _remember_keyboard(self, chat_id: int, fields, message: dict):
+        markup = fields.get("reply_markup")
+        if markup:
+            self.keyboards[chat_id] = (message, json.loads(markup).get("inline_keyboard", []))
+        elif "message_id" in fields:  # edição sem teclado remove o anterior
+            self.keyboards.pop(chat_id, None)
+        return message
+
+    def _dispatch(self, method: str, fields: dict, files: dict, body_size: int):
+        self.calls[method] += 1
+        chat_id = int(fields.get("chat_id", 0) or 0)
+        for listener in self.listeners:
+            listener(method, fields)
+
+        if method == "getMe":
+            return BOT_USER
+        if method in ("answerCallbackQuery", "deleteMessage", "setMyCommands", "deleteWebhook", "setWebhook"):
+            return True
+        if method == "sendMessage":
+            return self._remember_keyboard(chat_id, fields, self._message(chat_id, text=fields.get("text", "")))
+        if method == "sendPhoto":
+            file_id = self._media(fields, files, "photo", body_size)
+            photo = [{"file_id": file_id, "file_unique_id": file_id, "width": 512, "height": 512}]
+            return self._remember_keyboard(chat_id, fields, self._message(chat_id, photo=photo, caption=fields.get("caption")))
+        if method == "sendAnimation":
+            file_id = self._media(fields, files, "animation", body_size)
+            animation = {"file_id": file_id, "file_unique_id": file_id, "width": 1, "height": 1, "duration": 1}
+            message = self._message(chat_id, animation=animation, caption=fields.get("caption"))
+            return self._remember_keyboard(chat_id, fields, message)
+        if method == "sendMediaGroup":
+            media = json.loads(fields["media"])
+            messages = []
+            for item in media:
+                if item["media"].startswith("attach://"):
+                    self.uploads += 1
+                    file_id = f"fake-photo-{next(self._file_ids)}"
+                else:
+                    self.file_id_reuses += 1
+                    file_id = item["media"]
+                photo = [{"file_id": file_id, "file_unique_id": file_id, "width": 512, "height": 512}]
+                messages.append(self._message(chat_id, photo=photo, caption=item.get("caption")))
+            if files:
+                self.bytes_uploaded += body_size
+            return messages
+        if method == "editMessageMedia":
+            if not chat_id:
+                return True
+            media = json.loads(fields["media"])
+            if media["media"].startswith("attach://"):
+                self.uploads += 1
+                self.bytes_uploaded += body_size
+                file_id = f"fake-photo-{next(self._file_ids)}"
+            else:
+                self.file_id_reuses += 1
+                file_id = media["media"]
+            photo = [{"file_id": file_id, "file_unique_id": file_id, "width": 512, "height": 512}]
+            message = self._message(chat_id, int(fields["message_id"]), photo=photo, caption=media.get("caption"))
+            return self._remember_keyboard(chat_id, fields, message)
+        if method in ("editMessageCaption", "editMessageReplyMarkup", "editMessageText"):
+            if not chat_id:  # mensagens inline
+                return True
+            message = self._message(
+                chat_id, int(fields["message_id"]), text=fields.get("text", ""), caption=fields.get("caption")
+            )
+            return self._remember_keyboard(chat_id, fields, message)
+        # Métodos não usados pelo bot: resposta genérica
+        return True
@@ -0,0 +1,336 @@
+# bench/run_bench.py
+"""
+Benchmark de carga do bot contra uma Bot API falsa (bench/fake_bot_api.py).
+
+Gera uma árvore de assets sintética, sobe o bot de verdade (main.build_app +
+handlers) com banco e assets temporários e simula N usuários concorrentes
+percorrendo os fluxos reais:
+
+    /pull -> botão de categoria -> botão de série (ou xN) -> /inventario -> próxima página
+
+Os botões clicados são tirados dos teclados que o bot enviou, como faria um
+usuário. O resultado sai em JSON (latência p50/p99 por fluxo, vazão, tempo de
+banco, bytes enviados) para comparar execuções entre mudanças.
+
+    python -m bench.run_bench --users 50 --rounds 5 --out bench_output.json
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bench.fake_bot_api import FakeBotAPI  # noqa: E402
+
+CATEGORIES = ("series", "animes", "jogos")
+
+
+# ---------- assets sintéticos ---------- #
+def build_assets(root: Path, series_per_category: int, cards_per_series: int, size: tuple[int, int], seed: int):
+    """Cria assets/<categoria>/<série>/<carta>.png e o intro.gif, com desenhos aleatórios."""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+
+    def color():
+        return tuple(rng.randrange(256) for _ in range(3))
+
+    total = 0
+    for category in CATEGORIES:
+        for s in range(series_per_category):
+            series_dir = root / category / f"{category}_serie_{s:03d}"
+            series_dir.mkdir(parents=True, exist_ok=True)
+            for c in range(cards_per_series):
+                img = Image.new("RGB", size, color())
+                draw = ImageDraw.Draw(img)
+                for _ in range(12):
+                    x0, y0 = rng.randrange(size[0]), rng.randrange(size[1])
+                    x1, y1 = x0 + rng.randrange(20, size[0] // 2), y0 + rng.randrange(20, size[1] // 2)
+                    draw.ellipse((x0, y0, x1, y1), fill=color())
+                draw.text((10, 10), f"{s}-{c}", fill=(255, 255, 255))
+                img.save(series_dir / f"carta_{c:03d}.png")
+                total += 1
+
+    intro = root / "intro"
+    intro.mkdir(parents=True, exist_ok=True)
+    frames = [Image.new("RGB", (64, 64), color()) for _ in range(4)]
+    frames[0].save(intro / "intro.gif", save_all=True, append_images=frames[1:], duration=100, loop=0)
+    return total
+
+
+def install_config(workdir: Path, api: FakeBotAPI, args):
+    """Registra um módulo `config` em memória antes de importar o bot."""
+    config = types.ModuleType("config")
+    config.BOT_TOKEN = "123456:BENCH"
+    config.DB_FILE = str(workdir / "bench.db")
+    config.CARDS_DIR = str(workdir / "assets")
+    config.OPTIMIZED_DIR = str(workdir / "optimized")
+    config.THUMB_DIR = str(workdir / "thumbs")
+    config.BACKUP_DIR = str(workdir / "backups")
+    config.IMAGE_QUALITY = 85
+    config.ITEMS_PER_PAGE = args.items_per_page
+    config.WELCOME_MESSAGE = "Bem-vindo ao benchmark!"
+    config.ADMIN_IDS = []
+    config.BOT_API_URL = api.base_url
+    config.UPDATE_CONCURRENCY = args.concurrency
+    # Cotas fora do caminho: o benchmark mede o bot, não o limitador
+    config.PULLS_POR_HORA = config.PULLS_POR_DIA = 10**9
+    config.PULL_BURST = 10**9
+    config.PULL_REFILL_SECONDS = 1
+    sys.modules["config"] = config
+    return config
+
+
+# ---------- updates simulados ---------- #
+class SimulatedUsers:
+    def __init__(self, app, api: FakeBotAPI, rng: random.Random, multi: bool = False):
+        self.app = app
+        self.multi = multi
+        self.api = api
+        self.rng = rng
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.skipped: dict[str, int] = defaultdict(int)
+
+    @staticmethod
+    def _user(user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"bench{user_id}"}
+
+    def _command(self, user_id: int, text: str) -> dict:
+        command = text.split()[0]
+        return {
+            "update_id": next(self._update_ids),
+            "message": {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": self._user(user_id),
+                "text": text,
+                "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+            },
+        }
+
+    def _callback(self, user_id: int, message: dict, data: str) -> dict:
+        return {
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._update_ids)),
+                "from": self._user(user_id),
+                "chat_instance": str(user_id),
+                "message": message,
+                "data": data,
+            },
+        }
+
+    async def _send(self, flow: str, payload: dict):
+        from telegram import Update
+
+        update = Update.de_json(payload, self.app.bot)
+        started = time.perf_counter()
+        await self.app.update_processor.process_update(update, self.app.process_update(update))
+        self.latencies[flow].append(time.perf_counter() - started)
+
+    async def _click(self, flow: str, user_id: int, match, choose=None) -> bool:
+        """Clica num botão do último teclado que o bot mandou ao usuário; `match(op, args)` filtra os botões."""
+        from utils.callbacks import decode
+
+        message, keyboard = self.api.keyboards.get(user_id, (None, []))
+        buttons = []
+        for row in keyboard:
+            for button in row:
+                parsed = decode(button.get("callback_data"))
+                if parsed and match(*parsed):
+                    buttons.append(button["callback_data"])
+        if not buttons:
+            self.skipped[flow] += 1
+            return False
+        data = (choose or self.rng.choice)(buttons)
+        await self._send(flow, self._callback(user_id, message, data))
+        return True
+
+    async def session(self, user_id: int, rounds: int):
+        from utils.callbacks import OP_CATEGORIA, OP_SERIE, OP_INVENTARIO
+
+        for _ in range(rounds):
+            await self._send("pull", self._command(user_id, "/pull"))
+            if await self._click("categoria", user_id, lambda op, args: op == OP_CATEGORIA):
+                if self.multi:
+                    await self._click("serie_multi", user_id, lambda op, args: op == OP_SERIE and args[1] > 1)
+                else:
+                    await self._click("serie", user_id, lambda op, args: op == OP_SERIE and args[1] == 1)
+            await self._send("inventario", self._command(user_id, "/inventario"))
+            await self._click(
+                "inventario_pagina", user_id, lambda op, args: op == OP_INVENTARIO and args[0] == 1,
+                choose=lambda b: b[0],
+            )
+
+
+# ---------- relatório ---------- #
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="homucards-bench-"))
+    api = FakeBotAPI(latency=args.api_latency_ms / 1000)
+    await api.start()
+    try:
+        started = time.perf_counter()
+        total_cards = build_assets(
+            workdir / "assets", args.series, args.cards, (args.width, args.height), args.seed
+        )
+        assets_seconds = time.perf_counter() - started
+        install_config(workdir, api, args)
+
+        # Importa o bot só depois do config falso estar registrado
+        import main
+        from database.models import db
+        from database.writer import writer
+        from utils.image_cache import image_cache
+        from utils.metrics import metrics
+        from utils.optimize_assets import build as build_optimized
+
+        if args.optimize:
+            build_optimized()
+
+        app = main.build_app()
+        main.register_handlers(app)
+        errors = []
+
+        async def on_error(update, context):
+            errors.append(repr(context.error))
+
+        app.add_error_handler(on_error)
+
+        started = time.perf_counter()
+        await app.initialize()
+        await main.on_startup(app)
+        startup_seconds = time.perf_counter() - started
+
+        users = SimulatedUsers(app, api, random.Random(args.seed), multi=args.multi)
+        db_before = db.stats()
+        started = time.perf_counter()
+        await asyncio.gather(*(users.session(10_000 + i, args.rounds) for i in range(args.users)))
+        wall = time.perf_counter() - started
+        db_after = db.stats()
+
+        metrics_snapshot = metrics.snapshot()
+        writer_stats = writer.stats()
+        cache_stats = image_cache.stats()
+        await main.on_shutdown(app)
+        await app.shutdown()
+    finally:
+        await api.stop()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    interactions = sum(len(v) for v in users.latencies.values())
+    all_latencies = [x for v in users.latencies.values() for x in v]
+    return {
+        "revision": git_revision(),
+        "params": {
+            "users": args.users,
+            "rounds": args.rounds,
+            "series_per_category": args.series,
+            "cards_per_series": args.cards,
+            "total_cards": total_cards,
+            "image_size": [args.width, args.height],
+            "concurrency": args.concurrency,
+            "api_latency_ms": args.api_latency_ms,
+            "optimized_assets": args.optimize,
+            "multi_pull": args.multi,
+        },
+        "setup_seconds": {"assets": round(assets_seconds, 3), "startup": round(startup_seconds, 3)},
+        "wall_seconds": round(wall, 3),
+        "interactions": interactions,
+        "throughput_per_second": round(interactions / wall, 1) if wall else 0,
+        "latency_ms": {
+            flow: {
+                "count": len(values),
+                "p50": _ms(percentile(values, 0.50)),
+                "p99": _ms(percentile(values, 0.99)),
+                "max": _ms(max(values)),
+            }
+            for flow, values in sorted(users.latencies.items())
+        }
+        | {"all": {"p50": _ms(percentile(all_latencies, 0.50)), "p99": _ms(percentile(all_latencies, 0.99))}},
+        "skipped_clicks": dict(users.skipped),
+        "db": {
+            "reads": db_after["reads"] - db_before["reads"],
+            "read_seconds": round(db_after["read_seconds"] - db_before["read_seconds"], 4),
+            "transactions": db_after["transactions"] - db_before["transactions"],
+            "transaction_seconds": round(db_after["transaction_seconds"] - db_before["transaction_seconds"], 4),
+        },
+        "db_roundtrips_per_update": metrics_snapshot["db_roundtrips_per_update"],
+        "handlers": metrics_snapshot["handlers"],
+        "queries": metrics_snapshot["queries"],
+        "writer": writer_stats,
+        "image_cache": cache_stats,
+        "bot_api": api.summary(),
+        "errors": errors[:20],
+        "error_count": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga do HomuCards com Bot API falsa")
+    parser.add_argument("--users", type=int, default=50, help="usuários simulados em paralelo")
+    parser.add_argument("--rounds", type=int, default=5, help="ciclos /pull -> série -> /inventario por usuário")
+    parser.add_argument("--series", type=int, default=10, help="séries por categoria")
+    parser.add_argument("--cards", type=int, default=20, help="cartas por série")
+    parser.add_argument("--width", type=int, default=400)
+    parser.add_argument("--height", type=int, default=560)
+    parser.add_argument("--concurrency", type=int, default=32, help="UPDATE_CONCURRENCY do bot")
+    parser.add_argument("--items-per-page", type=int, default=10)
+    parser.add_argument("--api-latency-ms", type=float, default=0.0, help="atraso artificial da Bot API")
+    parser.add_argument("--optimize", action="store_true", help="pré-gera os JPEGs otimizados antes de medir")
+    parser.add_argument("--multi", action="store_true", help="usa o botão de multi-pull em vez do pull simples")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep", action="store_true", help="não apaga o diretório temporário")
+    parser.add_argument("--out", help="arquivo onde gravar o JSON (além do stdout)")
+    args = parser.parse_args()
+
+    # Os prints do bot vão para o stderr; o stdout fica só com o JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        result = asyncio.run(run(args))
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+# database/admin_ops.py
+"""
+Operações em lote dos comandos de admin: remover, ocultar/mostrar e mesclar
+cartas, remover séries inteiras e reordenar uma série.
+
+Cada operação é uma única transação que já deixa consistentes user_cards
+(via ON DELETE CASCADE), user_wallet, user_series_progress e media_cache.
+Cartas apagadas ou ocultadas saem do sorteio antes do COMMIT
+(catalog.exclude); depois dele é emitido um único CATALOG_CHANGED
+(utils/events.py) e cada cache em memória se atualiza sozinho.
+
+As linhas de asset_manifest das cartas removidas ficam: o arquivo continua
+"conhecido" e a sincronização não traz a carta de volta.
+"""
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from config import CARDS_DIR
+from database.catalog import catalog
+from database.catalog_sync import rebuild_series_progress
+from database.models import db
+from utils.events import CATALOG_CHANGED, CatalogChange, events
+
+
+@dataclass
+class AdminOpResult:
+    """Resumo de uma operação em lote."""
+
+    reason: str
+    cards: int = 0
+    series_removed: int = 0
+    users: int = 0
+    missing: list = field(default_factory=list)  # IDs/nomes pedidos que não existem
+    seconds: float = 0.0
+
+    def __str__(self):
+        partes = [f"{self.cards} cartas"]
+        if self.series_removed:
+            partes.append(f"{self.series_removed} séries apagadas")
+        partes.append(f"{self.users} inventários atualizados")
+        texto = ", ".join(partes)
+        if self.missing:
+            texto += f" | não encontrados: {', '.join(map(str, self.missing))}"
+        return texto
+
+
+def _in(values) -> str:
+    return ",".join("?" * len(values))
+
+
+async def _existing_cards(conn, card_ids) -> list[int]:
+    ids = sorted(set(card_ids))
+    if not ids:
+        return []
+    cursor = await conn.execute(f"SELECT id FROM cards WHERE id IN ({_in(ids)})", ids)
+    return [card_id for (card_id,) in await cursor.fetchall()]
+
+
+async def _series_ids(conn, names) -> tuple[dict[str, int], list[str]]:
+    """({nome pedido: id}, nomes que não existem), sem diferenciar maiúsculas."""
+    found, missing = {}, []
+    for name in names:
+        cursor = await conn.execute("SELECT id FROM series WHERE name = ? COLLATE NOCASE", (name,))
+        row = await cursor.fetchone()
+        if row:
+            found[name] = row[0]
+        else:
+            missing.append(name)
+    return found, missing
+
+
+async def _cards_of_series(conn, series_ids) -> list[int]:
+    ids = sorted(set(series_ids))
+    cursor = await conn.execute(f"SELECT id FROM cards WHERE series_id IN ({_in(ids)})", ids)
+    return [card_id for (card_id,) in await cursor.fetchall()]
+
+
+async def _affected(conn, card_ids):
+    """(usuários que têm as cartas, séries das cartas, caminhos dos arquivos), lidos antes de mudar."""
+    cursor = await conn.execute(
+        f"SELECT DISTINCT user_id FROM user_cards WHERE card_id IN ({_in(card_ids)})", card_ids
+    )
+    users = {user_id for (user_id,) in await cursor.fetchall()}
+    cursor = await conn.execute(
+        f"""
+        SELECT c.series_id, s.category, s.name, c.filename
+        FROM cards c JOIN series s ON s.id = c.series_id
+        WHERE c.id IN ({_in(card_ids)})
+        """,
+        card_ids,
+    )
+    series, paths = set(), []
+    for series_id, category, series_name, filename in await cursor.fetchall():
+        series.add(series_id)
+        if category:
+            paths.append(str(Path(CARDS_DIR) / category / series_name / filename))
+    return users, series, paths
+
+
+async def _refresh_wallets(conn, users):
+    """Recontagem de cartas distintas e nova versão do inventário (invalida a colagem em cache)."""
+    await conn.executemany(
+        """
+        UPDATE user_wallet SET
+            distinct_cards = (SELECT COUNT(*) FROM user_cards WHERE user_id = ?),
+            inventory_version = inventory_version + 1
+        WHERE user_id = ?
+        """,
+        [(user_id, user_id) for user_id in users],
+    )
+
+
+async def _drop_cards(conn, card_ids, series) -> int:
+    """Apaga as cartas (user_cards junto), seus file_ids e as séries que ficaram vazias."""
+    await conn.executemany("DELETE FROM media_cache WHERE media_key = ?", [(f"card:{i}",) for i in card_ids])
+    await conn.execute(f"DELETE FROM cards WHERE id IN ({_in(card_ids)})", card_ids)
+    ids = sorted(series)
+    cursor = await conn.execute(
+        f"DELETE FROM series WHERE id IN ({_in(ids)}) AND id NOT IN (SELECT DISTINCT series_id FROM cards)",
+        ids,
+    )
+    return cursor.rowcount
+
+
+async def _emit(result: AdminOpResult, started: float, card_ids=(), series=(), users=(), paths=()):
+    result.seconds = time.perf_counter() - started
+    await events.emit(
+        CATALOG_CHANGED,
+        CatalogChange(
+            reason=result.reason,
+            card_ids=frozenset(card_ids),
+            series_ids=frozenset(series),
+            user_ids=frozenset(users),
+            paths=tuple(paths),
+        ),
+    )
+    print(f"🛠️ {result.reason}: {result} ({result.seconds:.2f}s)")
+    return result
+
+
+# ---------- remoção ---------- #
+async def _remove(reason: str, resolve) -> AdminOpResult:
+    """`resolve(conn)` devolve (card_ids, pedidos que não existem) dentro da transação."""
+    started = time.perf_counter()
+    result = AdminOpResult(reason)
+    async with catalog.transaction() as conn:
+        card_ids, result.missing = await resolve(conn)
+        if not card_ids:
+            return result
+        users, series, paths = await _affected(conn, card_ids)
+        result.series_removed = await _drop_cards(conn, card_ids, series)
+        await _refresh_wallets(conn, users)
+        await rebuild_series_progress(conn, series)
+        catalog.exclude(card_ids)
+    result.cards, result.users = len(card_ids), len(users)
+    return await _emit(result, started, card_ids, series, users, paths)
+
+
+async def remove_cards(card_ids) -> AdminOpResult:
+    """Remove as cartas do catálogo e de todos os inventários."""
+
+    async def resolve(conn):
+        existing = await _existing_cards(conn, card_ids)
+        return existing, sorted(set(card_ids) - set(existing))
+
+    return await _remove("remoção de cartas", resolve)
+
+
+async def remove_series(names) -> AdminOpResult:
+    """Remove as séries inteiras (todas as cartas, inventários e progresso)."""
+
+    async def resolve(conn):
+        found, missing = await _series_ids(conn, names)
+        return (await _cards_of_series(conn, found.values()) if found else []), missing
+
+    return await _remove("remoção de séries", resolve)
+
+
+# ---------- ocultar / mostrar ---------- #
+async def _set_hidden(reason: str, hidden: bool, resolve) -> AdminOpResult:
+    started = time.perf_counter()
+    result = AdminOpResult(reason)
+    async with catalog.transaction() as conn:
+        card_ids, result.missing = await resolve(conn)
+        if not card_ids:
+            return result
+        cursor = await conn.execute(
+            f"UPDATE cards SET hidden = ? WHERE id IN ({_in(card_ids)}) AND hidden != ? RETURNING id, series_id",
+            [int(hidden), *card_ids, int(hidden)],
+        )
+        changed = await cursor.fetchall()
+        if not changed:
+            return result
+        series = {series_id for _, series_id in changed}
+        # O inventário não muda (a carta continua lá); só o progresso e o tamanho das séries
+        await rebuild_series_progress(conn, series)
+        if hidden:
+            catalog.exclude(card_id for card_id, _ in changed)
+    result.cards = len(changed)
+    return await _emit(result, started, [card_id for card_id, _ in changed], series)
+
+
+async def set_cards_hidden(card_ids, hidden: bool = True) -> AdminOpResult:
+    """Tira (ou devolve) as cartas do sorteio, sem mexer nos inventários."""
+
+    async def resolve(conn):
+        existing = await _existing_cards(conn, card_ids)
+        return existing, sorted(set(card_ids) - set(existing))
+
+    return await _set_hidden("ocultação de cartas" if hidden else "cartas de volta ao sorteio", hidden, resolve)
+
+
+async def set_series_hidden(names, hidden: bool = True) -> AdminOpResult:
+    """Oculta (ou mostra) todas as cartas das séries: a série some dos menus e do sorteio."""
+
+    async def resolve(conn):
+        found, missing = await _series_ids(conn, names)
+        return (await _cards_of_series(conn, found.values()) if found else []), missing
+
+    return await _set_hidden("ocultação de séries" if hidden else "séries de volta ao sorteio", hidden, resolve)
+
+
+# ---------- mesclar duplicatas ---------- #
+async def merge_cards(target_id: int, source_ids) -> AdminOpResult | None:
+    """
+    Junta as cartas `source_ids` em `target_id`: as cópias de cada usuário
+    são somadas na carta destino e as de origem são apagadas. Os arquivos
+    das cartas de origem passam a apontar para a destino no manifesto.
+    Retorna None se a carta destino não existir.
+    """
+    started = time.perf_counter()
+    result = AdminOpResult("mesclagem de cartas")
+    async with catalog.transaction() as conn:
+        cursor = await conn.execute("SELECT card_name, series_id FROM cards WHERE id = ?", (target_id,))
+        target = await cursor.fetchone()
+        if target is None:
+            return None
+        target_name, target_series = target
+        wanted = set(source_ids) - {target_id}
+        sources = await _existing_cards(conn, wanted)
+        result.missing = sorted(wanted - set(sources))
+        if not sources:
+            return result
+
+        users, series, paths = await _affected(conn, sources)
+        series.add(target_series)
+        # WHERE obrigatório: sem ele o SQLite confunde o ON CONFLICT com um JOIN
+        await conn.execute(
+            f"""
+            INSERT INTO user_cards (user_id, card_id, card_name, quantity)
+            SELECT user_id, ?, ?, SUM(quantity) FROM user_cards
+            WHERE card_id IN ({_in(sources)})
+            GROUP BY user_id
+            ON CONFLICT(user_id, card_id) DO UPDATE SET quantity = quantity + excluded.quantity
+            """,
+            [target_id, target_name, *sources],
+        )
+        await conn.execute(
+            f"UPDATE asset_manifest SET card_id = ? WHERE card_id IN ({_in(sources)})", [target_id, *sources]
+        )
+        result.series_removed = await _drop_cards(conn, sources, series)
+        await _refresh_wallets(conn, users)
+        await rebuild_series_progress(conn, series)
+        catalog.exclude(sources)
+    result.cards, result.users = len(sources), len(users)
+    return await _emit(result, started, [target_id, *sources], series, users, paths)
+
+
+# ---------- reordenar ---------- #
+async def reorder_series(name: str, card_ids) -> AdminOpResult | None:
+    """
+    Põe as cartas dadas no início da série, nessa ordem; as demais seguem
+    depois, na ordem em que estavam. Retorna None se a série não existir.
+    """
+    started = time.perf_counter()
+    result = AdminOpResult("reordenação de série")
+    async with db.transaction() as conn:
+        found, _ = await _series_ids(conn, [name])
+        if not found:
+            return None
+        series_id = found[name]
+        cursor = await conn.execute(
+            "SELECT id FROM cards WHERE series_id = ? ORDER BY order_in_series, id", (series_id,)
+        )
+        current = [card_id for (card_id,) in await cursor.fetchall()]
+        in_series = set(current)
+        first = list(dict.fromkeys(i for i in card_ids if i in in_series))
+        result.missing = [i for i in card_ids if i not in in_series]
+        if not first:
+            return result
+        chosen = set(first)
+        order = first + [card_id for card_id in current if card_id not in chosen]
+        await conn.executemany(
+            "UPDATE cards SET order_in_series = ? WHERE id = ?",
+            [(position, card_id) for position, card_id in enumerate(order, start=1)],
+        )
+    result.cards = len(order)
+    return await _emit(result, started, order, {series_id})
@@ -0,0 +1,473 @@
+# database/backup.py
+"""
+Backups do banco com o bot no ar, e exportação/importação em JSONL:
+
+    python -m database.backup backup              # cópia agora, com rotação
+    python -m database.backup verify              # confere os .sha256 da pasta de backups
+    python -m database.backup export dump.jsonl.gz
+    python -m database.backup import dump.jsonl.gz --db novo.db
+
+O backup usa a API de backup online do SQLite em passos de poucas páginas.
+A conexão de origem segura uma transação de leitura durante toda a cópia:
+no modo WAL isso fixa um snapshot (a cópia não recomeça a cada escrita do
+bot) sem bloquear o escritor. A cópia é gravada num .tmp, passa pelo
+PRAGMA integrity_check e só então ganha o nome final e um .sha256 ao lado;
+as mais antigas além de BACKUP_KEEP são apagadas.
+
+A exportação grava séries, cartas, o manifesto de assets, usuários e
+inventários num .jsonl.gz, em streaming, a partir de um único snapshot. O
+manifesto vai junto porque guarda decisões do admin (cartas removidas
+continuam nele, as mescladas apontam para a carta destino): sem ele, a
+primeira sincronização depois de importar traria essas cartas de volta.
+O que é derivado (contadores da carteira, progresso por série) não vai no
+arquivo: a importação recalcula.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import config
+from config import DB_FILE
+from database.catalog_sync import rebuild_series_progress
+from database.migrations import SCHEMA_VERSION
+from database.models import db
+
+BACKUP_ENABLED = getattr(config, "BACKUP_ENABLED", True)
+BACKUP_DIR = getattr(config, "BACKUP_DIR", "backups")
+BACKUP_KEEP = getattr(config, "BACKUP_KEEP", 7)
+# Páginas copiadas por passo e pausa entre passos (libera CPU e GIL para o bot)
+BACKUP_PAGES_PER_STEP = getattr(config, "BACKUP_PAGES_PER_STEP", 256)
+BACKUP_STEP_SLEEP = 0.005
+# Linhas por fetchmany na exportação e por executemany na importação
+EXPORT_BATCH = 2000
+IMPORT_BATCH = 5000
+EXPORT_FORMAT = 2
+# Formatos que a importação aceita (o 1 não tinha o manifesto de assets)
+IMPORT_FORMATS = (1, 2)
+
+_cancel = threading.Event()
+_lock = asyncio.Lock()  # agendador e /backup não copiam ao mesmo tempo
+_stats = {"backups": 0, "failures": 0, "last_file": None, "last_bytes": 0, "last_seconds": 0.0, "last_at": 0.0}
+
+
+class BackupCancelled(Exception):
+    pass
+
+
+# ---------- checksums ---------- #
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def write_checksum(path: str) -> str:
+    """Grava <arquivo>.sha256 no formato do sha256sum. Retorna o hash."""
+    digest = file_sha256(path)
+    with open(path + ".sha256", "w", encoding="utf-8") as f:
+        f.write(f"{digest}  {os.path.basename(path)}\n")
+    return digest
+
+
+def verify_checksum(path: str):
+    """True/False se o arquivo bate com o .sha256 ao lado; None se não houver .sha256."""
+    try:
+        with open(path + ".sha256", encoding="utf-8") as f:
+            expected = f.read().split()[0]
+    except (OSError, IndexError):
+        return None
+    return file_sha256(path) == expected
+
+
+# ---------- backup online ---------- #
+def _backup_prefix(src: str) -> str:
+    return Path(src).stem + "-"
+
+
+def _rotate(out_dir: str, prefix: str, keep: int) -> list[str]:
+    """Apaga os backups mais antigos além de `keep` (o nome tem data e hora, então ordena)."""
+    backups = sorted(
+        name for name in os.listdir(out_dir) if name.startswith(prefix) and name.endswith(".db")
+    )
+    removed = backups[:-keep] if keep > 0 else []
+    for name in removed:
+        for path in (os.path.join(out_dir, name), os.path.join(out_dir, name + ".sha256")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def backup_database(
+    src: str = DB_FILE, out_dir: str = BACKUP_DIR, keep: int = BACKUP_KEEP,
+    pages: int = BACKUP_PAGES_PER_STEP, cancel=None,
+) -> dict:
+    """Copia o banco em passos de `pages` páginas, verifica e faz a rotação. Retorna um resumo."""
+    started = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    name = f"{_backup_prefix(src)}{time.strftime('%Y%m%d-%H%M%S')}.db"
+    final = os.path.join(out_dir, name)
+    tmp = final + ".tmp"
+    steps = [0]
+
+    def progress(status, remaining, total):
+        steps[0] += 1
+        if cancel is not None and cancel.is_set():
+            raise BackupCancelled()
+
+    source = sqlite3.connect(src, isolation_level=None)
+    target = sqlite3.connect(tmp, isolation_level=None)
+    try:
+        source.execute("PRAGMA query_only=ON")
+        # Snapshot fixo: sem isso, cada escrita do bot faria a cópia recomeçar do zero
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        source.backup(target, pages=pages, progress=progress, sleep=BACKUP_STEP_SLEEP)
+        source.execute("COMMIT")
+        # Arquivo único, sem -wal ao lado: dá para copiar e abrir em qualquer lugar
+        target.execute("PRAGMA journal_mode=DELETE")
+        check = target.execute("PRAGMA integrity_check").fetchone()[0]
+        page_count = target.execute("PRAGMA page_count").fetchone()[0]
+    except BaseException:
+        target.close()
+        source.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    target.close()
+    source.close()
+    if check != "ok":
+        os.remove(tmp)
+        raise RuntimeError(f"backup corrompido ({check})")
+
+    os.replace(tmp, final)
+    digest = write_checksum(final)
+    if not verify_checksum(final):
+        raise RuntimeError(f"checksum do backup {name} não confere após gravar")
+    removed = _rotate(out_dir, _backup_prefix(src), keep)
+    return {
+        "file": final,
+        "bytes": os.path.getsize(final),
+        "pages": page_count,
+        "steps": steps[0],
+        "sha256": digest,
+        "removed": removed,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def verify_backups(out_dir: str = BACKUP_DIR) -> dict[str, bool | None]:
+    """{arquivo: resultado do verify_checksum} de todos os backups da pasta."""
+    if not os.path.isdir(out_dir):
+        return {}
+    return {
+        name: verify_checksum(os.path.join(out_dir, name))
+        for name in sorted(os.listdir(out_dir)) if name.endswith(".db")
+    }
+
+
+async def run_backup() -> dict:
+    """Backup numa thread, sem travar o event loop (chamado pelo agendador e pelo /backup)."""
+    try:
+        async with _lock:
+            _cancel.clear()
+            summary = await asyncio.to_thread(backup_database, cancel=_cancel)
+    except asyncio.CancelledError:
+        _cancel.set()  # a thread não é cancelável: avisa para ela parar no próximo passo
+        raise
+    except Exception:
+        _stats["failures"] += 1
+        raise
+    _stats["backups"] += 1
+    _stats["last_file"] = os.path.basename(summary["file"])
+    _stats["last_bytes"] = summary["bytes"]
+    _stats["last_seconds"] = summary["seconds"]
+    _stats["last_at"] = time.time()
+    print(
+        f"💾 Backup {_stats['last_file']}: {summary['bytes'] / 1024 / 1024:.1f} MiB em "
+        f"{summary['steps']} passos ({summary['seconds']}s), {len(summary['removed'])} antigos apagados"
+    )
+    return summary
+
+
+def cancel_backup():
+    """Interrompe um backup em andamento (chamado no shutdown)."""
+    _cancel.set()
+
+
+def backup_stats() -> dict:
+    stats = dict(_stats)
+    last_at = stats.pop("last_at")
+    stats["age_seconds"] = round(time.time() - last_at) if last_at else None
+    return stats
+
+
+# ---------- exportação JSONL ---------- #
+def _rows(conn, sql: str):
+    cursor = conn.execute(sql)
+    while True:
+        batch = cursor.fetchmany(EXPORT_BATCH)
+        if not batch:
+            return
+        yield from batch
+
+
+def export_snapshot(dest: str, src: str = DB_FILE) -> dict:
+    """Grava séries, cartas, manifesto, usuários e inventários em `dest` (.jsonl.gz), de um único snapshot."""
+    started = time.perf_counter()
+    counts = {"series": 0, "card": 0, "manifest": 0, "user": 0, "inventory": 0}
+    conn = sqlite3.connect(src, isolation_level=None)
+    tmp = dest + ".tmp"
+    try:
+        conn.execute("PRAGMA query_only=ON")
+        conn.execute("BEGIN")
+        with gzip.open(tmp, "wt", encoding="utf-8") as out:
+
+            def write(record):
+                out.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+                out.write("\n")
+
+            write({
+                "type": "header",
+                "format": EXPORT_FORMAT,
+                "schema_version": SCHEMA_VERSION,
+                "exported_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            })
+            # Na ordem das foreign keys: a importação insere conforme lê
+            for series_id, name, category in _rows(conn, "SELECT id, name, category FROM series ORDER BY id"):
+                write({"type": "series", "id": series_id, "name": name, "category": category})
+                counts["series"] += 1
+            for row in _rows(
+                conn,
+                """
+                SELECT id, series_id, card_name, filename, order_in_series, rarity, weight, hidden
+                FROM cards ORDER BY id
+                """,
+            ):
+                card_id, series_id, name, filename, order, rarity, weight, hidden = row
+                write({
+                    "type": "card", "id": card_id, "series_id": series_id, "name": name, "filename": filename,
+                    "order": order, "rarity": rarity, "weight": weight, "hidden": bool(hidden),
+                })
+                counts["card"] += 1
+            for path, mtime_ns, size, content_hash, card_id in _rows(
+                conn, "SELECT path, mtime_ns, size, content_hash, card_id FROM asset_manifest ORDER BY path"
+            ):
+                write({
+                    "type": "manifest", "path": path, "mtime_ns": mtime_ns, "size": size,
+                    "hash": content_hash, "card_id": card_id,
+                })
+                counts["manifest"] += 1
+            # Usuários com nome e/ou carteira (há quem puxe cartas sem nunca ter usado o /username)
+            for user_id, username, total_pulls in _rows(
+                conn,
+                """
+                SELECT u.id, u.username, COALESCE(w.total_pulls, 0)
+                FROM users u LEFT JOIN user_wallet w ON w.user_id = u.id
+                UNION ALL
+                SELECT w.user_id, NULL, w.total_pulls FROM user_wallet w
+                WHERE w.user_id NOT IN (SELECT id FROM users)
+                ORDER BY 1
+                """,
+            ):
+                write({"type": "user", "id": user_id, "username": username, "total_pulls": total_pulls})
+                counts["user"] += 1
+            # Uma linha por usuário com todas as cartas dele: [[card_id, quantidade], ...]
+            current, cards = None, []
+            for user_id, card_id, quantity in _rows(
+                conn, "SELECT user_id, card_id, quantity FROM user_cards ORDER BY user_id, card_id"
+            ):
+                if user_id != current and cards:
+                    write({"type": "inventory", "user_id": current, "cards": cards})
+                    counts["inventory"] += 1
+                    cards = []
+                current = user_id
+                cards.append([card_id, quantity])
+            if cards:
+                write({"type": "inventory", "user_id": current, "cards": cards})
+                counts["inventory"] += 1
+        conn.execute("COMMIT")
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    finally:
+        conn.close()
+
+    os.replace(tmp, dest)
+    digest = write_checksum(dest)
+    return {
+        "file": dest,
+        "bytes": os.path.getsize(dest),
+        "sha256": digest,
+        "counts": counts,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+# ---------- importação JSONL ---------- #
+_IMPORT_SQL = {
+    "series": "INSERT INTO series (id, name, category) VALUES (?, ?, ?)",
+    "cards": """
+        INSERT INTO cards (id, series_id, card_name, filename, order_in_series, rarity, weight, hidden)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    "asset_manifest": """
+        INSERT INTO asset_manifest (path, mtime_ns, size, content_hash, card_id) VALUES (?, ?, ?, ?, ?)
+    """,
+    "users": "INSERT INTO users (id, username) VALUES (?, ?)",
+    "user_wallet": "INSERT INTO user_wallet (user_id, total_pulls) VALUES (?, ?)",
+    "user_cards": "INSERT INTO user_cards (user_id, card_id, quantity) VALUES (?, ?, ?)",
+}
+
+
+def _import_rows(record: dict) -> list[tuple[str, tuple]]:
+    """[(tabela, parâmetros)] que um registro da exportação vira."""
+    kind = record["type"]
+    if kind == "series":
+        return [("series", (record["id"], record["name"], record.get("category")))]
+    if kind == "card":
+        return [("cards", (
+            record["id"], record["series_id"], record["name"], record["filename"], record.get("order"),
+            record.get("rarity") or "comum", record.get("weight"), int(bool(record.get("hidden"))),
+        ))]
+    if kind == "manifest":
+        return [("asset_manifest", (
+            record["path"], record["mtime_ns"], record["size"], record["hash"], record.get("card_id"),
+        ))]
+    if kind == "user":
+        rows = [("user_wallet", (record["id"], record.get("total_pulls", 0)))]
+        if record.get("username") is not None:
+            rows.insert(0, ("users", (record["id"], record["username"])))
+        return rows
+    if kind == "inventory":
+        return [("user_cards", (record["user_id"], card_id, quantity)) for card_id, quantity in record["cards"]]
+    raise ValueError(f"tipo de registro desconhecido: {kind!r}")
+
+
+async def import_snapshot(src: str) -> dict:
+    """
+    Restaura um .jsonl.gz do export_snapshot num banco novo (já migrado e
+    vazio), numa única transação com inserts em lote. Os contadores da
+    carteira e o progresso por série são recalculados no fim.
+    """
+    started = time.perf_counter()
+    if verify_checksum(src) is False:
+        raise ValueError(f"checksum de {src} não confere")
+    row = await db.fetchone(
+        "SELECT (SELECT COUNT(*) FROM series) + (SELECT COUNT(*) FROM users) + (SELECT COUNT(*) FROM user_cards)"
+    )
+    if row[0]:
+        raise RuntimeError("o banco de destino não está vazio: a importação é só para restaurar num banco novo")
+
+    inserted = dict.fromkeys(_IMPORT_SQL, 0)
+    pending: dict[str, list] = {table: [] for table in _IMPORT_SQL}
+    async with db.transaction() as conn:
+
+        async def flush(table):
+            if pending[table]:
+                await conn.executemany(_IMPORT_SQL[table], pending[table])
+                inserted[table] += len(pending[table])
+                pending[table].clear()
+
+        with gzip.open(src, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("type") != "header" or header.get("format") not in IMPORT_FORMATS:
+                raise ValueError(f"{src} não é uma exportação reconhecida")
+            last_kind = None
+            for line in f:
+                record = json.loads(line)
+                if record["type"] != last_kind:
+                    # Os registros vêm agrupados na ordem das foreign keys: esvazia o grupo anterior
+                    for table in _IMPORT_SQL:
+                        await flush(table)
+                    last_kind = record["type"]
+                for table, params in _import_rows(record):
+                    pending[table].append(params)
+                    if len(pending[table]) >= IMPORT_BATCH:
+                        await flush(table)
+        for table in _IMPORT_SQL:
+            await flush(table)
+
+        # ---------- derivados ---------- #
+        await conn.execute(
+            "UPDATE user_cards SET card_name = (SELECT card_name FROM cards WHERE cards.id = user_cards.card_id)"
+        )
+        await conn.execute(
+            "INSERT OR IGNORE INTO user_wallet (user_id, total_pulls) SELECT DISTINCT user_id, 0 FROM user_cards"
+        )
+        await conn.execute(
+            """
+            UPDATE user_wallet SET
+                distinct_cards = (SELECT COUNT(*) FROM user_cards WHERE user_cards.user_id = user_wallet.user_id),
+                inventory_version = 1
+            """
+        )
+        cursor = await conn.execute("SELECT id FROM series")
+        series_ids = [series_id for (series_id,) in await cursor.fetchall()]
+        if series_ids:
+            await rebuild_series_progress(conn, series_ids)
+
+    return {"file": src, "rows": inserted, "seconds": round(time.perf_counter() - started, 2)}
+
+
+# ---------- linha de comando ---------- #
+async def _import_cli(src: str, path: str) -> dict:
+    from database.migrations import run_migrations
+
+    # O CLI roda fora do bot: aponta a conexão única para o banco de destino
+    db.path = path
+    await db.connect()
+    try:
+        await run_migrations()
+        return await import_snapshot(src)
+    finally:
+        await db.close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backup, exportação e importação do banco.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("backup", help="backup online com rotação")
+    p.add_argument("--out", default=BACKUP_DIR)
+    p.add_argument("--keep", type=int, default=BACKUP_KEEP)
+    p = sub.add_parser("verify", help="confere os checksums dos backups")
+    p.add_argument("--out", default=BACKUP_DIR)
+    p = sub.add_parser("export", help="exporta para .jsonl.gz")
+    p.add_argument("file")
+    p = sub.add_parser("import", help="restaura um .jsonl.gz num banco novo")
+    p.add_argument("file")
+    p.add_argument("--db", default=DB_FILE)
+    args = parser.parse_args()
+
+    if args.command == "backup":
+        summary = backup_database(out_dir=args.out, keep=args.keep)
+        print(f"✅ {summary['file']}: {summary['bytes']} bytes em {summary['steps']} passos ({summary['seconds']}s)")
+    elif args.command == "verify":
+        results = verify_backups(args.out)
+        for name, ok in results.items():
+            print(f"{'✅' if ok else '⚠️ sem .sha256' if ok is None else '❌ corrompido'} {name}")
+        if any(ok is False for ok in results.values()):
+            raise SystemExit(1)
+    elif args.command == "export":
+        summary = export_snapshot(args.file)
+        print(f"✅ {summary['file']}: {summary['counts']} ({summary['bytes']} bytes, {summary['seconds']}s)")
+    else:
+        summary = asyncio.run(_import_cli(args.file, args.db))
+        print(f"✅ Importado em {args.db}: {summary['rows']} ({summary['seconds']}s)")
+
+
+if __name__ == "__main__":
+    main()
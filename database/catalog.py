@@ -0,0 +1,253 @@
+# database/catalog.py
+import random
+import sys
+from array import array
+from contextlib import asynccontextmanager
+
+import config
+from database.models import db
+from database.rarity import build_alias, effective_weight
+from utils.events import CATALOG_CHANGED, events
+
+# Semente do sorteio (None = aleatória). Fixe para reproduzir sorteios em testes.
+PULL_RNG_SEED = getattr(config, "PULL_RNG_SEED", None)
+
+
+class SeriesCards:
+    """Cartas de uma série em arrays compactos, na ordem de order_in_series, com a tabela de alias do sorteio."""
+
+    __slots__ = ("id", "name", "category", "card_ids", "names", "filenames", "rarities", "weights", "prob", "alias")
+
+    def __init__(self, series_id: int, name: str, category):
+        self.id = series_id
+        self.name = name
+        self.category = category
+        self.card_ids = array("q")
+        self.names: list[str] = []
+        self.filenames: list[str] = []
+        self.rarities: list[str] = []
+        self.weights = array("d")
+        # Tabela de Vose; None = sorteio uniforme
+        self.prob: array | None = None
+        self.alias: array | None = None
+
+    def __len__(self):
+        return len(self.card_ids)
+
+    def build_table(self):
+        table = build_alias(self.weights)
+        self.prob, self.alias = table if table else (None, None)
+
+    def exclude(self, card_ids) -> bool:
+        """Tira as cartas da série e remonta a tabela de alias. Retorna se alguma saiu."""
+        keep = [i for i, card_id in enumerate(self.card_ids) if card_id not in card_ids]
+        if len(keep) == len(self.card_ids):
+            return False
+        self.card_ids = array("q", (self.card_ids[i] for i in keep))
+        self.names = [self.names[i] for i in keep]
+        self.filenames = [self.filenames[i] for i in keep]
+        self.rarities = [self.rarities[i] for i in keep]
+        self.weights = array("d", (self.weights[i] for i in keep))
+        self.build_table()
+        return True
+
+    def same_weights(self, other: "SeriesCards") -> bool:
+        return self.card_ids == other.card_ids and self.weights == other.weights
+
+    def _pick(self, rng) -> int:
+        # Um único número aleatório escolhe a coluna (parte inteira) e o lado (fração)
+        n = len(self.card_ids)
+        u = rng.random() * n
+        i = min(int(u), n - 1)
+        if self.prob is not None and u - i >= self.prob[i]:
+            i = self.alias[i]
+        return i
+
+    def _card(self, i: int):
+        return self.card_ids[i], self.names[i], self.filenames[i], self.rarities[i]
+
+    def draw(self, rng=random):
+        if not self.card_ids:
+            return None
+        return self._card(self._pick(rng))
+
+    def draw_many(self, n: int, rng=random) -> list:
+        if not self.card_ids:
+            return []
+        return [self._card(self._pick(rng)) for _ in range(n)]
+
+    def rarity_of(self, card_id: int):
+        try:
+            return self.rarities[self.card_ids.index(card_id)]
+        except ValueError:
+            return None
+
+    def memory_bytes(self) -> int:
+        total = sys.getsizeof(self.card_ids) + sys.getsizeof(self.names) + sys.getsizeof(self.filenames)
+        total += sys.getsizeof(self.rarities) + sys.getsizeof(self.weights)
+        total += sum(sys.getsizeof(n) for n in self.names)
+        total += sum(sys.getsizeof(f) for f in self.filenames)
+        if self.prob is not None:
+            total += sys.getsizeof(self.prob) + sys.getsizeof(self.alias)
+        return total
+
+
+class CatalogIndex:
+    """
+    Índice do catálogo em memória, montado uma vez a partir do banco.
+
+    Permite sortear uma carta sem nenhuma query: a série é achada por nome
+    (sem diferenciar maiúsculas) e a carta pela tabela de alias da série,
+    em O(1) qualquer que seja o tamanho da série.
+    """
+
+    def __init__(self, seed=PULL_RNG_SEED):
+        self.rng = random.Random(seed)
+        self.loaded = False
+        self.version = 0  # muda a cada alteração, para quem guarda dados derivados (teclados)
+        self.series_by_id: dict[int, SeriesCards] = {}
+        self.series_by_name: dict[str, SeriesCards] = {}
+        self.categories: dict[str, list[SeriesCards]] = {}
+        self.card_series: dict[int, int] = {}  # card_id -> series_id
+        # Ocultas não entram no sorteio, mas quem as tem ainda vê a imagem: card_id -> (categoria, série, arquivo)
+        self.hidden: dict[int, tuple[str, str, str]] = {}
+
+    async def load(self):
+        """(Re)constrói o índice inteiro com uma única query."""
+        rows = await db.fetchall(
+            """
+            SELECT s.id, s.name, s.category, c.id, c.card_name, c.filename, c.rarity, c.weight, c.hidden
+            FROM series s
+            JOIN cards c ON c.series_id = s.id
+            ORDER BY s.id, c.order_in_series, c.id
+            """
+        )
+        series_by_id: dict[int, SeriesCards] = {}
+        card_series: dict[int, int] = {}
+        hidden: dict[int, tuple[str, str, str]] = {}
+        for series_id, series_name, category, card_id, card_name, filename, rarity, weight, is_hidden in rows:
+            if is_hidden:
+                hidden[card_id] = (category, series_name, filename)
+                continue
+            entry = series_by_id.get(series_id)
+            if entry is None:
+                entry = series_by_id[series_id] = SeriesCards(series_id, series_name, category)
+            entry.card_ids.append(card_id)
+            entry.names.append(card_name)
+            entry.filenames.append(filename)
+            entry.rarities.append(rarity)
+            entry.weights.append(effective_weight(rarity, weight))
+            card_series[card_id] = series_id
+
+        # Só monta de novo a tabela de alias das séries cujas cartas ou pesos mudaram
+        rebuilt = 0
+        for series_id, entry in series_by_id.items():
+            old = self.series_by_id.get(series_id)
+            if old is not None and old.same_weights(entry):
+                entry.prob, entry.alias = old.prob, old.alias
+            else:
+                entry.build_table()
+                # Séries de pesos iguais sorteiam sem tabela: não contam
+                if entry.alias is not None:
+                    rebuilt += 1
+
+        self.series_by_id = series_by_id
+        self.card_series = card_series
+        self.hidden = hidden
+        self._reindex()
+        self.loaded = True
+        self.version += 1
+        print(
+            f"📚 Catálogo indexado: {len(series_by_id)} séries, {len(card_series)} cartas "
+            f"(+{len(hidden)} ocultas), "
+            f"{rebuilt} tabelas de sorteio montadas, ~{self.memory_bytes() / 1024:.1f} KiB"
+        )
+
+    def _reindex(self):
+        self.series_by_name = {s.name.casefold(): s for s in self.series_by_id.values()}
+        categories: dict[str, list[SeriesCards]] = {}
+        for entry in sorted(self.series_by_id.values(), key=lambda e: e.name.casefold()):
+            categories.setdefault(entry.category, []).append(entry)
+        self.categories = categories
+
+    def get_series(self, series_name: str):
+        return self.series_by_name.get(series_name.casefold())
+
+    def seed(self, value):
+        """Reinicia o gerador do sorteio (para testes reproduzíveis)."""
+        self.rng.seed(value)
+
+    def draw(self, series_name: str, rng=None):
+        """Retorna (card_id, card_name, filename, raridade) ou None se a série não existir/estiver vazia."""
+        entry = self.get_series(series_name)
+        if entry is None:
+            return None
+        return entry.draw(rng or self.rng)
+
+    def draw_many(self, series_name: str, n: int, rng=None) -> list:
+        """`n` sorteios independentes (com reposição); lista vazia se a série não existir."""
+        entry = self.get_series(series_name)
+        if entry is None:
+            return []
+        return entry.draw_many(n, rng or self.rng)
+
+    def card_rarity(self, card_id: int):
+        series_id = self.card_series.get(card_id)
+        if series_id is None:
+            return None
+        return self.series_by_id[series_id].rarity_of(card_id)
+
+    def exclude(self, card_ids):
+        """
+        Tira as cartas do sorteio na hora, sem esperar o próximo load(). Quem
+        apaga ou oculta cartas chama isto antes do COMMIT (dentro de
+        transaction()): um pull não sorteia uma carta que já não existe.
+        """
+        by_series: dict[int, set[int]] = {}
+        for card_id in card_ids:
+            series_id = self.card_series.pop(card_id, None)
+            if series_id is not None:
+                by_series.setdefault(series_id, set()).add(card_id)
+        for series_id, ids in by_series.items():
+            self.series_by_id[series_id].exclude(ids)
+        if by_series:
+            self.version += 1
+
+    @asynccontextmanager
+    async def transaction(self):
+        """db.transaction() que, se falhar, recarrega o índice (desfaz exclude() de cartas que continuam no banco)."""
+        try:
+            async with db.transaction() as conn:
+                yield conn
+        except Exception:
+            await self.load()
+            raise
+
+    def card_location(self, card_id: int):
+        """(categoria, série, arquivo) da carta, ou None se não estiver no índice."""
+        series_id = self.card_series.get(card_id)
+        if series_id is None:
+            return self.hidden.get(card_id)
+        entry = self.series_by_id[series_id]
+        try:
+            i = entry.card_ids.index(card_id)
+        except ValueError:
+            return None
+        return entry.category, entry.name, entry.filenames[i]
+
+    def memory_bytes(self) -> int:
+        total = sys.getsizeof(self.series_by_id) + sys.getsizeof(self.series_by_name)
+        total += sys.getsizeof(self.categories) + sys.getsizeof(self.card_series) + sys.getsizeof(self.hidden)
+        total += sum(s.memory_bytes() for s in self.series_by_id.values())
+        return total
+
+
+catalog = CatalogIndex()
+
+
+async def _reload_on_change(change):
+    # Operações de admin mudam várias séries de uma vez: recarrega o índice inteiro (uma query)
+    await catalog.load()
+
+
+events.subscribe(CATALOG_CHANGED, _reload_on_change)
@@ -0,0 +1,400 @@
+# database/catalog_sync.py
+import asyncio
+import hashlib
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from config import CARDS_DIR
+from database.models import db
+from database.catalog import catalog
+from database.rarity import RARITY_MANIFEST, read_manifest, resolve
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".gif")
+# Arquivos por lote de hash: entre lotes a sync pode ser cancelada e reporta progresso
+HASH_BATCH = 256
+
+# Sincronização do boot (em segundo plano) e a do agendador nunca rodam juntas:
+# as duas comparariam com o mesmo manifesto e aplicariam as mesmas cartas
+_lock = asyncio.Lock()
+
+
+@dataclass
+class SyncReport:
+    """Resumo do que a sincronização mudou no banco."""
+
+    scanned: int = 0
+    hashed: int = 0
+    series_added: list = field(default_factory=list)
+    series_moved: int = 0
+    cards_added: int = 0
+    cards_changed: int = 0
+    cards_removed: int = 0
+    series_removed: int = 0
+    rarities_changed: int = 0
+    progress_rebuilt: int = 0
+    seconds: float = 0.0
+
+    @property
+    def changed(self) -> bool:
+        return bool(
+            self.series_added or self.series_moved or self.cards_added or self.cards_changed
+            or self.cards_removed or self.series_removed or self.rarities_changed
+        )
+
+    def __str__(self):
+        return (
+            f"{self.scanned} arquivos lidos, {self.hashed} com hash recalculado | "
+            f"+{len(self.series_added)} séries, ~{self.series_moved} movidas/renomeadas, +{self.cards_added} cartas, "
+            f"~{self.cards_changed} alteradas, -{self.cards_removed} cartas, "
+            f"-{self.series_removed} séries, {self.rarities_changed} raridades, "
+            f"{self.progress_rebuilt} séries com progresso recalculado ({self.seconds:.2f}s)"
+        )
+
+
+def scan_assets(root: str) -> dict[str, tuple]:
+    """
+    Percorre CARDS_DIR/<categoria>/<série>/<arquivo> só com stat.
+    Retorna {caminho_relativo: (categoria, série, arquivo, mtime_ns, tamanho)}.
+    """
+    found = {}
+    owner = {}  # série (sem diferenciar maiúsculas, como o índice NOCASE) -> categoria onde apareceu primeiro
+    for cat in sorted(os.scandir(root), key=lambda e: e.name):
+        if not cat.is_dir():
+            continue
+        for ser in sorted(os.scandir(cat.path), key=lambda e: e.name):
+            if not ser.is_dir():
+                continue
+            first = owner.setdefault(ser.name.casefold(), (cat.name, ser.name))
+            if first != (cat.name, ser.name):
+                print(f"⚠️ Série '{ser.name}' repetida em '{cat.name}', ignorando (já existe em '{first[0]}/{first[1]}')")
+                continue
+            stems = set()
+            for f in os.scandir(ser.path):
+                if not f.name.lower().endswith(IMAGE_EXTS) or not f.is_file():
+                    continue
+                stem = Path(f.name).stem
+                if stem in stems:
+                    print(f"⚠️ Carta repetida ignorada: {cat.name}/{ser.name}/{f.name}")
+                    continue
+                stems.add(stem)
+                st = f.stat()
+                rel = f"{cat.name}/{ser.name}/{f.name}"
+                found[rel] = (cat.name, ser.name, f.name, st.st_mtime_ns, st.st_size)
+    return found
+
+
+def scan_rarity_manifests(root: str, series_dirs) -> dict[str, tuple]:
+    """{caminho_relativo: (categoria, série, mtime_ns, tamanho)} dos raridades.json existentes."""
+    found = {}
+    for category, series_name in series_dirs:
+        rel = f"{category}/{series_name}/{RARITY_MANIFEST}"
+        try:
+            st = os.stat(os.path.join(root, rel))
+        except OSError:
+            continue
+        found[rel] = (category, series_name, st.st_mtime_ns, st.st_size)
+    return found
+
+
+async def rebuild_series_progress(conn, series_ids):
+    """
+    Recalcula em lote user_series_progress das séries dadas a partir de
+    user_cards, e o series_started dos usuários afetados. Cartas ocultas não
+    contam (nem no que o usuário tem nem no tamanho da série).
+    """
+    ids = sorted(series_ids)
+    placeholders = ",".join("?" * len(ids))
+    cursor = await conn.execute(
+        f"SELECT DISTINCT user_id FROM user_series_progress WHERE series_id IN ({placeholders})", ids
+    )
+    users = {user_id for (user_id,) in await cursor.fetchall()}
+    await conn.execute(f"DELETE FROM user_series_progress WHERE series_id IN ({placeholders})", ids)
+    # Séries apagadas não voltam: o JOIN com series já não as encontra
+    await conn.execute(
+        f"""
+        INSERT INTO user_series_progress (user_id, series_id, series_name, owned, copies, series_size)
+        SELECT uc.user_id, s.id, s.name, COUNT(*), SUM(uc.quantity),
+               (SELECT COUNT(*) FROM cards WHERE cards.series_id = s.id AND cards.hidden = 0)
+        FROM cards c
+        JOIN series s ON s.id = c.series_id
+        JOIN user_cards uc ON uc.card_id = c.id
+        WHERE c.series_id IN ({placeholders}) AND c.hidden = 0
+        GROUP BY uc.user_id, s.id
+        """,
+        ids,
+    )
+    # Antes e depois: quem perdeu a série e quem passou a tê-la (carta que voltou ao sorteio)
+    cursor = await conn.execute(
+        f"SELECT DISTINCT user_id FROM user_series_progress WHERE series_id IN ({placeholders})", ids
+    )
+    users.update(user_id for (user_id,) in await cursor.fetchall())
+    if users:
+        await conn.executemany(
+            """
+            UPDATE user_wallet SET series_started = (
+                SELECT COUNT(*) FROM user_series_progress WHERE user_id = ?
+            ) WHERE user_id = ?
+            """,
+            [(user_id, user_id) for user_id in users],
+        )
+
+
+def _hash_files(root: str, rels) -> dict[str, str]:
+    hashes = {}
+    for rel in rels:
+        h = hashlib.sha1()
+        with open(os.path.join(root, rel), "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+        hashes[rel] = h.hexdigest()
+    return hashes
+
+
+async def sync_catalog(root: str = CARDS_DIR, progress=None) -> SyncReport:
+    """
+    Sincroniza o catálogo com a pasta de assets de forma incremental.
+
+    Compara mtime/tamanho de cada arquivo com o manifesto salvo no banco e só
+    calcula hash dos arquivos novos ou modificados. Todas as mudanças são
+    aplicadas com executemany numa única transação. Uma sincronização que
+    chega com outra em andamento espera ela terminar e então lê o manifesto já
+    atualizado.
+
+    `progress(etapa, feitos, total)`, se passado, é chamado após a varredura e
+    a cada lote de hashes.
+    """
+    async with _lock:
+        return await _sync_catalog(root, progress)
+
+
+async def _sync_catalog(root: str, progress) -> SyncReport:
+    started = time.perf_counter()
+    report = SyncReport()
+
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"Diretório de cartas não encontrado: {root}")
+
+    found = await asyncio.to_thread(scan_assets, root)
+    report.scanned = len(found)
+    if progress:
+        progress("varredura", len(found), len(found))
+    rarity_found = await asyncio.to_thread(
+        scan_rarity_manifests, root, {(cat, ser) for cat, ser, *_ in found.values()}
+    )
+
+    # O manifesto guarda as cartas e também os raridades.json (com card_id NULL)
+    manifest, rarity_manifest = {}, {}
+    for path, mtime_ns, size, content_hash, card_id in await db.fetchall(
+        "SELECT path, mtime_ns, size, content_hash, card_id FROM asset_manifest"
+    ):
+        target = rarity_manifest if path.endswith("/" + RARITY_MANIFEST) else manifest
+        target[path] = (mtime_ns, size, content_hash, card_id)
+
+    added = [rel for rel in found if rel not in manifest]
+    touched = [
+        rel for rel in found
+        if rel in manifest and manifest[rel][:2] != found[rel][3:]
+    ]
+    removed = [rel for rel in manifest if rel not in found]
+
+    rarity_changed = [
+        rel for rel in rarity_found
+        if rel not in rarity_manifest or rarity_manifest[rel][:2] != rarity_found[rel][2:]
+    ]
+    rarity_removed = [rel for rel in rarity_manifest if rel not in rarity_found]
+
+    pending = added + touched + rarity_changed
+    hashes = {}
+    for i in range(0, len(pending), HASH_BATCH):
+        hashes.update(await asyncio.to_thread(_hash_files, root, pending[i:i + HASH_BATCH]))
+        if progress:
+            progress("hash", len(hashes), len(pending))
+    report.hashed = len(hashes)
+    report.cards_changed = sum(1 for rel in touched if hashes[rel] != manifest[rel][2])
+
+    # Séries cujas raridades precisam ser reaplicadas: manifesto novo, alterado ou
+    # apagado, ou cartas novas numa série que tem manifesto
+    rarity_paths = {rel.split("/")[1]: rel for rel in rarity_changed + rarity_removed}
+    with_manifest = {ser: rel for rel, (_, ser, *_) in rarity_found.items()}
+    for rel in added:
+        series_name = found[rel][1]
+        if series_name in with_manifest:
+            rarity_paths.setdefault(series_name, with_manifest[series_name])
+    rarity_tables = await asyncio.to_thread(
+        lambda: {ser: read_manifest(os.path.join(root, rel)) for ser, rel in rarity_paths.items()}
+    )
+
+    # Se a transação falhar, o índice é recarregado (desfaz o catalog.exclude das cartas sem arquivo)
+    async with catalog.transaction() as conn:
+        # ---------- séries ---------- #
+        # Nomes comparados sem diferenciar maiúsculas, como o idx_series_name_nocase:
+        # pasta renomeada só na caixa é a mesma série, não uma nova
+        async def load_series():
+            cursor = await conn.execute("SELECT id, name, category FROM series")
+            return {name.casefold(): (series_id, name, category) for series_id, name, category in await cursor.fetchall()}
+
+        series = await load_series()
+        wanted = {}
+        for category, series_name, *_ in found.values():
+            wanted.setdefault(series_name.casefold(), (series_name, category))
+
+        # Só cria série para arquivo novo: pasta de série removida pelo admin continua no manifesto
+        added_series = {found[rel][1].casefold() for rel in added}
+        new_series = [value for key, value in wanted.items() if key not in series and key in added_series]
+        moved_series = [
+            (name, cat, series[key][0]) for key, (name, cat) in wanted.items()
+            if key in series and series[key][1:] != (name, cat)
+        ]
+        if new_series:
+            await conn.executemany("INSERT INTO series (name, category) VALUES (?, ?)", new_series)
+            report.series_added = [name for name, _ in new_series]
+        if moved_series:
+            await conn.executemany("UPDATE series SET name = ?, category = ? WHERE id = ?", moved_series)
+            report.series_moved = len(moved_series)
+        if new_series or moved_series:
+            series = await load_series()
+
+        # ---------- cartas novas ---------- #
+        card_ids = {}
+        # Séries que ganharam ou perderam cartas; as renomeadas também (o progresso guarda o nome)
+        resized = {series_id for _, _, series_id in moved_series}
+        if added:
+            cursor = await conn.execute(
+                "SELECT series_id, COALESCE(MAX(order_in_series), 0) FROM cards GROUP BY series_id"
+            )
+            next_order = dict(await cursor.fetchall())
+
+            affected = sorted({series[found[rel][1].casefold()][0] for rel in added})
+            placeholders = ",".join("?" * len(affected))
+            select_cards = f"SELECT series_id, card_name, id, filename FROM cards WHERE series_id IN ({placeholders})"
+            cursor = await conn.execute(select_cards, affected)
+            existing = {(series_id, name): rest for series_id, name, *rest in await cursor.fetchall()}
+
+            # Arquivo fora do manifesto de uma carta que já existe (banco antigo, extensão
+            # trocada, pasta renomeada) só passa a apontar para ela: não conta nem ganha ordem
+            rows, renamed = [], []
+            for rel in sorted(added):
+                _, series_name, filename, *_ = found[rel]
+                series_id = series[series_name.casefold()][0]
+                key = (series_id, Path(filename).stem)
+                if key in existing:
+                    card_id, current = existing[key]
+                    if current != filename:
+                        renamed.append((filename, card_id))
+                    continue
+                next_order[series_id] = next_order.get(series_id, 0) + 1
+                rows.append((series_id, key[1], filename, next_order[series_id]))
+
+            if renamed:
+                await conn.executemany("UPDATE cards SET filename = ? WHERE id = ?", renamed)
+                report.cards_changed += len(renamed)
+            if rows:
+                await conn.executemany(
+                    "INSERT INTO cards (series_id, card_name, filename, order_in_series) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                report.cards_added = len(rows)
+                resized.update(row[0] for row in rows)
+                cursor = await conn.execute(select_cards, affected)
+                existing = {(series_id, name): rest for series_id, name, *rest in await cursor.fetchall()}
+            card_ids = {key: card_id for key, (card_id, _) in existing.items()}
+
+        # ---------- raridades ---------- #
+        # Manifesto inválido (None) mantém as raridades atuais da série
+        valid = {
+            series[ser.casefold()][0]: table for ser, table in rarity_tables.items()
+            if table is not None and ser.casefold() in series
+        }
+        if valid:
+            placeholders = ",".join("?" * len(valid))
+            cursor = await conn.execute(
+                f"SELECT id, series_id, card_name FROM cards WHERE series_id IN ({placeholders})",
+                list(valid),
+            )
+            updates = []
+            for card_id, series_id, card_name in await cursor.fetchall():
+                rarity, weight = resolve(valid[series_id], card_name)
+                updates.append((rarity, weight, card_id, rarity, weight))
+            cursor = await conn.executemany(
+                "UPDATE cards SET rarity = ?, weight = ? WHERE id = ? AND (rarity IS NOT ? OR weight IS NOT ?)",
+                updates,
+            )
+            report.rarities_changed = max(cursor.rowcount, 0)
+
+        # ---------- manifesto ---------- #
+        manifest_rows = []
+        for rel in added:
+            _, series_name, filename, mtime_ns, size = found[rel]
+            card_id = card_ids[(series[series_name.casefold()][0], Path(filename).stem)]
+            manifest_rows.append((rel, mtime_ns, size, hashes[rel], card_id))
+        for rel in touched:
+            _, _, _, mtime_ns, size = found[rel]
+            manifest_rows.append((rel, mtime_ns, size, hashes[rel], manifest[rel][3]))
+        for rel in rarity_changed:
+            _, _, mtime_ns, size = rarity_found[rel]
+            manifest_rows.append((rel, mtime_ns, size, hashes[rel], None))
+        if manifest_rows:
+            await conn.executemany(
+                """
+                INSERT INTO asset_manifest (path, mtime_ns, size, content_hash, card_id)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    mtime_ns = excluded.mtime_ns,
+                    size = excluded.size,
+                    content_hash = excluded.content_hash,
+                    card_id = excluded.card_id
+                """,
+                manifest_rows,
+            )
+
+        # ---------- remoções ---------- #
+        if removed or rarity_removed:
+            await conn.executemany(
+                "DELETE FROM asset_manifest WHERE path = ?", [(rel,) for rel in removed + rarity_removed]
+            )
+
+        # Cartas sem arquivo: as que saíram do manifesto e as antigas que nunca estiveram nele
+        cursor = await conn.execute(
+            """
+            SELECT id, series_id FROM cards
+            WHERE id NOT IN (SELECT card_id FROM asset_manifest WHERE card_id IS NOT NULL)
+            """
+        )
+        gone = []
+        for card_id, series_id in await cursor.fetchall():
+            gone.append((card_id,))
+            resized.add(series_id)
+        if gone:
+            await conn.executemany(
+                """
+                UPDATE user_wallet SET distinct_cards = distinct_cards - 1, inventory_version = inventory_version + 1
+                WHERE user_id IN (SELECT user_id FROM user_cards WHERE card_id = ?)
+                """,
+                gone,
+            )
+            # user_cards sai junto via ON DELETE CASCADE
+            await conn.executemany("DELETE FROM cards WHERE id = ?", gone)
+            await conn.executemany(
+                "DELETE FROM media_cache WHERE media_key = ?", [(f"card:{card_id}",) for (card_id,) in gone]
+            )
+            report.cards_removed = len(gone)
+            # Fora do sorteio já antes do COMMIT: um pull em andamento não pega carta apagada
+            catalog.exclude(card_id for (card_id,) in gone)
+
+        cursor = await conn.execute(
+            "DELETE FROM series WHERE id NOT IN (SELECT DISTINCT series_id FROM cards)"
+        )
+        report.series_removed = cursor.rowcount
+
+        # ---------- progresso por série ---------- #
+        if resized:
+            await rebuild_series_progress(conn, resized)
+            report.progress_rebuilt = len(resized)
+
+    report.seconds = time.perf_counter() - started
+
+    if report.changed or not catalog.loaded:
+        await catalog.load()
+    return report
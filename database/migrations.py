@@ -0,0 +1,297 @@
+# database/migrations.py
+"""
+Migrações versionadas do banco.
+
+A versão aplicada fica em PRAGMA user_version. Cada migração é uma função
+`async def (conn)` que recebe a conexão de escrita já dentro da transação;
+todas as pendentes rodam numa única transação, então um banco antigo é
+atualizado por inteiro ou não é tocado. Para mudar o esquema, acrescente uma
+nova função ao final de MIGRATIONS (nunca edite uma que já foi publicada).
+"""
+import time
+
+from database.models import db
+
+
+async def _columns(conn, table: str) -> set[str]:
+    cursor = await conn.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in await cursor.fetchall()}
+
+
+async def _run_script(conn, script: str):
+    for statement in script.split(";"):
+        if statement.strip():
+            await conn.execute(statement)
+
+
+# ---------- 1: esquema original ---------- #
+async def _v1_initial_schema(conn):
+    await _run_script(
+        conn,
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT UNIQUE NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS series (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS cards (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            series_id INTEGER NOT NULL,
+            card_name TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            order_in_series INTEGER,
+            FOREIGN KEY (series_id) REFERENCES series(id),
+            UNIQUE(series_id, card_name)
+        );
+
+        CREATE TABLE IF NOT EXISTS user_cards (
+            user_id INTEGER,
+            card_id INTEGER,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, card_id),
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (card_id) REFERENCES cards(id)
+        );
+
+        CREATE TABLE IF NOT EXISTS user_wallet (
+            user_id INTEGER PRIMARY KEY,
+            total_pulls INTEGER DEFAULT 0,
+            last_diaria TIMESTAMP NULL,
+            last_horaria TIMESTAMP NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        );
+
+        CREATE TABLE IF NOT EXISTS media_cache (
+            media_key TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            file_id TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS asset_manifest (
+            path TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            card_id INTEGER
+        )
+        """,
+    )
+
+
+# ---------- 2: categoria, nome denormalizado e contador de distintas ---------- #
+async def _v2_catalog_and_counters(conn):
+    # Bancos criados pelo antigo init_db podem já ter alguma destas colunas
+    if "category" not in await _columns(conn, "series"):
+        await conn.execute("ALTER TABLE series ADD COLUMN category TEXT")
+
+    if "card_name" not in await _columns(conn, "user_cards"):
+        await conn.execute("ALTER TABLE user_cards ADD COLUMN card_name TEXT")
+        await conn.execute(
+            "UPDATE user_cards SET card_name = (SELECT card_name FROM cards WHERE cards.id = user_cards.card_id)"
+        )
+
+    if "distinct_cards" not in await _columns(conn, "user_wallet"):
+        await conn.execute("ALTER TABLE user_wallet ADD COLUMN distinct_cards INTEGER NOT NULL DEFAULT 0")
+        await conn.execute(
+            """
+            UPDATE user_wallet SET distinct_cards = (
+                SELECT COUNT(*) FROM user_cards WHERE user_cards.user_id = user_wallet.user_id
+            )
+            """
+        )
+
+
+# ---------- 3: índices NOCASE e ON DELETE CASCADE ---------- #
+async def _v3_indexes_and_cascade(conn):
+    await _run_script(
+        conn,
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username_nocase
+            ON users (username COLLATE NOCASE);
+
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_series_name_nocase
+            ON series (name COLLATE NOCASE);
+
+        CREATE INDEX IF NOT EXISTS idx_cards_series_order
+            ON cards (series_id, order_in_series);
+
+        DELETE FROM user_cards WHERE card_id NOT IN (SELECT id FROM cards);
+
+        CREATE TABLE user_cards_new (
+            user_id INTEGER NOT NULL,
+            card_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            card_name TEXT,
+            PRIMARY KEY (user_id, card_id),
+            FOREIGN KEY (card_id) REFERENCES cards(id) ON DELETE CASCADE
+        );
+        INSERT INTO user_cards_new (user_id, card_id, quantity, card_name)
+            SELECT user_id, card_id, quantity, card_name FROM user_cards;
+        DROP TABLE user_cards;
+        ALTER TABLE user_cards_new RENAME TO user_cards;
+
+        CREATE INDEX idx_user_cards_inventory
+            ON user_cards (user_id, card_name, card_id, quantity);
+        CREATE INDEX idx_user_cards_card
+            ON user_cards (card_id);
+
+        CREATE TABLE user_wallet_new (
+            user_id INTEGER PRIMARY KEY,
+            total_pulls INTEGER NOT NULL DEFAULT 0,
+            last_diaria TIMESTAMP NULL,
+            last_horaria TIMESTAMP NULL,
+            distinct_cards INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT INTO user_wallet_new (user_id, total_pulls, last_diaria, last_horaria, distinct_cards)
+            SELECT user_id, COALESCE(total_pulls, 0), last_diaria, last_horaria, distinct_cards
+            FROM user_wallet;
+        DROP TABLE user_wallet;
+        ALTER TABLE user_wallet_new RENAME TO user_wallet
+        """,
+    )
+    # O contador pode ter ficado alto se havia linhas órfãs
+    await conn.execute(
+        """
+        UPDATE user_wallet SET distinct_cards = (
+            SELECT COUNT(*) FROM user_cards WHERE user_cards.user_id = user_wallet.user_id
+        )
+        """
+    )
+
+
+# ---------- 4: contadores das janelas de cota ---------- #
+async def _v4_quota_counters(conn):
+    await conn.execute("ALTER TABLE user_wallet ADD COLUMN pulls_horaria INTEGER NOT NULL DEFAULT 0")
+    await conn.execute("ALTER TABLE user_wallet ADD COLUMN pulls_diaria INTEGER NOT NULL DEFAULT 0")
+
+
+# ---------- 5: raridade e peso das cartas ---------- #
+async def _v5_card_rarity(conn):
+    await conn.execute("ALTER TABLE cards ADD COLUMN rarity TEXT NOT NULL DEFAULT 'comum'")
+    # NULL = usa o peso do nível (RARITY_WEIGHTS)
+    await conn.execute("ALTER TABLE cards ADD COLUMN weight REAL")
+
+
+# ---------- 6: progresso por série ---------- #
+async def _v6_series_progress(conn):
+    await _run_script(
+        conn,
+        """
+        CREATE TABLE user_series_progress (
+            user_id INTEGER NOT NULL,
+            series_id INTEGER NOT NULL,
+            series_name TEXT NOT NULL,
+            owned INTEGER NOT NULL DEFAULT 0,
+            copies INTEGER NOT NULL DEFAULT 0,
+            series_size INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, series_id)
+        ) WITHOUT ROWID;
+
+        CREATE INDEX idx_user_series_progress_page
+            ON user_series_progress (user_id, series_name, series_id, owned, copies, series_size);
+        CREATE INDEX idx_user_series_progress_series
+            ON user_series_progress (series_id);
+
+        ALTER TABLE user_wallet ADD COLUMN series_started INTEGER NOT NULL DEFAULT 0
+        """,
+    )
+    await conn.execute(
+        """
+        INSERT INTO user_series_progress (user_id, series_id, series_name, owned, copies, series_size)
+        SELECT uc.user_id, s.id, s.name, COUNT(*), SUM(uc.quantity),
+               (SELECT COUNT(*) FROM cards WHERE cards.series_id = s.id)
+        FROM user_cards uc
+        JOIN cards c ON c.id = uc.card_id
+        JOIN series s ON s.id = c.series_id
+        GROUP BY uc.user_id, s.id
+        """
+    )
+    await conn.execute(
+        """
+        UPDATE user_wallet SET series_started = (
+            SELECT COUNT(*) FROM user_series_progress p WHERE p.user_id = user_wallet.user_id
+        )
+        """
+    )
+
+
+# ---------- 7: versão do inventário ---------- #
+async def _v7_inventory_version(conn):
+    # Sobe a cada mudança no inventário do usuário; invalida a colagem em cache
+    await conn.execute("ALTER TABLE user_wallet ADD COLUMN inventory_version INTEGER NOT NULL DEFAULT 0")
+
+
+# ---------- 8: cartas ocultas ---------- #
+async def _v8_hidden_cards(conn):
+    # Carta oculta sai do sorteio e do tamanho da série, mas continua nos inventários
+    await conn.execute("ALTER TABLE cards ADD COLUMN hidden INTEGER NOT NULL DEFAULT 0")
+
+
+# ---------- 9: limpeza das colagens do inventário ---------- #
+async def _v9_inventory_media_cleanup(conn):
+    # Os file_ids das colagens (inv:<usuário>:<página>) só valem para uma versão do
+    # inventário: quando ela muda, as linhas do usuário saem (faixa na chave primária)
+    await conn.execute(
+        """
+        CREATE TRIGGER trg_user_wallet_inventory_media
+        AFTER UPDATE OF inventory_version ON user_wallet
+        WHEN NEW.inventory_version IS NOT OLD.inventory_version
+        BEGIN
+            DELETE FROM media_cache
+            WHERE media_key >= 'inv:' || NEW.user_id || ':' AND media_key < 'inv:' || NEW.user_id || ';';
+        END
+        """
+    )
+    # As que já se acumularam: é só cache, a próxima visita gera de novo
+    await conn.execute("DELETE FROM media_cache WHERE media_key >= 'inv:' AND media_key < 'inv;'")
+
+
+MIGRATIONS = [
+    (1, "esquema inicial", _v1_initial_schema),
+    (2, "categoria das séries e contadores do inventário", _v2_catalog_and_counters),
+    (3, "índices NOCASE e ON DELETE CASCADE", _v3_indexes_and_cascade),
+    (4, "contadores de pulls por hora e por dia", _v4_quota_counters),
+    (5, "raridade e peso das cartas", _v5_card_rarity),
+    (6, "progresso dos usuários por série", _v6_series_progress),
+    (7, "versão do inventário", _v7_inventory_version),
+    (8, "cartas ocultas", _v8_hidden_cards),
+    (9, "limpeza das colagens do inventário", _v9_inventory_media_cleanup),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+async def run_migrations():
+    """Aplica as migrações pendentes numa única transação e liga as foreign keys."""
+    current = (await db.fetchone("PRAGMA user_version"))[0]
+    pending = [m for m in MIGRATIONS if m[0] > current]
+    if not pending:
+        await db.writer.execute("PRAGMA foreign_keys=ON")
+        return
+
+    started = time.perf_counter()
+    # foreign_keys só pode mudar fora de transação; desligado, a reconstrução
+    # das tabelas não dispara os CASCADE
+    await db.writer.execute("PRAGMA foreign_keys=OFF")
+    try:
+        async with db.transaction() as conn:
+            for version, description, migrate in pending:
+                print(f"🛠️ Migração {version}: {description}")
+                await migrate(conn)
+            cursor = await conn.execute("PRAGMA foreign_key_check(user_cards)")
+            problems = await cursor.fetchall()
+            if problems:
+                raise RuntimeError(f"Migração deixaria chaves estrangeiras inválidas: {problems[:5]}")
+            await conn.execute(f"PRAGMA user_version = {pending[-1][0]}")
+    finally:
+        await db.writer.execute("PRAGMA foreign_keys=ON")
+
+    print(
+        f"✅ Banco migrado da versão {current} para {pending[-1][0]} "
+        f"em {time.perf_counter() - started:.2f}s"
+    )
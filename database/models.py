@@ -0,0 +1,132 @@
+# database/models.py
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import aiosqlite
+
+import config
+from config import DB_FILE
+from utils.metrics import count_roundtrip
+
+# Ajustes opcionais via config.py
+MMAP_SIZE = getattr(config, "DB_MMAP_SIZE", 256 * 1024 * 1024)
+CACHED_STATEMENTS = getattr(config, "DB_CACHED_STATEMENTS", 256)
+BUSY_TIMEOUT_MS = getattr(config, "DB_BUSY_TIMEOUT_MS", 5000)
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA mmap_size={MMAP_SIZE}",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+class Database:
+    """
+    Camada única de acesso ao SQLite.
+
+    Mantém duas conexões abertas durante toda a vida do bot: uma só para
+    escrita (serializada por um lock) e outra para leitura, que no modo WAL
+    não bloqueia nem é bloqueada pelo escritor. O sqlite3 guarda as queries
+    preparadas de cada conexão (cached_statements).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.writer: aiosqlite.Connection | None = None
+        self.reader: aiosqlite.Connection | None = None
+        self._write_lock = asyncio.Lock()
+        # métricas: idas ao banco e tempo gasto (transação inclui a espera pelo lock)
+        self.reads = 0
+        self.read_seconds = 0.0
+        self.transactions = 0
+        self.transaction_seconds = 0.0
+
+    async def _open(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(
+            self.path, isolation_level=None, cached_statements=CACHED_STATEMENTS
+        )
+        for pragma in PRAGMAS:
+            await conn.execute(pragma)
+        return conn
+
+    async def connect(self):
+        if self.writer is not None:
+            return
+        # O escritor abre primeiro para que o journal_mode=WAL já esteja ativo
+        self.writer = await self._open()
+        self.reader = await self._open()
+        await self.reader.execute("PRAGMA query_only=ON")
+        print(f"🗄️ Banco aberto em modo WAL: {self.path}")
+
+    async def close(self):
+        async with self._write_lock:
+            for conn in (self.reader, self.writer):
+                if conn is not None:
+                    await conn.close()
+            self.reader = self.writer = None
+        print("🗄️ Banco fechado")
+
+    # ---------- leitura ---------- #
+    async def fetchone(self, sql: str, params=()):
+        rows = await self.fetchall(sql, params)
+        return rows[0] if rows else None
+
+    async def fetchall(self, sql: str, params=()):
+        count_roundtrip()
+        started = time.perf_counter()
+        try:
+            return list(await self.reader.execute_fetchall(sql, params))
+        finally:
+            self.reads += 1
+            self.read_seconds += time.perf_counter() - started
+
+    # ---------- escrita ---------- #
+    @asynccontextmanager
+    async def transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT na conexão de escrita, com rollback em caso de erro."""
+        count_roundtrip()
+        started = time.perf_counter()
+        async with self._write_lock:
+            await self.writer.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.writer
+            except BaseException:
+                await self.writer.execute("ROLLBACK")
+                raise
+            else:
+                await self.writer.execute("COMMIT")
+            finally:
+                self.transactions += 1
+                self.transaction_seconds += time.perf_counter() - started
+
+    async def execute(self, sql: str, params=()) -> int:
+        """Executa uma única escrita em sua própria transação. Retorna o rowcount."""
+        async with self.transaction() as conn:
+            cursor = await conn.execute(sql, params)
+            return cursor.rowcount
+
+    def stats(self) -> dict:
+        return {
+            "reads": self.reads,
+            "read_seconds": round(self.read_seconds, 4),
+            "transactions": self.transactions,
+            "transaction_seconds": round(self.transaction_seconds, 4),
+        }
+
+    async def maintenance(self):
+        """Checkpoint do WAL e PRAGMA optimize, fora de transação. Retorna o resultado do checkpoint."""
+        async with self._write_lock:
+            rows = await self.writer.execute_fetchall("PRAGMA wal_checkpoint(PASSIVE)")
+            await self.writer.execute("PRAGMA optimize")
+        return tuple(rows[0]) if rows else None
+
+    async def executescript(self, script: str):
+        async with self._write_lock:
+            await self.writer.executescript(script)
+
+
+db = Database(DB_FILE)
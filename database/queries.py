@@ -1,223 +1,389 @@
-import aiosqlite
-import os
-import random
-from pathlib import Path
-from config import DB_FILE, CARDS_DIR
-from utils.image_cache import load_image
+import sqlite3
+from typing import NamedTuple
+from database.models import db
+from database.catalog import catalog
+from database.ranking import ranking
+from database.writer import writer
+from database.catalog_sync import sync_catalog
+from utils.metrics import timed_query
 
-
-# ---------- FUNÇÕES DATABASE ---------- #
-async def init_db():
-    """Cria as tabelas se ainda não existirem."""
-    async with aiosqlite.connect(DB_FILE) as db:
-        await db.executescript(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                username TEXT UNIQUE NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS series (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS cards (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                series_id INTEGER NOT NULL,
-                card_name TEXT NOT NULL,
-                filename TEXT NOT NULL,
-                order_in_series INTEGER,
-                FOREIGN KEY (series_id) REFERENCES series(id),
-                UNIQUE(series_id, card_name)
-            );
-
-            CREATE TABLE IF NOT EXISTS user_cards (
-                user_id INTEGER,
-                card_id INTEGER,
-                quantity INTEGER NOT NULL DEFAULT 0,
-                PRIMARY KEY (user_id, card_id),
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (card_id) REFERENCES cards(id)
-            );
-            
-            CREATE TABLE IF NOT EXISTS user_wallet (
-                user_id INTEGER PRIMARY KEY,
-                total_pulls INTEGER DEFAULT 0,
-                last_diaria TIMESTAMP NULL,
-                last_horaria TIMESTAMP NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            );
-            """
-        )
-        await db.commit()
+# Tentativas de sortear de novo quando a carta sorteada foi apagada antes de ser gravada
+PULL_ATTEMPTS = 3
 
 
+# ---------- FUNÇÕES DATABASE ---------- #
+@timed_query
 async def add_user(user_id: int, username: str) -> bool:
     """Tenta inserir um novo usuário. Retorna True se OK, False se username existir."""
-    async with aiosqlite.connect(DB_FILE) as db:
-        cursor = await db.execute(
-            "SELECT 1 FROM users WHERE LOWER(username)=LOWER(?)", (username,)
+    async with db.transaction() as conn:
+        cursor = await conn.execute(
+            "SELECT 1 FROM users WHERE username = ? COLLATE NOCASE", (username,)
         )
         row = await cursor.fetchone()
         if row:
             return False
-        await db.execute(
+        await conn.execute(
             "INSERT INTO users (id, username) VALUES (?, ?)", (user_id, username)
         )
-        await db.commit()
         return True
+
+
+@timed_query
+async def get_username(user_id: int):
+    row = await db.fetchone("SELECT username FROM users WHERE id = ?", (user_id,))
+    return row[0] if row else None
     
     
-async def load_series_and_cards():
+@timed_query
+async def get_usernames(user_ids) -> dict[int, str]:
+    """{user_id: username} dos IDs dados que têm nome definido, numa única query."""
+    ids = list(user_ids)
+    if not ids:
+        return {}
+    rows = await db.fetchall(
+        f"SELECT id, username FROM users WHERE id IN ({','.join('?' * len(ids))})", ids
+    )
+    return dict(rows)
+
+
+@timed_query
+async def load_series_and_cards(progress=None):
+    """Sincroniza séries e cartas com a pasta de assets (só aplica o que mudou)."""
     print("Iniciando carga de séries e cartas...")
-    
-    # Verificação inicial da pasta principal
-    if not os.path.exists(CARDS_DIR):
-        raise FileNotFoundError(f"Diretório de cartas não encontrado: {CARDS_DIR}")
-
-    async with aiosqlite.connect(DB_FILE) as db:
-        # Primeiro loop: processa apenas diretórios válidos
-        for series_name in os.listdir(CARDS_DIR):
-            series_path = os.path.join(CARDS_DIR, series_name)
-            
-            if not os.path.isdir(series_path):  # Ignora arquivos
-                print(f"Ignorando arquivo: {series_name}")
-                continue
-
-            print(f"Processando série: {series_name}")
-            
-            try:
-                # Insere a série no banco
-                await db.execute(
-                    "INSERT OR IGNORE INTO series (name) VALUES (?)",
-                    (series_name,),
-                )
-                await db.commit()
-
-                # Obtém o ID da série
-                cursor = await db.execute(
-                    "SELECT id FROM series WHERE name = ?", (series_name,)
-                )
-                series_row = await cursor.fetchone()
-                if not series_row:
-                    print(f"Erro ao obter ID para série: {series_name}")
-                    continue
-                    
-                series_id = series_row[0]
-
-                # Processa as cartas
-                card_count = 0
-                for filename in os.listdir(series_path):
-                    if not filename.lower().endswith((".png", ".jpg", ".jpeg", ".gif")):
-                        continue
-                        
-                    card_name = Path(filename).stem
-                    card_count += 1
-
-                    await db.execute(
-                        """
-                        INSERT OR IGNORE INTO cards 
-                        (series_id, card_name, filename, order_in_series)
-                        VALUES (?, ?, ?, ?)
-                        """,
-                        (series_id, card_name, filename, card_count),
-                    )
-                
-                await db.commit()
-                print(f"✅ {series_name}: {card_count} cartas processadas")
-
-            except Exception as e:
-                print(f"❌ Erro na série {series_name}: {str(e)}")
-                continue
-
-    # Pré-carregamento separado (opcional)
-    print("Pré-carregando imagens...")
-    for series in os.listdir(CARDS_DIR):
-        series_path = os.path.join(CARDS_DIR, series)
-        if os.path.isdir(series_path):
-            for card in os.listdir(series_path):
-                if card.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    try:
-                        load_image(os.path.join(series_path, card))
-                    except Exception as e:
-                        print(f"Erro ao pré-carregar {card}: {e}")
+    report = await sync_catalog(progress=progress)
+    print(f"✅ Catálogo sincronizado: {report}")
+    return report
 
 
+@timed_query
 async def pull_card_from_series(user_id: int, series_name: str):
-    async with aiosqlite.connect(DB_FILE) as db:
-        # Pega o id da série
-        cursor = await db.execute(
-            "SELECT id FROM series WHERE LOWER(name) = LOWER(?)",
-            (series_name,)
-        )
-        row = await cursor.fetchone()
-        if not row:
-            return None, None, None
-        series_id = row[0]
+    """Sorteia uma carta da série, ponderada pela raridade, usando o índice em memória (sem SQL)."""
+    card = catalog.draw(series_name)
+    if card is None:
+        return None, None, None, None
+    return card
+
+
+class PullResult(NamedTuple):
+    card_id: int
+    card_name: str
+    filename: str
+    quantity: int
+    rarity: str
 
-        # Busca cartas da série, ordenadas por order_in_series
-        cursor = await db.execute(
+
+async def _record_pulls(user_id: int, series, draws):
+    """Grava os sorteios numa operação da fila de escrita. Retorna (contagens, quantidades, totais)."""
+    # card_id -> (nome, vezes sorteada no lote)
+    counts: dict[int, list] = {}
+    for card_id, card_name, _, _ in draws:
+        entry = counts.get(card_id)
+        if entry is None:
+            counts[card_id] = [card_name, 1]
+        else:
+            entry[1] += 1
+
+    async def op(conn):
+        params = []
+        for card_id, (card_name, k) in counts.items():
+            params += (user_id, card_id, card_name, k)
+        cursor = await conn.execute(
+            f"""
+            INSERT INTO user_cards (user_id, card_id, card_name, quantity)
+            VALUES {", ".join(["(?, ?, ?, ?)"] * len(counts))}
+            ON CONFLICT(user_id, card_id)
+            DO UPDATE SET quantity = quantity + excluded.quantity
+            RETURNING card_id, quantity;
+            """,
+            params,
+        )
+        quantities = dict(await cursor.fetchall())
+        # Contador de cartas distintas mantido aqui para o inventário não precisar de COUNT(*)
+        novas = sum(1 for card_id, (_, k) in counts.items() if quantities[card_id] == k)
+        # Progresso materializado da série, para o /colecao não precisar de JOIN
+        cursor = await conn.execute(
+            """
+            INSERT INTO user_series_progress (user_id, series_id, series_name, owned, copies, series_size)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, series_id)
+            DO UPDATE SET owned = owned + excluded.owned,
+                          copies = copies + excluded.copies,
+                          series_size = excluded.series_size
+            RETURNING copies, owned;
+            """,
+            (user_id, series.id, series.name, novas, len(draws), len(series)),
+        )
+        copies, owned = await cursor.fetchone()
+        cursor = await conn.execute(
             """
-            SELECT id, card_name, filename
-            FROM cards
-            WHERE series_id = ?
-            ORDER BY order_in_series ASC
+            INSERT INTO user_wallet (user_id, total_pulls, distinct_cards, series_started, inventory_version)
+            VALUES (?, ?, ?, ?, 1)
+            ON CONFLICT(user_id)
+            DO UPDATE SET total_pulls = total_pulls + excluded.total_pulls,
+                          distinct_cards = distinct_cards + excluded.distinct_cards,
+                          series_started = series_started + excluded.series_started,
+                          inventory_version = inventory_version + 1
+            RETURNING total_pulls, distinct_cards;
             """,
-            (series_id,)
+            (user_id, len(draws), novas, int(copies == len(draws))),
         )
-        cards = await cursor.fetchall()
-        if not cards:
-            return None, None, None
+        total_pulls, distinct_cards = await cursor.fetchone()
+        return quantities, (total_pulls, distinct_cards, owned)
+
+    # Vai para a fila de escrita, que agrupa vários pulls num único commit
+    quantities, totals = await writer.submit(op)
+    return counts, quantities, totals
+
+
+@timed_query
+async def pull_cards(user_id: int, series_name: str, n: int) -> list[PullResult]:
+    """
+    Sorteia `n` cartas da série e registra todas numa única operação da fila
+    de escrita: um só INSERT multi-linha em user_cards (cartas repetidas no
+    lote viram uma linha com a soma), o progresso da série em
+    user_series_progress e um só UPDATE em user_wallet.
+    Devolve um PullResult por sorteio, na ordem, com a quantidade que o
+    usuário passou a ter após aquele sorteio; lista vazia se a série não existir.
+    Se uma carta sorteada for apagada antes da gravação, sorteia de novo.
+    """
+    for attempt in range(PULL_ATTEMPTS):
+        series = catalog.get_series(series_name)
+        draws = catalog.draw_many(series_name, n)
+        if not draws:
+            return []
+        try:
+            counts, quantities, (total_pulls, distinct_cards, owned) = await _record_pulls(user_id, series, draws)
+            break
+        except sqlite3.IntegrityError:
+            # Carta apagada entre o sorteio e a gravação (admin/sync): sorteia de novo com o índice já sem ela
+            if attempt == PULL_ATTEMPTS - 1:
+                raise
+
+    # Valores absolutos vindos do banco: o ranking não acumula erro entre pulls
+    ranking.record_pull(user_id, series.id, total_pulls, distinct_cards, owned)
+
+    # Quantidade após cada sorteio: a primeira cópia do lote vale (total - k + 1)
+    running = {card_id: quantities[card_id] - k for card_id, (_, k) in counts.items()}
+    results = []
+    for card_id, card_name, filename, rarity in draws:
+        running[card_id] += 1
+        results.append(PullResult(card_id, card_name, filename, running[card_id], rarity))
+    return results
+
 
-        # Sorteia uma carta
-        card = random.choice(cards)
-        card_id, card_name, filename = card
-        return card_id, card_name, filename
+# Sem @timed_query: o tempo já entra em pull_cards
+async def pull_card(user_id: int, series_name: str):
+    """
+    Sorteia e registra uma carta: incrementa user_cards, soma o pull em
+    user_wallet e devolve o PullResult (None se a série não existir).
+    """
+    results = await pull_cards(user_id, series_name, 1)
+    return results[0] if results else None
 
 
-async def add_card_to_user(user_id, card_id):
-    async with aiosqlite.connect(DB_FILE) as db:
-        await db.execute(
+@timed_query
+async def get_user_inventory(user_id: int, limit: int, after: int = None, before: int = None):
+    """
+    Uma página do inventário em ordem (nome, id), paginada por keyset.
+
+    `after`/`before` são o card_id da última/primeira carta da página atual;
+    o nome correspondente é buscado pela chave primária. Retorna as linhas
+    (card_id, card_name, quantidade), o total de cartas distintas do usuário
+    e a versão do inventário (muda a cada alteração; chave do cache da colagem).
+    """
+    if before is not None:
+        rows = await db.fetchall(
             """
-            INSERT INTO user_cards (user_id, card_id, quantity)
-            VALUES (?, ?, 1)
-            ON CONFLICT(user_id, card_id)
-            DO UPDATE SET quantity = quantity + 1;
+            SELECT card_id, card_name, quantity
+            FROM user_cards
+            WHERE user_id = ?
+              AND (card_name, card_id) < (
+                  (SELECT card_name FROM user_cards WHERE user_id = ? AND card_id = ?), ?
+              )
+            ORDER BY card_name DESC, card_id DESC
+            LIMIT ?
+            """,
+            (user_id, user_id, before, before, limit),
+        )
+        rows.reverse()
+    elif after is not None:
+        rows = await db.fetchall(
+            """
+            SELECT card_id, card_name, quantity
+            FROM user_cards
+            WHERE user_id = ?
+              AND (card_name, card_id) > (
+                  (SELECT card_name FROM user_cards WHERE user_id = ? AND card_id = ?), ?
+              )
+            ORDER BY card_name, card_id
+            LIMIT ?
+            """,
+            (user_id, user_id, after, after, limit),
+        )
+    else:
+        rows = await db.fetchall(
+            """
+            SELECT card_id, card_name, quantity
+            FROM user_cards
+            WHERE user_id = ?
+            ORDER BY card_name, card_id
+            LIMIT ?
             """,
-            (user_id, card_id),
+            (user_id, limit),
         )
-        await db.commit()
+
+    wallet = await db.fetchone(
+        "SELECT distinct_cards, inventory_version FROM user_wallet WHERE user_id = ?", (user_id,)
+    )
+    total, version = wallet if wallet else (0, 0)
+    return rows, total, version
 
 
-async def get_card_count_for_user(user_id, card_id):
-    async with aiosqlite.connect(DB_FILE) as db:
-        cursor = await db.execute(
-            "SELECT quantity FROM user_cards WHERE user_id=? AND card_id=?",
-            (user_id, card_id),
+@timed_query
+async def get_series_progress(user_id: int, limit: int, after: int = None, before: int = None):
+    """
+    Uma página do progresso por série em ordem (nome, id), paginada por keyset
+    como o inventário (`after`/`before` = series_id). Uma única leitura no
+    índice de user_series_progress; o total de séries vem na mesma query.
+    Retorna as linhas (series_id, nome, distintas, cópias, tamanho) e o total.
+    """
+    if before is not None:
+        where, order, params = (
+            "AND (series_name, series_id) < ((SELECT series_name FROM user_series_progress "
+            "WHERE user_id = ? AND series_id = ?), ?)",
+            "DESC",
+            (user_id, before, before),
         )
-        row = await cursor.fetchone()
-    return row[0] if row else 0
+    elif after is not None:
+        where, order, params = (
+            "AND (series_name, series_id) > ((SELECT series_name FROM user_series_progress "
+            "WHERE user_id = ? AND series_id = ?), ?)",
+            "",
+            (user_id, after, after),
+        )
+    else:
+        where, order, params = "", "", ()
+
+    rows = await db.fetchall(
+        f"""
+        SELECT series_id, series_name, owned, copies, series_size,
+               (SELECT series_started FROM user_wallet WHERE user_id = ?)
+        FROM user_series_progress
+        WHERE user_id = ? {where}
+        ORDER BY series_name {order}, series_id {order}
+        LIMIT ?
+        """,
+        (user_id, user_id, *params, limit),
+    )
+    if before is not None:
+        rows.reverse()
+    total = rows[0][5] if rows else 0
+    return [row[:5] for row in rows], total or 0
+
+
+@timed_query
+async def get_quota_row(user_id: int):
+    """(last_horaria, pulls_horaria, last_diaria, pulls_diaria) do usuário, ou None."""
+    return await db.fetchone(
+        """
+        SELECT last_horaria, pulls_horaria, last_diaria, pulls_diaria
+        FROM user_wallet WHERE user_id = ?
+        """,
+        (user_id,),
+    )
 
-async def get_user_inventory(user_id: int, limit: int, offset: int):
-    async with aiosqlite.connect(DB_FILE) as db:
-        cursor = await db.execute(
+
+@timed_query
+async def save_quota_rows(rows):
+    """Grava em lote as janelas de cota: [(user_id, last_horaria, pulls_horaria, last_diaria, pulls_diaria)]."""
+    async def op(conn):
+        await conn.executemany(
             """
-            SELECT c.id, c.name, uc.quantity
-            FROM cards c
-            JOIN user_cards uc ON c.id = uc.card_id
-            WHERE uc.user_id = ?
-            ORDER BY c.name
-            LIMIT ? OFFSET ?
+            INSERT INTO user_wallet (user_id, last_horaria, pulls_horaria, last_diaria, pulls_diaria)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                last_horaria = excluded.last_horaria,
+                pulls_horaria = excluded.pulls_horaria,
+                last_diaria = excluded.last_diaria,
+                pulls_diaria = excluded.pulls_diaria
             """,
-            (user_id, limit, offset)
+            rows,
         )
-        rows = await cursor.fetchall()
 
-        # Também busca total para saber se tem mais páginas
-        cursor2 = await db.execute(
-            "SELECT COUNT(*) FROM user_cards WHERE user_id = ?", (user_id,)
+    await writer.submit(op)
+
+
+@timed_query
+async def get_popular_card_ids(limit: int) -> list[int]:
+    """IDs das cartas com mais cópias somadas entre todos os usuários."""
+    rows = await db.fetchall(
+        """
+        SELECT card_id FROM user_cards
+        GROUP BY card_id
+        ORDER BY SUM(quantity) DESC
+        LIMIT ?
+        """,
+        (limit,),
+    )
+    return [card_id for (card_id,) in rows]
+
+
+# ---------- CACHE DE FILE_IDS DO TELEGRAM ---------- #
+@timed_query
+async def get_media_file_id(media_key: str, content_hash: str):
+    """Retorna o file_id salvo para a mídia, ou None se não houver ou se o arquivo mudou."""
+    row = await db.fetchone(
+        "SELECT content_hash, file_id FROM media_cache WHERE media_key = ?",
+        (media_key,),
+    )
+    if not row:
+        return None
+    # Hash diferente: o arquivo mudou; a linha é sobrescrita no próximo upload
+    return row[1] if row[0] == content_hash else None
+
+
+@timed_query
+async def get_media_file_ids(hashes: dict[str, str]) -> dict[str, str]:
+    """Versão em lote de get_media_file_id: {media_key: hash} -> {media_key: file_id} dos válidos."""
+    if not hashes:
+        return {}
+    keys = list(hashes)
+    rows = await db.fetchall(
+        f"SELECT media_key, content_hash, file_id FROM media_cache WHERE media_key IN ({', '.join('?' * len(keys))})",
+        keys,
+    )
+    # Hash diferente: o arquivo mudou; a linha é sobrescrita no próximo upload
+    return {key: file_id for key, content_hash, file_id in rows if hashes[key] == content_hash}
+
+
+@timed_query
+async def save_media_file_id(media_key: str, content_hash: str, file_id: str):
+    await db.execute(
+        """
+        INSERT INTO media_cache (media_key, content_hash, file_id)
+        VALUES (?, ?, ?)
+        ON CONFLICT(media_key)
+        DO UPDATE SET content_hash = excluded.content_hash, file_id = excluded.file_id;
+        """,
+        (media_key, content_hash, file_id),
+    )
+
+
+@timed_query
+async def save_media_file_ids(rows):
+    """Grava vários file_ids numa transação: [(media_key, content_hash, file_id)]."""
+    async with db.transaction() as conn:
+        await conn.executemany(
+            """
+            INSERT INTO media_cache (media_key, content_hash, file_id)
+            VALUES (?, ?, ?)
+            ON CONFLICT(media_key)
+            DO UPDATE SET content_hash = excluded.content_hash, file_id = excluded.file_id;
+            """,
+            rows,
         )
-        total_count = (await cursor2.fetchone())[0]
 
-    return rows, total_count
+
+@timed_query
+async def delete_media_file_id(media_key: str):
+    await db.execute("DELETE FROM media_cache WHERE media_key = ?", (media_key,))
@@ -0,0 +1,205 @@
+# database/ranking.py
+"""
+Rankings em memória, carregados uma vez do banco e atualizados a cada pull.
+
+Cada ranking guarda a pontuação de cada usuário, uma árvore de Fenwick com
+quantos usuários têm cada pontuação (posição de qualquer usuário em
+O(log P), P = maior pontuação) e o topo já ordenado (top-k em O(k)).
+Pulls só aumentam pontuações; quedas (carta removida do catálogo) são
+corrigidas recarregando tudo a cada CATALOG_CHANGED e qualquer desvio, pela
+recarga periódica (Tasks/scheduler.py).
+"""
+import heapq
+import time
+from bisect import bisect_left, insort
+
+import config
+from database.models import db
+from utils.events import CATALOG_CHANGED, events
+
+# Quantas posições do topo ficam ordenadas em memória (maior k aceito)
+RANKING_TOP_SIZE = getattr(config, "RANKING_TOP_SIZE", 50)
+
+BOARD_DISTINCT = "distintas"
+BOARD_PULLS = "pulls"
+
+
+class Fenwick:
+    """Contagem de usuários por pontuação; cresce dobrando quando aparece pontuação maior."""
+
+    __slots__ = ("tree", "total")
+
+    def __init__(self, size: int = 64):
+        self.tree = [0] * (size + 1)
+        self.total = 0
+
+    def _grow(self, index: int):
+        size = len(self.tree) - 1
+        while size <= index:
+            size *= 2
+        counts = [self.count_at(i) for i in range(len(self.tree) - 1)]
+        self.tree = [0] * (size + 1)
+        self.total = 0
+        for i, n in enumerate(counts):
+            if n:
+                self.add(i, n)
+
+    def add(self, score: int, delta: int):
+        if score >= len(self.tree) - 1:
+            self._grow(score)
+        self.total += delta
+        i = score + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, score: int) -> int:
+        """Quantos usuários têm pontuação <= score."""
+        i = min(score + 1, len(self.tree) - 1)
+        n = 0
+        while i > 0:
+            n += self.tree[i]
+            i -= i & -i
+        return n
+
+    def count_at(self, score: int) -> int:
+        return self.prefix(score) - (self.prefix(score - 1) if score else 0)
+
+
+class Leaderboard:
+    """Um ranking: pontuação maior primeiro; empates pelo user_id menor."""
+
+    __slots__ = ("scores", "counts", "top", "_in_top", "_stale")
+
+    def __init__(self, scores: dict[int, int] = None):
+        self.scores: dict[int, int] = {}
+        self.counts = Fenwick(max(scores.values(), default=0) + 1 if scores else 64)
+        # (-pontuação, user_id) ordenado, no máximo RANKING_TOP_SIZE itens
+        self.top: list[tuple[int, int]] = []
+        self._in_top: set[int] = set()
+        self._stale = False
+        for user_id, score in (scores or {}).items():
+            self.scores[user_id] = score
+            self.counts.add(score, 1)
+        self._refill()
+
+    def __len__(self):
+        return len(self.scores)
+
+    def _refill(self):
+        """Remonta o topo a partir de todas as pontuações (O(n log k))."""
+        self.top = heapq.nsmallest(RANKING_TOP_SIZE, ((-s, uid) for uid, s in self.scores.items()))
+        self._in_top = {uid for _, uid in self.top}
+        self._stale = False
+
+    def set(self, user_id: int, score: int):
+        """Nova pontuação do usuário em O(log P) (+ O(k) no topo, k fixo)."""
+        old = self.scores.get(user_id)
+        if old == score:
+            return
+        was_top = user_id in self._in_top
+        if old is not None:
+            self.counts.add(old, -1)
+            if was_top:
+                self.top.pop(bisect_left(self.top, (-old, user_id)))
+                self._in_top.discard(user_id)
+        self.scores[user_id] = score
+        self.counts.add(score, 1)
+
+        if was_top and score < old and len(self.scores) > len(self.top) + 1:
+            # Caiu dentro do topo: quem estava fora pode ter passado à frente
+            self._stale = True
+            return
+        key = (-score, user_id)
+        if len(self.top) < RANKING_TOP_SIZE or key < self.top[-1]:
+            insort(self.top, key)
+            self._in_top.add(user_id)
+            if len(self.top) > RANKING_TOP_SIZE:
+                _, dropped = self.top.pop()
+                self._in_top.discard(dropped)
+
+    def top_k(self, k: int) -> list[tuple[int, int]]:
+        """[(user_id, pontuação)] dos k primeiros."""
+        if self._stale:
+            self._refill()
+        return [(uid, -neg) for neg, uid in self.top[:k]]
+
+    def rank(self, user_id: int):
+        """(posição, pontuação) do usuário, ou None. Empatados dividem a posição."""
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return self.counts.total - self.counts.prefix(score) + 1, score
+
+
+class RankingEngine:
+    def __init__(self):
+        self.loaded = False
+        self.boards: dict[str, Leaderboard] = {BOARD_DISTINCT: Leaderboard(), BOARD_PULLS: Leaderboard()}
+        self.series: dict[int, Leaderboard] = {}
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.loaded_at = 0.0
+
+    async def load(self):
+        """(Re)constrói todos os rankings do banco e troca de uma vez (corrige qualquer desvio)."""
+        started = time.perf_counter()
+        wallet = await db.fetchall(
+            "SELECT user_id, distinct_cards, total_pulls FROM user_wallet WHERE total_pulls > 0"
+        )
+        progress = await db.fetchall("SELECT series_id, user_id, owned FROM user_series_progress")
+
+        per_series: dict[int, dict[int, int]] = {}
+        for series_id, user_id, owned in progress:
+            per_series.setdefault(series_id, {})[user_id] = owned
+
+        self.boards = {
+            BOARD_DISTINCT: Leaderboard({uid: distinct for uid, distinct, _ in wallet}),
+            BOARD_PULLS: Leaderboard({uid: pulls for uid, _, pulls in wallet}),
+        }
+        self.series = {series_id: Leaderboard(scores) for series_id, scores in per_series.items()}
+        self.loaded = True
+        self.loads += 1
+        self.loaded_at = time.time()
+        self.load_seconds = time.perf_counter() - started
+        print(
+            f"🏆 Rankings carregados: {len(wallet)} jogadores, {len(self.series)} séries "
+            f"({self.load_seconds:.2f}s)"
+        )
+
+    def record_pull(self, user_id: int, series_id: int, total_pulls: int, distinct_cards: int, owned: int):
+        """Chamado após cada pull já gravado, com os valores absolutos devolvidos pelo banco."""
+        if not self.loaded:
+            return
+        self.boards[BOARD_PULLS].set(user_id, total_pulls)
+        self.boards[BOARD_DISTINCT].set(user_id, distinct_cards)
+        board = self.series.get(series_id)
+        if board is None:
+            board = self.series[series_id] = Leaderboard()
+        board.set(user_id, owned)
+
+    def board(self, name: str = BOARD_DISTINCT, series_id: int = None):
+        if series_id is not None:
+            return self.series.get(series_id)
+        return self.boards.get(name)
+
+    def stats(self) -> dict:
+        return {
+            "players": len(self.boards[BOARD_PULLS]),
+            "series_boards": len(self.series),
+            "loads": self.loads,
+            "load_ms": round(self.load_seconds * 1000, 1),
+            "age_seconds": round(time.time() - self.loaded_at) if self.loaded else 0,
+        }
+
+
+ranking = RankingEngine()
+
+
+async def _reload_on_change(change):
+    # Remoções e mesclagens mudam pontuações para baixo: mais simples recarregar (uma query por tabela)
+    if ranking.loaded:
+        await ranking.load()
+
+
+events.subscribe(CATALOG_CHANGED, _reload_on_change)
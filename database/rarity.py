@@ -0,0 +1,113 @@
+# database/rarity.py
+"""
+Raridade das cartas.
+
+Cada carta tem um nível (coluna cards.rarity) e, opcionalmente, um peso
+próprio (cards.weight); sem peso próprio vale o peso do nível em RARITY_WEIGHTS.
+Os níveis vêm de um manifesto opcional em cada pasta de série:
+
+    assets/<categoria>/<série>/raridades.json
+    {"*": "comum", "carta_especial": "lendaria", "outra_carta": {"raridade": "rara", "peso": 7.5}}
+
+As chaves são o nome do arquivo sem extensão; "*" define o padrão da série.
+O sorteio usa tabelas de alias (método de Vose): O(n) para montar, O(1) por sorteio.
+"""
+import json
+import os
+from array import array
+
+import config
+
+# Peso relativo de cada nível (ajustável no config.py)
+RARITY_WEIGHTS: dict[str, float] = getattr(
+    config,
+    "RARITY_WEIGHTS",
+    {"comum": 60.0, "incomum": 25.0, "rara": 10.0, "epica": 4.0, "lendaria": 1.0},
+)
+DEFAULT_RARITY = getattr(config, "RARITY_DEFAULT", "comum")
+RARITY_MANIFEST = "raridades.json"
+
+
+def effective_weight(rarity: str, weight) -> float:
+    """Peso usado no sorteio: o da carta, se houver, senão o do nível."""
+    if weight is not None:
+        return max(0.0, float(weight))
+    return float(RARITY_WEIGHTS.get(rarity, RARITY_WEIGHTS.get(DEFAULT_RARITY, 1.0)))
+
+
+# ---------- manifesto por série ---------- #
+def read_manifest(path: str):
+    """Lê o raridades.json. Retorna o dict validado, {} se não existir, None se for inválido."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Manifesto de raridade inválido em {path}: {e}")
+        return None
+    if not isinstance(data, dict):
+        print(f"⚠️ Manifesto de raridade inválido em {path}: esperado um objeto JSON")
+        return None
+
+    manifest = {}
+    for key, value in data.items():
+        if isinstance(value, str):
+            value = {"raridade": value}
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = {"peso": value}
+        elif not isinstance(value, dict):
+            print(f"⚠️ {path}: valor inválido para '{key}', ignorado")
+            continue
+
+        rarity = value.get("raridade")
+        if rarity is not None and rarity not in RARITY_WEIGHTS:
+            print(f"⚠️ {path}: raridade desconhecida '{rarity}' em '{key}', usando '{DEFAULT_RARITY}'")
+            rarity = None
+        weight = value.get("peso")
+        if weight is not None and (not isinstance(weight, (int, float)) or weight < 0):
+            print(f"⚠️ {path}: peso inválido em '{key}', ignorado")
+            weight = None
+        manifest[key] = (rarity, None if weight is None else float(weight))
+    return manifest
+
+
+def resolve(manifest: dict, card_name: str) -> tuple[str, float | None]:
+    """(raridade, peso próprio) da carta segundo o manifesto da série."""
+    default_rarity, default_weight = manifest.get("*", (None, None))
+    rarity, weight = manifest.get(card_name, (None, None))
+    return rarity or default_rarity or DEFAULT_RARITY, weight if weight is not None else default_weight
+
+
+def manifest_path(root: str, category: str, series: str) -> str:
+    return os.path.join(root, category, series, RARITY_MANIFEST)
+
+
+# ---------- tabela de alias ---------- #
+def build_alias(weights) -> tuple[array, array] | None:
+    """
+    Tabelas (prob, alias) de Vose para os pesos dados.
+    Retorna None quando o sorteio é uniforme (pesos todos iguais ou todos zero).
+    """
+    n = len(weights)
+    total = sum(weights)
+    if n == 0 or total <= 0 or min(weights) == max(weights):
+        return None
+
+    scaled = [w * n / total for w in weights]
+    prob = array("d", bytes(8 * n))
+    alias = array("q", bytes(8 * n))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        s = small.pop()
+        g = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = g
+        scaled[g] += scaled[s] - 1.0
+        (small if scaled[g] < 1.0 else large).append(g)
+    # O que sobrar (por arredondamento) fica com probabilidade 1
+    for i in large + small:
+        prob[i] = 1.0
+        alias[i] = i
+    return prob, alias
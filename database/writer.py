@@ -0,0 +1,161 @@
+# database/writer.py
+import asyncio
+import time
+
+import config
+from database.models import db
+from utils.metrics import count_roundtrip
+
+MAX_BATCH = getattr(config, "WRITE_BATCH_MAX", 64)
+MAX_DELAY = getattr(config, "WRITE_BATCH_DELAY_MS", 5) / 1000
+
+_STOP = object()
+
+
+class WriteQueue:
+    """
+    Escritor dedicado com group commit.
+
+    Cada mutação é uma função `async def op(conn)` colocada numa asyncio.Queue.
+    Uma única task junta até MAX_BATCH operações (ou o que chegar em MAX_DELAY)
+    e executa todas numa só transação, com um SAVEPOINT por operação para que
+    a falha de uma não desfaça as outras. O futuro de cada chamador só é
+    resolvido depois do COMMIT.
+    """
+
+    def __init__(self, database, max_batch: int = MAX_BATCH, max_delay: float = MAX_DELAY):
+        self.db = database
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        # métricas
+        self.batches = 0
+        self.ops = 0
+        self.failed_ops = 0
+        self.max_batch_seen = 0
+        self.last_batch_size = 0
+        self.commit_seconds = 0.0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.depth,
+            "batches": self.batches,
+            "ops": self.ops,
+            "failed_ops": self.failed_ops,
+            "avg_batch_size": round(self.ops / self.batches, 2) if self.batches else 0,
+            "max_batch_size": self.max_batch_seen,
+            "last_batch_size": self.last_batch_size,
+            "commit_seconds": round(self.commit_seconds, 4),
+        }
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="write-queue")
+
+    async def stop(self):
+        """Processa tudo que já está na fila e encerra a task."""
+        if self._task is None:
+            return
+        # A partir daqui submit() não enfileira mais: nada fica atrás do _STOP
+        self._stopping = True
+        await self._queue.put(_STOP)
+        try:
+            await self._task
+            # Defesa: o que ainda estiver na fila é gravado agora, não esquecido
+            leftover = []
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is not _STOP:
+                    leftover.append(item)
+            if leftover:
+                await self._commit_batch(leftover)
+        finally:
+            self._task = None
+            self._stopping = False
+        print(f"✍️ Fila de escrita encerrada: {self.stats()}")
+
+    async def submit(self, op):
+        """Enfileira a operação e espera o resultado (depois do commit)."""
+        if self._task is None or self._stopping:
+            # Sem escritor rodando (scripts, testes) ou encerrando: executa direto
+            async with self.db.transaction() as conn:
+                return await op(conn)
+
+        count_roundtrip()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((op, future))
+        return await future
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._commit_batch(batch)
+
+    async def _commit_batch(self, batch):
+        results = []
+        started = time.perf_counter()
+        try:
+            async with self.db.transaction() as conn:
+                for op, future in batch:
+                    await conn.execute("SAVEPOINT op")
+                    try:
+                        results.append((future, await op(conn), None))
+                        await conn.execute("RELEASE op")
+                    except Exception as e:
+                        await conn.execute("ROLLBACK TO op")
+                        await conn.execute("RELEASE op")
+                        results.append((future, None, e))
+        except Exception as e:
+            # O commit falhou: nada foi gravado
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            self.failed_ops += len(batch)
+            print(f"❌ Falha ao gravar lote de {len(batch)} operações: {e}")
+            return
+
+        self.commit_seconds += time.perf_counter() - started
+        self.batches += 1
+        self.ops += len(batch)
+        self.last_batch_size = len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+        for future, result, error in results:
+            if future.done():  # chamador desistiu (cancelado)
+                continue
+            if error is not None:
+                self.failed_ops += 1
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+writer = WriteQueue(db)
@@ -0,0 +1,253 @@
+# handlers/admin.py
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from database.admin_ops import (
+    merge_cards,
+    remove_cards,
+    remove_series,
+    reorder_series,
+    set_cards_hidden,
+    set_series_hidden,
+)
+from database.backup import backup_stats, run_backup
+from database.catalog import catalog
+from database.models import db
+from database.ranking import ranking
+from database.writer import writer
+from Tasks.scheduler import jobs_stats
+from Tasks.startup import startup_stats
+from utils.collage import collage_stats
+from utils.events import events
+from utils.image_cache import image_cache
+from utils.media_cache import media_stats
+from utils.metrics import metrics
+from utils.optimize_assets import optimized_assets
+from utils.permissions import admin_only
+from utils.quota import quota
+
+
+def runtime_stats(app=None) -> dict:
+    """Tudo que o bot mede, num dict só (usado pelo /stats e pelo endpoint Prometheus)."""
+    stats = {
+        "db": db.stats(),
+        "writer": writer.stats(),
+        "image_cache": image_cache.stats(),
+        "media": media_stats(),
+        "collage": collage_stats(),
+        "optimized": optimized_assets.stats(),
+        "quota": quota.stats(),
+        "catalog_bytes": catalog.memory_bytes(),
+        "ranking": ranking.stats(),
+        "backup": backup_stats(),
+        "jobs": jobs_stats(),
+        "startup": startup_stats(),
+        "events": events.stats(),
+    }
+    processor = getattr(app, "update_processor", None)
+    if processor is not None and hasattr(processor, "stats"):
+        stats["updates"] = processor.stats()
+    return stats
+
+
+def _mib(n: int) -> str:
+    return f"{n / (1024 * 1024):.1f} MiB"
+
+
+def _linhas_histogramas(titulo: str, tabela: dict, limite: int = 8) -> list[str]:
+    if not tabela:
+        return []
+    linhas = [titulo]
+    # Os mais chamados primeiro
+    for name, h in sorted(tabela.items(), key=lambda item: -item[1]["count"])[:limite]:
+        erros = f" · ❌{h['errors']}" if h["errors"] else ""
+        linhas.append(f"  {name}: {h['count']} · p50 {h['p50']}ms · p99 {h['p99']}ms{erros}")
+    return linhas
+
+
+@admin_only
+async def stats_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    snap = metrics.snapshot()
+    rt = runtime_stats(context.application)
+    horas, resto = divmod(snap["uptime_seconds"], 3600)
+
+    linhas = [f"📊 Estatísticas (no ar há {horas}h{resto // 60:02d}min)"]
+    linhas += _linhas_histogramas("⏱️ Handlers (chamadas · p50 · p99)", snap["handlers"])
+    linhas += _linhas_histogramas("🗄️ Queries", snap["queries"])
+
+    rtt = snap["db_roundtrips_per_update"]
+    linhas.append(f"🔁 Idas ao banco por update: média {rtt['avg']} · p99 {rtt['p99']}")
+    d = rt["db"]
+    linhas.append(
+        f"🗄️ Banco: {d['reads']} leituras ({d['read_seconds']:.2f}s), "
+        f"{d['transactions']} transações ({d['transaction_seconds']:.2f}s)"
+    )
+    w = rt["writer"]
+    linhas.append(f"✍️ Fila de escrita: {w['batches']} lotes, média {w['avg_batch_size']} ops, fila {w['queue_depth']}")
+
+    c = rt["image_cache"]
+    linhas.append(f"🖼️ Cache de imagens: {c['hit_rate']:.0%} de acertos, {_mib(c['bytes'])} de {_mib(c['max_bytes'])}")
+    m = rt["media"]
+    linhas.append(
+        f"📤 Uploads: {m['uploads']} ({_mib(m['upload_bytes'])}), "
+        f"file_ids reaproveitados: {m['file_id_hits']}"
+    )
+    boot = rt["startup"]["boot_seconds"]
+    if boot:
+        marcos = " · ".join(f"{etapa} {s:.2f}s" for etapa, s in boot.items())
+        linhas.append(f"🚀 Boot ({rt['startup']['mode']}): {marcos}")
+    b = rt["backup"]
+    if b["last_file"]:
+        linhas.append(f"💾 Último backup: {b['last_file']} ({_mib(b['last_bytes'])}, há {b['age_seconds'] // 60}min)")
+    col = rt["collage"]
+    if col["renders"] or col["cards"]:
+        linhas.append(f"🧩 Colagens: {col['renders']} montadas (média {col['avg_render_ms']}ms), atlas com {col['cards']} cartas")
+    if "updates" in rt:
+        u = rt["updates"]
+        linhas.append(f"⚙️ Updates em voo: {u['in_flight']} ({u['users_with_pending']} usuários)")
+
+    await update.message.reply_text("\n".join(linhas))
+
+
+@admin_only
+async def backup_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/backup: backup online agora (o mesmo do agendador, com rotação e checksum)."""
+    await update.message.reply_text("💾 Fazendo backup...")
+    try:
+        summary = await run_backup()
+    except Exception as e:
+        await update.message.reply_text(f"❌ Backup falhou: {e}")
+        return
+    await update.message.reply_text(
+        f"✅ Backup {summary['file']} ({_mib(summary['bytes'])}, {summary['seconds']}s)\n"
+        f"sha256 {summary['sha256'][:16]}…"
+    )
+
+
+# ─────────────────────────── operações em lote ───────────────────────────────
+# Maior quantidade de IDs aceita num comando (intervalos inclusos)
+MAX_BULK_IDS = 10_000
+
+
+def _ids(args) -> list[int] | None:
+    """IDs dos argumentos, aceitando intervalos ("10-20") e vírgulas; None se algum for inválido."""
+    ids = []
+    for arg in args:
+        for part in arg.split(","):
+            if not part:
+                continue
+            inicio, sep, fim = part.partition("-")
+            try:
+                inicio = int(inicio)
+                fim = int(fim) if sep else inicio
+            except ValueError:
+                return None
+            # Confere o tamanho antes de expandir: um intervalo digitado errado não aloca nada
+            if fim < inicio or len(ids) + (fim - inicio + 1) > MAX_BULK_IDS:
+                return None
+            ids.extend(range(inicio, fim + 1))
+    return ids
+
+
+def _nomes_series(args) -> list[str]:
+    """Séries separadas por ";" (os nomes podem ter espaços)."""
+    return [nome.strip() for nome in " ".join(args).split(";") if nome.strip()]
+
+
+async def _responder(update: Update, result, feito: str):
+    if result is None or not result.cards:
+        faltando = f": {', '.join(map(str, result.missing))}" if result and result.missing else "."
+        await update.message.reply_text(f"⚠️ Nada foi alterado{faltando}")
+        return
+    await update.message.reply_text(f"✅ {feito}: {result}")
+
+
+@admin_only
+async def removerid(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/removerid <id> [id ...]: remove as cartas do catálogo e dos inventários."""
+    ids = _ids(context.args)
+    if not ids:
+        await update.message.reply_text("❌ Use: /removerid <id> [id ...] (aceita intervalos, ex.: 10-20)")
+        return
+    await _responder(update, await remove_cards(ids), "Removidas")
+
+
+@admin_only
+async def removerserie_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/removerserie <série>[; <série> ...]: remove as séries inteiras."""
+    nomes = _nomes_series(context.args)
+    if not nomes:
+        await update.message.reply_text("❌ Use: /removerserie <série>[; <outra série> ...]")
+        return
+    await _responder(update, await remove_series(nomes), "Séries removidas")
+
+
+@admin_only
+async def ocultar_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/ocultar <id> [id ...]: tira as cartas do sorteio (quem tem continua tendo)."""
+    ids = _ids(context.args)
+    if not ids:
+        await update.message.reply_text("❌ Use: /ocultar <id> [id ...] (aceita intervalos, ex.: 10-20)")
+        return
+    await _responder(update, await set_cards_hidden(ids, True), "Ocultadas")
+
+
+@admin_only
+async def mostrar_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/mostrar <id> [id ...]: devolve cartas ocultas ao sorteio."""
+    ids = _ids(context.args)
+    if not ids:
+        await update.message.reply_text("❌ Use: /mostrar <id> [id ...] (aceita intervalos, ex.: 10-20)")
+        return
+    await _responder(update, await set_cards_hidden(ids, False), "De volta ao sorteio")
+
+
+@admin_only
+async def ocultarserie_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/ocultarserie <série>[; <série> ...]: oculta todas as cartas das séries."""
+    nomes = _nomes_series(context.args)
+    if not nomes:
+        await update.message.reply_text("❌ Use: /ocultarserie <série>[; <outra série> ...]")
+        return
+    await _responder(update, await set_series_hidden(nomes, True), "Séries ocultadas")
+
+
+@admin_only
+async def mostrarserie_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/mostrarserie <série>[; <série> ...]: devolve as séries ao sorteio."""
+    nomes = _nomes_series(context.args)
+    if not nomes:
+        await update.message.reply_text("❌ Use: /mostrarserie <série>[; <outra série> ...]")
+        return
+    await _responder(update, await set_series_hidden(nomes, False), "Séries de volta ao sorteio")
+
+
+@admin_only
+async def mesclar_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/mesclar <id_destino> <id> [id ...]: junta cartas duplicadas na carta destino."""
+    ids = _ids(context.args)
+    if not ids or len(ids) < 2:
+        await update.message.reply_text("❌ Use: /mesclar <id_destino> <id_duplicada> [id ...]")
+        return
+    result = await merge_cards(ids[0], ids[1:])
+    if result is None:
+        await update.message.reply_text(f"⚠️ Carta destino #{ids[0]} não encontrada.")
+        return
+    await _responder(update, result, f"Mescladas em #{ids[0]}")
+
+
+@admin_only
+async def reordenar_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/reordenar <série>; <id> [id ...]: as cartas dadas vão para o início da série, nessa ordem."""
+    # O ";" separa o nome (que pode ter espaços e terminar em número) dos IDs
+    nome, sep, resto = " ".join(context.args).partition(";")
+    nome = nome.strip()
+    ids = _ids(resto.split()) if sep else None
+    if not nome or not ids:
+        await update.message.reply_text("❌ Use: /reordenar <série>; <id> [id ...] (ex.: /reordenar Temporada 2; 14 12 13)")
+        return
+    result = await reorder_series(nome, ids)
+    if result is None:
+        await update.message.reply_text(f"⚠️ Série {nome} não encontrada.")
+        return
+    await _responder(update, result, f"Nova ordem de {nome}")
@@ -1,121 +1,259 @@
 from pathlib import Path
-import aiosqlite
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
-from database.queries import (
-    pull_card_from_series,
-    add_card_to_user,
-    get_card_count_for_user,  # nova função no queries.py
-)
-from config import CARDS_DIR, DB_FILE
-from utils.formatters import formatar_categoria
-from utils.image_cache import get_card_image
+from database.catalog import catalog
+from database.queries import pull_card, pull_cards
+from database.rarity import DEFAULT_RARITY
+from config import CARDS_DIR
+import config
+from utils.formatters import formatar_categoria, formatar_raridade
+from utils.assets import read_card_image
+from utils.callbacks import router, encode, OP_CATEGORIA, OP_PAGINA_SERIES, OP_SERIE
+from utils.events import CATALOG_CHANGED, events
+from utils.media_cache import send_photo_cached, send_animation_cached, send_media_group_cached, card_media_key
+from utils.quota import quota
 
 # -----------------------------------------------------------------------------
-# Configuração de categorias e respectivas pastas dentro de assets/
+# Categorias: a posição na tupla é o id que vai no callback_data
 # -----------------------------------------------------------------------------
-TIPO_MAP = {
-    "cat_series": "series",
-    "cat_animes": "animes",
-    "cat_jogos": "jogos",
-}
+CATEGORIAS = (
+    ("series", "🎞️ Séries"),
+    ("animes", "🎌 Animes"),
+    ("jogos", "🎮 Jogos"),
+)
+
+SERIES_PER_PAGE = getattr(config, "SERIES_PER_PAGE", 8)
+# Multi-pull: /pull N aceita até MULTI_PULL_MAX (um álbum do Telegram tem no máximo 10 fotos)
+MULTI_PULL_MAX = min(getattr(config, "MULTI_PULL_MAX", 10), 10)
+# Quantidade do botão "xN" ao lado de cada série (0 ou 1 esconde o botão)
+MULTI_PULL_BUTTON = min(getattr(config, "MULTI_PULL_BUTTON", 10), MULTI_PULL_MAX)
 
 # ───────────────────────────── /pull – nível 1 ───────────────────────────────
 async def pull_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Envia o gif introdutório com os botões de categoria."""
+    """Envia o gif introdutório com os botões de categoria. `/pull N` faz N pulls de uma vez."""
+    qtd = 1
+    if context.args:
+        if not context.args[0].isdigit() or not 1 <= int(context.args[0]) <= MULTI_PULL_MAX:
+            await update.message.reply_text(f"❌ Use: /pull ou /pull <1 a {MULTI_PULL_MAX}>")
+            return
+        qtd = int(context.args[0])
+
+    # Quem já estourou a cota recebe só um texto, antes de qualquer mídia
+    motivo = await quota.check(update.effective_user.id, qtd)
+    if motivo:
+        await update.message.reply_text(motivo)
+        return
+
     gif_path = Path(CARDS_DIR) / "intro" / "intro.gif"
+    # A quantidade segue nos botões até a escolha da série
     keyboard = [
         [
-            InlineKeyboardButton("🎞️ Séries", callback_data="cat_series"),
-            InlineKeyboardButton("🎌 Animes", callback_data="cat_animes"),
-            InlineKeyboardButton("🎮 Jogos", callback_data="cat_jogos"),
+            InlineKeyboardButton(rotulo, callback_data=encode(OP_CATEGORIA, cat_id, qtd))
+            for cat_id, (_, rotulo) in enumerate(CATEGORIAS)
         ]
     ]
-    with gif_path.open("rb") as gif_file:
-        await update.message.reply_animation(
-            animation=gif_file,
-            caption="Escolha a categoria:",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-        )
+    await send_animation_cached(
+        update.message,
+        "intro",
+        gif_path,
+        caption="Escolha a categoria:" if qtd == 1 else f"Escolha a categoria ({qtd} pulls):",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+    )
 
 # ─────────────────────────── helpers de listagem/sorteio ─────────────────────
 
-def listar_series_por_tipo(tipo: str) -> list[str]:
-    """Retorna nomes de subpastas dentro de assets/<tipo>."""
-    base_dir = Path(CARDS_DIR) / tipo
-    if not base_dir.exists():
-        return []
-    return [p.name for p in base_dir.iterdir() if p.is_dir()]
+# (categoria, página, quantidade) -> (versão do catálogo, teclado)
+_teclados_series: dict[tuple[int, int, int], tuple] = {}
+# Séries removidas/ocultadas deixam páginas que ninguém mais pede: esvazia em vez de esperar a versão mudar
+events.subscribe(CATALOG_CHANGED, lambda change: _teclados_series.clear())
+
+
+def teclado_series(cat_id: int, page: int, qtd: int = 1):
+    """
+    Teclado paginado de séries da categoria, com os ids das séries nos botões.
+    Só é remontado quando o catálogo muda. Retorna None se não houver séries.
+    """
+    tipo = CATEGORIAS[cat_id][0]
+    series = [entry for entry in catalog.categories.get(tipo, ()) if len(entry)]
+    if not series:
+        return None
+
+    total_pages = (len(series) + SERIES_PER_PAGE - 1) // SERIES_PER_PAGE
+    page = max(0, min(page, total_pages - 1))
+    cached = _teclados_series.get((cat_id, page, qtd))
+    if cached and cached[0] == catalog.version:
+        return cached[1]
+
+    inicio = page * SERIES_PER_PAGE
+    keyboard = []
+    for entry in series[inicio:inicio + SERIES_PER_PAGE]:
+        row = [InlineKeyboardButton(formatar_categoria(entry.name), callback_data=encode(OP_SERIE, entry.id, qtd))]
+        if MULTI_PULL_BUTTON > 1 and qtd != MULTI_PULL_BUTTON:
+            row.append(InlineKeyboardButton(
+                f"🎰 x{MULTI_PULL_BUTTON}", callback_data=encode(OP_SERIE, entry.id, MULTI_PULL_BUTTON)
+            ))
+        keyboard.append(row)
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton("⬅️", callback_data=encode(OP_PAGINA_SERIES, cat_id, page - 1, qtd)))
+    if page < total_pages - 1:
+        nav.append(InlineKeyboardButton("➡️", callback_data=encode(OP_PAGINA_SERIES, cat_id, page + 1, qtd)))
+    if nav:
+        keyboard.append(nav)
+
+    markup = InlineKeyboardMarkup(keyboard)
+    _teclados_series[(cat_id, page, qtd)] = (catalog.version, markup)
+    return markup
 
 
 async def enviar_carta(chat, user_id: int, tipo: str, series_name: str):
-    """Sorteia uma carta da série, registra no banco, envia ao usuário."""
-    # Sorteia carta (ou recupera pelo banco)
-    card_id, card_name, image_filename = await pull_card_from_series(
-        user_id, series_name
-    )
-    if card_id is None:
+    """Sorteia uma carta da série, registra no banco, envia ao usuário. Retorna se houve pull."""
+    # Sorteio, registro e contagem numa única transação
+    resultado = await pull_card(user_id, series_name)
+    if resultado is None:
         await chat.reply_text("❌ Série ou figurinhas não encontradas.")
-        return
+        return False
 
-    # Registra ganho da carta
-    await add_card_to_user(user_id, card_id)
-
-    # Conta cópias que o usuário tem após adicionar
-    qtd = await get_card_count_for_user(user_id, card_id)
+    card_id, card_name, image_filename, qtd, raridade = resultado
 
     # Monta legenda
     legenda = (
         f"Parabéns, você recebeu #{card_id}: {card_name}!\n"
+        f"🎲 Raridade: {formatar_raridade(raridade)}\n"
         f"📦 Você agora possui {qtd} no inventário."
     )
 
     try:
-        image_data = get_card_image(tipo, series_name, image_filename)
-        await chat.reply_photo(photo=image_data, caption=legenda)
+        image_path = Path(CARDS_DIR) / tipo / series_name / image_filename
+        await send_photo_cached(
+            chat,
+            card_media_key(card_id),
+            image_path,
+            lambda: read_card_image(tipo, series_name, image_filename),
+            caption=legenda,
+        )
     except Exception as e:
         print(f"[ERRO] Ao enviar carta: {e}")
         await chat.reply_text("❌ Falha ao processar a imagem.")
+    return True
+
+
+def legenda_multi_pull(series_name: str, resultados) -> str:
+    """Resumo do álbum: cartas novas e repetidas (cada carta aparece uma vez, com o total atual)."""
+    finais: dict[int, tuple] = {}  # card_id -> (nome, quantidade após o lote, vezes no lote)
+    raras = {}
+    for r in resultados:
+        _, _, vezes = finais.get(r.card_id, (None, 0, 0))
+        finais[r.card_id] = (r.card_name, r.quantity, vezes + 1)
+        if r.rarity != DEFAULT_RARITY:
+            raras[r.card_id] = f" [{formatar_raridade(r.rarity)}]"
+
+    novas = [f"#{cid} {nome}" + (f" x{vezes}" if vezes > 1 else "") + raras.get(cid, "")
+             for cid, (nome, qtd, vezes) in finais.items() if qtd == vezes]
+    repetidas = [f"#{cid} {nome} ({qtd})" for cid, (nome, qtd, vezes) in finais.items() if qtd != vezes]
+
+    linhas = [f"🎰 {len(resultados)} pulls em {formatar_categoria(series_name)}!"]
+    if novas:
+        linhas.append(f"✨ Novas ({len(novas)}): " + ", ".join(novas))
+    if repetidas:
+        linhas.append(f"🔁 Repetidas ({len(repetidas)}): " + ", ".join(repetidas))
+    legenda = "\n".join(linhas)
+    # Limite de legenda do Telegram
+    return legenda if len(legenda) <= 1024 else legenda[:1021] + "..."
+
+
+async def enviar_cartas(chat, user_id: int, tipo: str, series_name: str, qtd: int):
+    """Sorteia `qtd` cartas numa transação e envia todas num único álbum. Retorna se houve pull."""
+    resultados = await pull_cards(user_id, series_name, qtd)
+    if not resultados:
+        await chat.reply_text("❌ Série ou figurinhas não encontradas.")
+        return False
+
+    pasta = Path(CARDS_DIR) / tipo / series_name
+    items = [
+        (card_media_key(r.card_id), pasta / r.filename, lambda f=r.filename: read_card_image(tipo, series_name, f))
+        for r in resultados
+    ]
+    try:
+        await send_media_group_cached(chat, items, caption=legenda_multi_pull(series_name, resultados))
+    except Exception as e:
+        print(f"[ERRO] Ao enviar álbum: {e}")
+        await chat.reply_text("❌ Falha ao processar as imagens.")
+    return True
 
 
-# ─────────────────────── único handler de todos os botões ────────────────────
-async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+# ──────────────────────── botões (via utils.callbacks) ───────────────────────
+@router.route(OP_CATEGORIA)
+async def escolher_categoria(update: Update, context: ContextTypes.DEFAULT_TYPE, cat_id: int, qtd: int):
+    """Nível 2: mostra as séries da categoria escolhida."""
     query = update.callback_query
     await query.answer()
-    data = query.data
-    user_id = query.from_user.id
+    if not 0 <= cat_id < len(CATEGORIAS):
+        return
 
-    # ------------------------ Nível 2: escolha da categoria ------------------
-    if data in TIPO_MAP:
-        tipo = TIPO_MAP[data]
-        context.user_data["tipo_selecionado"] = tipo  # guarda categoria
+    teclado = teclado_series(cat_id, 0, qtd)
+    if teclado is None:
+        await query.edit_message_caption(caption="Nenhuma série encontrada.")
+        await query.edit_message_reply_markup(reply_markup=None)
+        return
 
-        series_list = listar_series_por_tipo(tipo)
-        if not series_list:
-            await query.edit_message_caption(caption="Nenhuma série encontrada.")
-            await query.edit_message_reply_markup(reply_markup=None)
-            return
+    await query.edit_message_caption(
+        caption="Escolha a série:",
+        reply_markup=teclado,
+    )
 
-        keyboard = [
-            [InlineKeyboardButton(formatar_categoria(name), callback_data=f"serie_{name}")]
-            for name in series_list
-        ]
-        await query.edit_message_caption(
-            caption="Escolha a série:",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-        )
+
+@router.route(OP_PAGINA_SERIES)
+async def paginar_series(update: Update, context: ContextTypes.DEFAULT_TYPE, cat_id: int, page: int, qtd: int):
+    query = update.callback_query
+    await query.answer()
+    if not 0 <= cat_id < len(CATEGORIAS):
         return
 
-    # ------------------------ Nível 3: escolha da série ----------------------
-    if data.startswith("serie_"):
-        series_name = data.split("_", 1)[1]
-        tipo = context.user_data.get("tipo_selecionado", "animes")  # default
+    teclado = teclado_series(cat_id, page, qtd)
+    if teclado is not None:
+        await query.edit_message_reply_markup(reply_markup=teclado)
 
-        await enviar_carta(query.message, user_id, tipo, series_name)
 
-        # Remove a mensagem de seleção
-        await context.bot.delete_message(
-            chat_id=query.message.chat_id,
-            message_id=query.message.message_id,
-        )
+@router.route(OP_SERIE)
+async def escolher_serie(update: Update, context: ContextTypes.DEFAULT_TYPE, series_id: int, qtd: int):
+    """Nível 3: sorteia `qtd` cartas da série (a categoria vem do catálogo)."""
+    query = update.callback_query
+    await query.answer()
+    user_id = query.from_user.id
+    if not 1 <= qtd <= MULTI_PULL_MAX:
+        return
+
+    entry = catalog.series_by_id.get(series_id)
+    if entry is None or not len(entry):
+        await query.message.reply_text("❌ Série ou figurinhas não encontradas.")
+        return
+
+    motivo = await quota.consume(user_id, qtd)
+    if motivo:
+        await query.message.reply_text(motivo)
+        return
+
+    ok = False
+    try:
+        if qtd == 1:
+            ok = await enviar_carta(query.message, user_id, entry.category, entry.name)
+        else:
+            ok = await enviar_cartas(query.message, user_id, entry.category, entry.name, qtd)
+    finally:
+        # Sem pull gravado (série vazia ou erro ao gravar): a cota gasta volta
+        if not ok:
+            quota.refund(user_id, qtd)
+
+    # Remove a mensagem de seleção
+    await context.bot.delete_message(
+        chat_id=query.message.chat_id,
+        message_id=query.message.message_id,
+    )
+
+
+@router.fallback
+async def callback_expirado(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Botões de mensagens antigas (outro formato) ou malformados."""
+    await update.callback_query.answer("⌛ Este botão expirou. Use o comando de novo.")
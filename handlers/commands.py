@@ -1,14 +1,16 @@
-from telegram import Update
+from telegram import Update, InputMediaPhoto
+from telegram.error import BadRequest
 from telegram.ext import CommandHandler, CallbackQueryHandler, ContextTypes
-from database.queries import add_user
+from database.queries import add_user, get_username
 import re
-import aiosqlite
-from config import DB_FILE, WELCOME_MESSAGE
+from config import WELCOME_MESSAGE
 from utils.formatters import escape_text
-from database.queries import get_user_inventory
-from database.queries import add_user
+from database.queries import get_user_inventory, get_series_progress
 from config import ITEMS_PER_PAGE
-from utils.inventory_helpers import formatar_inventario_texto, montar_teclado_paginacao
+from utils.inventory_helpers import formatar_inventario_texto, formatar_colecao_texto, montar_teclado_paginacao
+from utils.callbacks import router, OP_INVENTARIO, OP_COLECAO
+from utils.collage import collage_available, collage_version, render_inventory_page
+from utils.media_cache import send_photo_versioned, inventory_media_key
 
 
 
@@ -30,14 +32,12 @@ async def username_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Nome inválido! Letras, números e _ de 3 a 15 caracteres.")
         return
 
-    async with aiosqlite.connect(DB_FILE) as db:
-        row = await db.execute("SELECT username FROM users WHERE id = ?", (user_id,))
-        user_row = await row.fetchone()
-        if user_row:
-            await update.message.reply_text(
-                f"❌ Você já definiu seu nome de usuário: {user_row[0]}"
-            )
-            return
+    atual = await get_username(user_id)
+    if atual:
+        await update.message.reply_text(
+            f"❌ Você já definiu seu nome de usuário: {atual}"
+        )
+        return
 
     ok = await add_user(user_id, username)
     if not ok:
@@ -50,6 +50,8 @@ BOT_COMMANDS = {
     "start":    "Exibe a mensagem de boas‑vindas se por algum motivo você quiser vê-la novamente.",
     "username": "/username <nome> – define seu nome de usuário (só pode ser usado uma vez, escolha sabiamente).",
     "pull":     "Tente a sorte e ganhe uma carta que você provavelmente não quer.",
+    "colecao":  "Mostra quanto de cada série você já completou.",
+    "ranking":  "/ranking [pulls | serie <série>] – os maiores colecionadores e a sua posição.",
     "ajuda":    "Mostra esta lista de comandos XD.",
 }
 
@@ -65,76 +67,115 @@ async def ajuda_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # ---------- HANDLER /inventario ---------- #
 
+async def enviar_colagem(send, user_id, page, versao, cartas, texto, teclado) -> bool:
+    """
+    Manda a página como colagem, reaproveitando o file_id enquanto o inventário
+    (e o atlas) não mudarem. Retorna False para o chamador cair no texto puro.
+    """
+    if not await collage_available():
+        return False
+    try:
+        await send_photo_versioned(
+            send, inventory_media_key(user_id, page), f"{versao}.{collage_version()}",
+            lambda: render_inventory_page(cartas), caption=texto, reply_markup=teclado,
+        )
+        return True
+    except Exception as e:
+        print(f"[INVENTARIO] Colagem falhou, enviando texto: {e}")
+        return False
+
 async def inventario(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     page = 0  # primeira página
 
-    cartas, total = await get_user_inventory(user_id, ITEMS_PER_PAGE, page * ITEMS_PER_PAGE)
+    cartas, total, versao = await get_user_inventory(user_id, ITEMS_PER_PAGE)
 
     if not cartas:
         await update.message.reply_text("Seu inventário está vazio.")
         return
 
     texto = formatar_inventario_texto(cartas, page, total)
-    teclado = montar_teclado_paginacao(page, total)
+    teclado = montar_teclado_paginacao(page, total, cartas)
 
-    await update.message.reply_text(texto, reply_markup=teclado)
+    if not await enviar_colagem(update.message.reply_photo, user_id, page, versao, cartas, texto, teclado):
+        await update.message.reply_text(texto, reply_markup=teclado)
 
-async def inventario_button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+@router.route(OP_INVENTARIO)
+async def inventario_button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE, avancar: int, page: int, cursor: int):
+    """Botões ⬅️/➡️ do inventário: a página atual e o cursor (card_id) vêm no callback."""
     query = update.callback_query
     await query.answer()
-
-    data = query.data  # exemplo: "inv_next_1", "inv_prev_2"
     user_id = query.from_user.id
 
-    if not data.startswith("inv_"):
-        return
-
-    parts = data.split("_")
-    if len(parts) != 3:
-        return
-
-    action, _, page_str = parts
-    try:
-        page = int(page_str)
-    except ValueError:
-        return
-
-    if action == "inv_next":
+    if avancar:
         page += 1
-    elif action == "inv_prev":
-        page -= 1
+        cartas, total, versao = await get_user_inventory(user_id, ITEMS_PER_PAGE, after=cursor)
     else:
-        return
+        page -= 1
+        cartas, total, versao = await get_user_inventory(user_id, ITEMS_PER_PAGE, before=cursor)
 
-    if page < 0:
+    if page < 0 or not cartas:
+        # Inventário mudou por baixo (ex.: carta removida): volta ao início
         page = 0
+        cartas, total, versao = await get_user_inventory(user_id, ITEMS_PER_PAGE)
 
-    cartas, total = await get_user_inventory(user_id, ITEMS_PER_PAGE, page * ITEMS_PER_PAGE)
     texto = formatar_inventario_texto(cartas, page, total)
-    teclado = montar_teclado_paginacao(page, total)
+    teclado = montar_teclado_paginacao(page, total, cartas)
+
+    # Mensagens de texto (de antes da colagem ou sem atlas) continuam em texto
+    if query.message.photo:
+        async def editar(photo, caption, reply_markup):
+            try:
+                return await query.edit_message_media(InputMediaPhoto(photo, caption=caption), reply_markup=reply_markup)
+            except BadRequest as e:
+                if "not modified" in str(e):
+                    return query.message
+                raise
+
+        if await enviar_colagem(editar, user_id, page, versao, cartas, texto, teclado):
+            return
+        await query.edit_message_caption(caption=texto, reply_markup=teclado)
+        return
 
     await query.edit_message_text(texto, reply_markup=teclado)
 
 
-async def removerid(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not context.args:
-        await update.message.reply_text("❌ Use: /removerid <id_da_carta>")
-        return
+# ---------- HANDLER /colecao ---------- #
 
-    try:
-        card_id = int(context.args[0])
-    except ValueError:
-        await update.message.reply_text("❌ ID inválido! Use um número inteiro.")
+async def colecao(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+
+    series, total = await get_series_progress(user_id, ITEMS_PER_PAGE)
+
+    if not series:
+        await update.message.reply_text("Você ainda não tem cartas de nenhuma série. Use /pull!")
         return
 
-    async with aiosqlite.connect(DB_FILE) as db:
-        cursor = await db.execute(
-            "DELETE FROM cards WHERE id = ?", (card_id,)
-        )
-        await db.commit()
+    texto = formatar_colecao_texto(series, 0, total)
+    teclado = montar_teclado_paginacao(0, total, series, op=OP_COLECAO)
+
+    await update.message.reply_text(texto, reply_markup=teclado)
+
+@router.route(OP_COLECAO)
+async def colecao_button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE, avancar: int, page: int, cursor: int):
+    """Botões ⬅️/➡️ do /colecao, com keyset pelo id da série como no inventário."""
+    query = update.callback_query
+    await query.answer()
+    user_id = query.from_user.id
+
+    if avancar:
+        page += 1
+        series, total = await get_series_progress(user_id, ITEMS_PER_PAGE, after=cursor)
+    else:
+        page -= 1
+        series, total = await get_series_progress(user_id, ITEMS_PER_PAGE, before=cursor)
+
+    if page < 0 or not series:
+        page = 0
+        series, total = await get_series_progress(user_id, ITEMS_PER_PAGE)
+
+    texto = formatar_colecao_texto(series, page, total)
+    teclado = montar_teclado_paginacao(page, total, series, op=OP_COLECAO)
+
+    await query.edit_message_text(texto, reply_markup=teclado)
 
-        if cursor.rowcount > 0:
-            await update.message.reply_text(f"✅ Carta com ID {card_id} removida do banco.")
-        else:
-            await update.message.reply_text(f"⚠️ Carta com ID {card_id} não encontrada no banco.")
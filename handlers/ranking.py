@@ -0,0 +1,74 @@
+# handlers/ranking.py
+from telegram import Update
+from telegram.ext import ContextTypes
+
+import config
+from database.catalog import catalog
+from database.queries import get_usernames
+from database.ranking import ranking, BOARD_DISTINCT, BOARD_PULLS
+
+# Quantas posições o /ranking mostra
+RANKING_SHOW = getattr(config, "RANKING_SHOW", 10)
+
+MEDALHAS = {1: "🥇", 2: "🥈", 3: "🥉"}
+# Quem nunca usou o /username: o ranking é público, então não mostra o ID do Telegram
+SEM_NOME = "anônimo"
+SERIE = ("serie", "série")
+USO = "❌ Use: /ranking, /ranking pulls ou /ranking serie <nome da série>"
+
+
+def _titulo_e_ranking(args):
+    """
+    (título, unidade, Leaderboard ou None) para os argumentos do comando.
+    Séries vêm depois de "serie", para que uma série chamada "pulls" também
+    tenha ranking. Retorna None se os argumentos ou a série forem inválidos.
+    """
+    tipo = args[0].lower() if args else BOARD_DISTINCT
+    if tipo in ("cartas", BOARD_DISTINCT) and len(args) <= 1:
+        return "🏆 Ranking de colecionadores (cartas distintas)", "cartas", ranking.board(BOARD_DISTINCT)
+    if tipo == BOARD_PULLS and len(args) == 1:
+        return "🎰 Ranking de pulls", "pulls", ranking.board(BOARD_PULLS)
+    if tipo not in SERIE or len(args) < 2:
+        return None
+    entry = catalog.get_series(" ".join(args[1:]))
+    if entry is None:
+        return None
+    return f"📚 Ranking da série {entry.name}", f"de {len(entry)}", ranking.board(series_id=entry.id)
+
+
+async def ranking_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/ranking, /ranking pulls ou /ranking serie <série>: top do ranking e a posição de quem pediu."""
+    if not ranking.loaded:
+        await update.message.reply_text("⏳ O ranking ainda está sendo carregado, tente de novo em instantes.")
+        return
+
+    escolhido = _titulo_e_ranking(context.args)
+    if escolhido is None:
+        pediu_serie = len(context.args) >= 2 and context.args[0].lower() in SERIE
+        await update.message.reply_text("❌ Série não encontrada." if pediu_serie else USO)
+        return
+    titulo, unidade, board = escolhido
+
+    top = board.top_k(RANKING_SHOW) if board else []
+    if not top:
+        await update.message.reply_text(f"{titulo}\n\nNinguém pontuou aqui ainda.")
+        return
+
+    user_id = update.effective_user.id
+    nomes = await get_usernames(uid for uid, _ in top)
+    linhas = [titulo, ""]
+    for uid, pontos in top:
+        posicao = board.rank(uid)[0]
+        nome = nomes.get(uid) or SEM_NOME
+        if uid == user_id:
+            nome += " (você)"
+        linhas.append(f"{MEDALHAS.get(posicao, f'{posicao}.')} {nome} — {pontos} {unidade}")
+
+    minha = board.rank(user_id)
+    if minha is None:
+        linhas.append("\nVocê ainda não está neste ranking.")
+    else:
+        posicao, pontos = minha
+        linhas.append(f"\nSua posição: #{posicao} de {len(board)} ({pontos} {unidade})")
+
+    await update.message.reply_text("\n".join(linhas))
@@ -1,15 +1,49 @@
+import time
+
+# Início do processo, antes dos imports pesados (telegram), para medir o boot inteiro
+BOOT_STARTED = time.perf_counter()
+
 import asyncio
 import sys
 from telegram.ext import ApplicationBuilder, CommandHandler, CallbackQueryHandler
 from handlers.commands import start, username_cmd, ajuda_cmd
-from handlers.cards import pull_start, button_handler
-from database.queries import load_series_and_cards
+from handlers.cards import pull_start
+from database.models import db
+from database.writer import writer
+from database.migrations import run_migrations
 from config import BOT_TOKEN
+import config
+from utils.assets import shutdown_io
+from utils.collage import shutdown_pool
+from utils.quota import quota
+from Tasks.scheduler import register_jobs
+from Tasks.startup import boot_catalog, cancel_background
+from database.backup import cancel_backup
+from utils.concurrency import PerUserUpdateProcessor
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
-from handlers.commands import inventario, inventario_button_handler
-from handlers.commands import removerid
+from handlers.commands import inventario, colecao
+from utils.callbacks import router
+from handlers.admin import (
+    stats_cmd, runtime_stats, backup_cmd, removerid, removerserie_cmd, ocultar_cmd, mostrar_cmd,
+    ocultarserie_cmd, mostrarserie_cmd, mesclar_cmd, reordenar_cmd,
+)
+from handlers.ranking import ranking_cmd
+from utils.metrics import metrics, instrument_handlers, start_metrics_server, stop_metrics_server
+
 
+# Modo de execução: "polling" (padrão) ou "webhook"
+RUN_MODE = getattr(config, "RUN_MODE", "polling")
+WEBHOOK_URL = getattr(config, "WEBHOOK_URL", None)        # URL pública, ex.: https://meu.host/telegram
+WEBHOOK_LISTEN = getattr(config, "WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = getattr(config, "WEBHOOK_PORT", 8443)
+WEBHOOK_PATH = getattr(config, "WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = getattr(config, "WEBHOOK_SECRET", None)
+# Quantos handlers rodam ao mesmo tempo (updates de um mesmo usuário continuam em ordem)
+UPDATE_CONCURRENCY = getattr(config, "UPDATE_CONCURRENCY", 32)
+# Endereço alternativo da Bot API (servidor local ou stand-in de testes)
+BOT_API_URL = getattr(config, "BOT_API_URL", None)        # ex.: http://127.0.0.1:8081/bot
+BOT_API_FILE_URL = getattr(config, "BOT_API_FILE_URL", None)
 
 
 def setup_event_loop():
@@ -20,9 +54,26 @@ def setup_event_loop():
 async def on_startup(app):
     """Tarefas de inicialização"""
     print("Iniciando caregamento de dados...")
-    await load_series_and_cards()
+    await db.connect()
+    await run_migrations()
+    # Modo lazy: atende com o catálogo do banco; sync e warmup seguem em segundo plano
+    await boot_catalog()
+    writer.start()
+    await start_metrics_server(lambda: runtime_stats(app))
+    metrics.mark_boot("ready")
     print("✅ Carregamento concluído")
 
+async def on_shutdown(app):
+    """Tarefas de encerramento"""
+    await cancel_background()
+    cancel_backup()
+    await stop_metrics_server()
+    await quota.stop()
+    await writer.stop()  # grava o que ainda estiver na fila
+    await db.close()
+    shutdown_io()
+    shutdown_pool()
+
 def register_handlers(app):
     """Registra todos os handlers do bot"""
     handlers = [
@@ -30,26 +81,75 @@ def register_handlers(app):
         CommandHandler("username", username_cmd),
         CommandHandler("pull", pull_start),
         CommandHandler("ajuda", ajuda_cmd),
-        CallbackQueryHandler(button_handler),
         CommandHandler("inventario", inventario),
-        CallbackQueryHandler(inventario_button_handler, pattern=r"^inv_"),
-        CommandHandler("removerid", removerid)
+        CommandHandler("colecao", colecao),
+        CommandHandler("ranking", ranking_cmd),
+        # Um único handler de botões: o roteador despacha pela op do callback_data
+        CallbackQueryHandler(router.dispatch),
+        # Administração do catálogo (só ADMIN_IDS)
+        CommandHandler("removerid", removerid),
+        CommandHandler("removerserie", removerserie_cmd),
+        CommandHandler("ocultar", ocultar_cmd),
+        CommandHandler("mostrar", mostrar_cmd),
+        CommandHandler("ocultarserie", ocultarserie_cmd),
+        CommandHandler("mostrarserie", mostrarserie_cmd),
+        CommandHandler("mesclar", mesclar_cmd),
+        CommandHandler("reordenar", reordenar_cmd),
+        CommandHandler("stats", stats_cmd),
+        CommandHandler("backup", backup_cmd),
     ]
     
     for handler in handlers:
         app.add_handler(handler)
+    # Latência, erros e idas ao banco de cada handler (ver /stats)
+    instrument_handlers(app)
+
+def build_app():
+    """Monta a Application com processamento concorrente de updates"""
+    builder = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(PerUserUpdateProcessor(UPDATE_CONCURRENCY))
+    )
+    if BOT_API_URL:
+        builder = builder.base_url(BOT_API_URL)
+    if BOT_API_FILE_URL:
+        builder = builder.base_file_url(BOT_API_FILE_URL)
+    return builder.build()
+
+def run(app):
+    """Inicia em polling ou webhook conforme RUN_MODE"""
+    if RUN_MODE == "webhook":
+        if not WEBHOOK_URL:
+            raise ValueError("RUN_MODE='webhook' exige WEBHOOK_URL no config.py")
+        print(f"🌐 Webhook em {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH}")
+        app.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET,
+        )
+    elif RUN_MODE == "polling":
+        app.run_polling()
+    else:
+        raise ValueError(f"RUN_MODE inválido: {RUN_MODE!r} (use 'polling' ou 'webhook')")
 
 def main():
     """Ponto principal de execução"""
+    metrics.boot_started = BOOT_STARTED
+    metrics.mark_boot("imports")
     setup_event_loop()
     
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    app = build_app()
     app.post_init = on_startup
+    app.post_shutdown = on_shutdown
     
     register_handlers(app)
+    register_jobs(app)
     
     print("🤖 Bot iniciado com sucesso")
-    app.run_polling()
+    run(app)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,154 @@
+# tests/conftest.py
+"""
+Base dos testes.
+
+O config.py real não fica no repositório: aqui é registrado um módulo
+`config` em memória antes de qualquer import do bot. Cada teste que pede
+`database` ganha um banco novo, já migrado, e o índice do catálogo vazio.
+Os testes `async def` rodam todos no mesmo event loop (os singletons do bot
+guardam locks e filas presos ao loop em que foram usados).
+"""
+import asyncio
+import inspect
+import os
+import sqlite3
+import sys
+import tempfile
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+_workdir = tempfile.mkdtemp(prefix="homucards-tests-")
+config = types.ModuleType("config")
+config.BOT_TOKEN = "123456:TESTE"
+config.DB_FILE = os.path.join(_workdir, "bot.db")
+config.CARDS_DIR = os.path.join(_workdir, "assets")
+config.OPTIMIZED_DIR = os.path.join(_workdir, "optimized")
+config.THUMB_DIR = os.path.join(_workdir, "thumbs")
+config.BACKUP_DIR = os.path.join(_workdir, "backups")
+config.ITEMS_PER_PAGE = 5
+config.ADMIN_IDS = []
+sys.modules["config"] = config
+
+_loop = asyncio.new_event_loop()
+
+
+def run(coro):
+    """Roda uma corrotina no loop dos testes (para fixtures, que são síncronas)."""
+    return _loop.run_until_complete(coro)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    kwargs = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+    run(pyfuncitem.obj(**kwargs))
+    return True
+
+
+def pytest_sessionfinish(session, exitstatus):
+    _loop.close()
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Banco novo e migrado em tmp_path; o catálogo em memória começa vazio."""
+    from database.catalog import catalog
+    from database.migrations import run_migrations
+    from database.models import db
+
+    db.path = str(tmp_path / "test.db")
+    run(db.connect())
+    run(run_migrations())
+    catalog.__init__(seed=1234)
+    yield db
+    run(db.close())
+
+
+class Assets:
+    """Pasta de cartas em tmp_path: <categoria>/<série>/<arquivo>, com conteúdo único por arquivo."""
+
+    def __init__(self, root):
+        self.root = str(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, category: str, series: str, filename: str) -> str:
+        return os.path.join(self.root, category, series, filename)
+
+    def add(self, category: str, series: str, *filenames: str):
+        for filename in filenames:
+            path = self.path(category, series, filename)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(f"{category}/{series}/{filename}".encode())
+
+    def remove(self, category: str, series: str, filename: str):
+        os.remove(self.path(category, series, filename))
+
+
+@pytest.fixture
+def assets(tmp_path):
+    return Assets(tmp_path / "assets")
+
+
+# Esquema criado pelo antigo init_db, antes das migrações versionadas
+BASELINE_SCHEMA = """
+CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT UNIQUE NOT NULL);
+CREATE TABLE series (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL);
+CREATE TABLE cards (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    series_id INTEGER NOT NULL,
+    card_name TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    order_in_series INTEGER,
+    FOREIGN KEY (series_id) REFERENCES series(id),
+    UNIQUE(series_id, card_name)
+);
+CREATE TABLE user_cards (
+    user_id INTEGER,
+    card_id INTEGER,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, card_id),
+    FOREIGN KEY (user_id) REFERENCES users(id),
+    FOREIGN KEY (card_id) REFERENCES cards(id)
+);
+CREATE TABLE user_wallet (
+    user_id INTEGER PRIMARY KEY,
+    total_pulls INTEGER DEFAULT 0,
+    last_diaria TIMESTAMP NULL,
+    last_horaria TIMESTAMP NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+"""
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    """
+    Abre um banco no esquema antigo, preenchido com `script`, e o migra.
+    Uso: `db = await baseline_db("INSERT ...")`.
+    """
+    from database.catalog import catalog
+    from database.migrations import run_migrations
+    from database.models import db
+
+    async def make(script: str = ""):
+        path = str(tmp_path / "baseline.db")
+        conn = sqlite3.connect(path)
+        conn.executescript(BASELINE_SCHEMA + script)
+        conn.commit()
+        conn.close()
+        db.path = path
+        await db.connect()
+        await run_migrations()
+        catalog.__init__(seed=1234)
+        return db
+
+    yield make
+    if db.writer is not None:
+        run(db.close())
@@ -0,0 +1,147 @@
+# tests/test_admin_ops.py
+import pytest
+
+from database import admin_ops
+from database.catalog import catalog
+from database.catalog_sync import sync_catalog
+from database.queries import pull_cards
+
+USERS = range(1, 9)
+
+
+@pytest.fixture
+def catalog_with_pulls(database, assets):
+    """Duas séries sincronizadas e oito usuários com pulls (sorteio com semente fixa)."""
+    assets.add("anime", "Madoka", *(f"m{i}.png" for i in range(6)))
+    assets.add("anime", "Zelda", *(f"z{i}.png" for i in range(4)))
+
+    async def setup():
+        await sync_catalog(assets.root)
+        for user_id in USERS:
+            await pull_cards(user_id, "Madoka", 10)
+            await pull_cards(user_id, "Zelda", 5)
+
+    return setup
+
+
+async def _check_consistent(db):
+    """Progresso e contadores materializados iguais aos recontados a partir de user_cards."""
+    progress = await db.fetchall(
+        "SELECT user_id, series_id, series_name, owned, copies, series_size FROM user_series_progress ORDER BY 1, 2"
+    )
+    expected = await db.fetchall(
+        """
+        SELECT uc.user_id, s.id, s.name, COUNT(*), SUM(uc.quantity),
+               (SELECT COUNT(*) FROM cards WHERE cards.series_id = s.id AND cards.hidden = 0)
+        FROM user_cards uc JOIN cards c ON c.id = uc.card_id JOIN series s ON s.id = c.series_id
+        WHERE c.hidden = 0
+        GROUP BY uc.user_id, s.id ORDER BY 1, 2
+        """
+    )
+    assert progress == expected
+    wallets = await db.fetchall(
+        """
+        SELECT w.user_id, w.distinct_cards, w.series_started,
+               (SELECT COUNT(*) FROM user_cards uc WHERE uc.user_id = w.user_id),
+               (SELECT COUNT(*) FROM user_series_progress p WHERE p.user_id = w.user_id)
+        FROM user_wallet w
+        """
+    )
+    for user_id, distinct_cards, series_started, counted_cards, counted_series in wallets:
+        assert (distinct_cards, series_started) == (counted_cards, counted_series), user_id
+    assert await db.fetchall("SELECT card_id FROM user_cards WHERE card_id NOT IN (SELECT id FROM cards)") == []
+
+
+async def test_remove_cards_cascades(database, assets, catalog_with_pulls):
+    await catalog_with_pulls()
+    await _check_consistent(database)
+    removed = list(catalog.get_series("Madoka").card_ids[:2])
+    await database.execute("INSERT INTO media_cache VALUES (?, 'h', 'f')", (f"card:{removed[0]}",))
+    owners = await database.fetchall(
+        f"SELECT COUNT(DISTINCT user_id) FROM user_cards WHERE card_id IN ({removed[0]}, {removed[1]})"
+    )
+
+    result = await admin_ops.remove_cards([*removed, 9999])
+
+    assert (result.cards, result.users, result.missing) == (2, owners[0][0], [9999])
+    assert await database.fetchall(f"SELECT id FROM cards WHERE id IN ({removed[0]}, {removed[1]})") == []
+    assert await database.fetchall("SELECT * FROM media_cache") == []
+    await _check_consistent(database)
+    assert not set(removed) & set(catalog.get_series("Madoka").card_ids)
+    # O manifesto guarda os arquivos: a próxima sincronização não traz as cartas de volta
+    assert (await sync_catalog(assets.root)).cards_added == 0
+    assert len(catalog.get_series("Madoka")) == 4
+
+
+async def test_remove_series_cascades(database, catalog_with_pulls):
+    await catalog_with_pulls()
+    zelda = catalog.get_series("Zelda").id
+
+    result = await admin_ops.remove_series(["zelda", "Nada"])
+
+    assert (result.cards, result.series_removed, result.missing) == (4, 1, ["Nada"])
+    assert await database.fetchall("SELECT * FROM series WHERE id = ?", (zelda,)) == []
+    assert await database.fetchall("SELECT * FROM user_series_progress WHERE series_id = ?", (zelda,)) == []
+    await _check_consistent(database)
+    assert catalog.get_series("Zelda") is None
+
+
+async def test_merge_cards_sums_quantities(database, assets, catalog_with_pulls):
+    await catalog_with_pulls()
+    target, *sources = catalog.get_series("Madoka").card_ids[:3]
+    before = dict(
+        await database.fetchall(
+            f"SELECT user_id, SUM(quantity) FROM user_cards WHERE card_id IN ({target}, {sources[0]}, {sources[1]}) "
+            "GROUP BY user_id"
+        )
+    )
+
+    result = await admin_ops.merge_cards(target, sources)
+
+    assert result.cards == 2
+    after = dict(await database.fetchall("SELECT user_id, quantity FROM user_cards WHERE card_id = ?", (target,)))
+    assert after == before
+    assert await database.fetchall(
+        f"SELECT * FROM user_cards WHERE card_id IN ({sources[0]}, {sources[1]})"
+    ) == []
+    assert await database.fetchall(
+        "SELECT path FROM asset_manifest WHERE card_id = ? ORDER BY path", (target,)
+    ) == [("anime/Madoka/m0.png",), ("anime/Madoka/m1.png",), ("anime/Madoka/m2.png",)]
+    await _check_consistent(database)
+    # A mesclagem sobrevive a uma nova sincronização
+    report = await sync_catalog(assets.root)
+    assert (report.cards_added, report.cards_removed) == (0, 0)
+
+
+async def test_merge_into_missing_card(database, catalog_with_pulls):
+    await catalog_with_pulls()
+    assert await admin_ops.merge_cards(9999, [1]) is None
+
+
+async def test_hidden_cards_leave_the_draw_but_stay_in_inventories(database, catalog_with_pulls):
+    await catalog_with_pulls()
+    hidden = catalog.get_series("Zelda").card_ids[0]
+    inventory = await database.fetchall("SELECT * FROM user_cards ORDER BY 1, 2")
+
+    result = await admin_ops.set_cards_hidden([hidden])
+
+    assert result.cards == 1
+    assert await database.fetchall("SELECT * FROM user_cards ORDER BY 1, 2") == inventory
+    assert hidden not in catalog.get_series("Zelda").card_ids
+    assert all(card_id != hidden for card_id, *_ in catalog.draw_many("Zelda", 500))
+    await _check_consistent(database)
+
+    await admin_ops.set_cards_hidden([hidden], hidden=False)
+    assert hidden in catalog.get_series("Zelda").card_ids
+    await _check_consistent(database)
+
+
+async def test_reorder_series(database, catalog_with_pulls):
+    await catalog_with_pulls()
+    ids = list(catalog.get_series("Zelda").card_ids)
+
+    result = await admin_ops.reorder_series("zelda", [ids[3], ids[1], 9999])
+
+    assert result.missing == [9999]
+    assert list(catalog.get_series("Zelda").card_ids) == [ids[3], ids[1], ids[0], ids[2]]
+    assert await admin_ops.reorder_series("Nada", ids) is None
@@ -0,0 +1,148 @@
+# tests/test_backup.py
+import gzip
+import json
+import os
+import sqlite3
+
+import pytest
+
+from database import admin_ops
+from database.backup import (
+    backup_database,
+    export_snapshot,
+    import_snapshot,
+    verify_backups,
+)
+from database.catalog import catalog
+from database.catalog_sync import sync_catalog
+from database.migrations import run_migrations
+from database.queries import add_user, pull_cards
+
+TABLES = {
+    "series": "SELECT id, name, category FROM series ORDER BY 1",
+    "cards": "SELECT id, series_id, card_name, filename, order_in_series, rarity, weight, hidden FROM cards ORDER BY 1",
+    "manifest": "SELECT path, content_hash, card_id FROM asset_manifest ORDER BY 1",
+    "users": "SELECT id, username FROM users ORDER BY 1",
+    "user_cards": "SELECT user_id, card_id, card_name, quantity FROM user_cards ORDER BY 1, 2",
+    "wallet": "SELECT user_id, total_pulls, distinct_cards, series_started FROM user_wallet ORDER BY 1",
+    "progress": "SELECT * FROM user_series_progress ORDER BY 1, 2",
+}
+
+
+def _dump(path: str) -> dict:
+    conn = sqlite3.connect(path)
+    try:
+        return {name: conn.execute(sql).fetchall() for name, sql in TABLES.items()}
+    finally:
+        conn.close()
+
+
+def _corrupt(path: str) -> None:
+    with open(path, "r+b") as f:
+        f.seek(200)
+        f.write(b"\xff" * 16)
+
+
+@pytest.fixture
+def populated(database, assets):
+    """Catálogo com carta oculta, removida e mesclada, e usuários com e sem /username."""
+    assets.add("anime", "Madoka", *(f"m{i}.png" for i in range(6)))
+    assets.add("jogos", "Zelda", *(f"z{i}.png" for i in range(4)))
+
+    async def setup():
+        await sync_catalog(assets.root)
+        for user_id in range(1, 7):
+            if user_id % 2:
+                await add_user(user_id, f"user{user_id}")
+            await pull_cards(user_id, "Madoka", 10)
+            await pull_cards(user_id, "Zelda", 3)
+        madoka = list(catalog.get_series("Madoka").card_ids)
+        await admin_ops.set_cards_hidden([catalog.get_series("Zelda").card_ids[0]])
+        await admin_ops.remove_cards([madoka[5]])
+        await admin_ops.merge_cards(madoka[0], [madoka[1]])
+
+    return setup
+
+
+async def _restore(tmp_path, dump_file: str) -> str:
+    """Importa `dump_file` num banco novo e deixa a conexão do bot apontando para ele."""
+    from database.models import db
+
+    await db.close()
+    db.path = str(tmp_path / "restored.db")
+    await db.connect()
+    await run_migrations()
+    await import_snapshot(dump_file)
+    return db.path
+
+
+async def test_export_import_round_trip(database, assets, populated, tmp_path):
+    await populated()
+    before = _dump(database.path)
+    dump_file = str(tmp_path / "dump.jsonl.gz")
+
+    summary = export_snapshot(dump_file, database.path)
+
+    assert summary["counts"]["manifest"] == len(before["manifest"])
+    restored = await _restore(tmp_path, dump_file)
+    assert _dump(restored) == before
+
+
+async def test_restore_keeps_admin_removals_and_merges(database, assets, populated, tmp_path):
+    await populated()
+    cards_before = _dump(database.path)["cards"]
+    dump_file = str(tmp_path / "dump.jsonl.gz")
+    export_snapshot(dump_file, database.path)
+    await _restore(tmp_path, dump_file)
+
+    report = await sync_catalog(assets.root)
+
+    # Sem o manifesto na exportação, a carta removida e a mesclada voltariam aqui
+    assert (report.cards_added, report.series_added, report.cards_removed) == (0, [], 0)
+    assert _dump(database.path)["cards"] == cards_before
+
+
+async def test_import_refuses_a_db_with_data(database, populated, tmp_path):
+    await populated()
+    dump_file = str(tmp_path / "dump.jsonl.gz")
+    export_snapshot(dump_file, database.path)
+
+    with pytest.raises(RuntimeError):
+        await import_snapshot(dump_file)
+
+
+async def test_import_accepts_format_1_without_manifest(database, populated, tmp_path):
+    await populated()
+    dump_file = str(tmp_path / "dump.jsonl.gz")
+    export_snapshot(dump_file, database.path)
+    old_file = str(tmp_path / "old.jsonl.gz")
+    with gzip.open(dump_file, "rt", encoding="utf-8") as src, gzip.open(old_file, "wt", encoding="utf-8") as dst:
+        for line in src:
+            record = json.loads(line)
+            if record["type"] == "header":
+                record["format"] = 1
+            if record["type"] != "manifest":
+                dst.write(json.dumps(record) + "\n")
+
+    restored = await _restore(tmp_path, old_file)
+
+    assert _dump(restored)["manifest"] == []
+    assert _dump(restored)["user_cards"] == _dump(database.path)["user_cards"]
+
+
+async def test_online_backup_rotation_and_checksums(database, populated, tmp_path, monkeypatch):
+    await populated()
+    out_dir = str(tmp_path / "backups")
+    # O nome do backup tem resolução de segundos: um carimbo por chamada
+    stamps = iter(["20260101-000001", "20260101-000002", "20260101-000003"])
+    monkeypatch.setattr("database.backup.time.strftime", lambda fmt: next(stamps))
+
+    removed = [backup_database(database.path, out_dir, keep=2, pages=1)["removed"] for _ in range(3)]
+
+    assert removed == [[], [], ["test-20260101-000001.db"]]
+    results = verify_backups(out_dir)
+    assert results == {"test-20260101-000002.db": True, "test-20260101-000003.db": True}
+    assert _dump(os.path.join(out_dir, "test-20260101-000003.db")) == _dump(database.path)
+
+    _corrupt(os.path.join(out_dir, "test-20260101-000002.db"))
+    assert verify_backups(out_dir) == {"test-20260101-000002.db": False, "test-20260101-000003.db": True}
@@ -0,0 +1,137 @@
+# tests/test_catalog_sync.py
+import asyncio
+import os
+
+from database.catalog import catalog
+from database.catalog_sync import sync_catalog
+
+
+async def _cards(db):
+    return await db.fetchall(
+        "SELECT s.name, c.card_name, c.order_in_series FROM cards c JOIN series s ON s.id = c.series_id "
+        "ORDER BY s.name, c.order_in_series"
+    )
+
+
+async def test_first_sync_creates_series_and_cards(database, assets):
+    assets.add("anime", "Madoka", "a.png", "b.png")
+    assets.add("jogos", "Zelda", "link.jpg")
+
+    report = await sync_catalog(assets.root)
+
+    assert sorted(report.series_added) == ["Madoka", "Zelda"]
+    assert report.cards_added == 3
+    assert await _cards(database) == [("Madoka", "a", 1), ("Madoka", "b", 2), ("Zelda", "link", 1)]
+    assert len(catalog.get_series("madoka")) == 2
+
+
+async def test_resync_without_changes_is_a_noop(database, assets):
+    assets.add("anime", "Madoka", "a.png", "b.png")
+    await sync_catalog(assets.root)
+
+    report = await sync_catalog(assets.root)
+
+    assert not report.changed
+    assert report.hashed == 0
+
+
+async def test_new_file_is_appended_to_the_series(database, assets):
+    assets.add("anime", "Madoka", "a.png", "b.png")
+    await sync_catalog(assets.root)
+    assets.add("anime", "Madoka", "c.png")
+
+    report = await sync_catalog(assets.root)
+
+    assert report.cards_added == 1
+    assert await _cards(database) == [("Madoka", "a", 1), ("Madoka", "b", 2), ("Madoka", "c", 3)]
+
+
+async def test_removed_file_removes_card_and_inventory(database, assets):
+    assets.add("anime", "Madoka", "a.png", "b.png")
+    await sync_catalog(assets.root)
+    card_a = catalog.get_series("Madoka").card_ids[0]
+    await database.execute("INSERT INTO user_wallet (user_id, distinct_cards) VALUES (1, 1)")
+    await database.execute("INSERT INTO user_cards (user_id, card_id, card_name, quantity) VALUES (1, ?, 'a', 2)", (card_a,))
+    assets.remove("anime", "Madoka", "a.png")
+
+    report = await sync_catalog(assets.root)
+
+    assert report.cards_removed == 1
+    assert await _cards(database) == [("Madoka", "b", 2)]
+    assert await database.fetchall("SELECT * FROM user_cards") == []
+    assert await database.fetchone("SELECT distinct_cards FROM user_wallet WHERE user_id = 1") == (0,)
+    assert list(catalog.get_series("Madoka").card_ids) != [card_a]
+
+
+async def test_existing_cards_of_a_baseline_db_are_not_added_again(baseline_db, assets):
+    """Banco antigo sem manifesto: só o arquivo realmente novo vira carta, com a próxima ordem."""
+    db = await baseline_db(
+        """
+        INSERT INTO series (name) VALUES ('Madoka');
+        INSERT INTO cards (series_id, card_name, filename, order_in_series) VALUES (1, 'a', 'a.png', 1), (1, 'b', 'b.png', 2);
+        INSERT INTO user_cards (user_id, card_id, quantity) VALUES (7, 1, 3);
+        """
+    )
+    assets.add("anime", "Madoka", "a.png", "b.png", "c.png")
+
+    report = await sync_catalog(assets.root)
+
+    assert report.cards_added == 1
+    assert await _cards(db) == [("Madoka", "a", 1), ("Madoka", "b", 2), ("Madoka", "c", 3)]
+    # As cartas antigas continuam as mesmas (o inventário não perde nada)
+    assert await db.fetchall("SELECT user_id, card_id, quantity FROM user_cards") == [(7, 1, 3)]
+    assert await db.fetchall("SELECT path, card_id FROM asset_manifest ORDER BY path") == [
+        ("anime/Madoka/a.png", 1), ("anime/Madoka/b.png", 2), ("anime/Madoka/c.png", 3),
+    ]
+
+
+async def test_changed_extension_keeps_the_card(database, assets):
+    assets.add("anime", "Madoka", "a.png", "b.png")
+    await sync_catalog(assets.root)
+    card_a = catalog.get_series("Madoka").card_ids[0]
+    assets.remove("anime", "Madoka", "a.png")
+    assets.add("anime", "Madoka", "a.jpg")
+
+    report = await sync_catalog(assets.root)
+
+    assert (report.cards_added, report.cards_removed) == (0, 0)
+    assert await database.fetchone("SELECT id, filename, order_in_series FROM cards WHERE card_name = 'a'") == (
+        card_a, "a.jpg", 1,
+    )
+
+
+async def test_series_folder_renamed_only_by_case(database, assets):
+    assets.add("anime", "Madoka", "a.png", "b.png")
+    await sync_catalog(assets.root)
+    ids = list(catalog.get_series("Madoka").card_ids)
+    os.rename(os.path.join(assets.root, "anime", "Madoka"), os.path.join(assets.root, "anime", "MADOKA"))
+
+    report = await sync_catalog(assets.root)
+
+    assert report.series_moved == 1
+    assert (report.cards_added, report.cards_removed) == (0, 0)
+    assert await database.fetchall("SELECT name, category FROM series") == [("MADOKA", "anime")]
+    assert list(catalog.get_series("MADOKA").card_ids) == ids
+    assert catalog.get_series("MADOKA").name == "MADOKA"
+
+
+async def test_same_series_in_two_categories_differing_in_case(database, assets):
+    assets.add("anime", "Madoka", "a.png")
+    assets.add("jogos", "madoka", "x.png")
+
+    report = await sync_catalog(assets.root)
+
+    # A segunda pasta é ignorada com aviso, em vez de quebrar o índice NOCASE a cada sync
+    assert report.series_added == ["Madoka"]
+    assert await _cards(database) == [("Madoka", "a", 1)]
+    assert not (await sync_catalog(assets.root)).changed
+
+
+async def test_concurrent_syncs_apply_each_file_once(database, assets):
+    for n in range(30):
+        assets.add("anime", "Madoka", f"{n:02}.png")
+
+    first, second = await asyncio.gather(sync_catalog(assets.root), sync_catalog(assets.root))
+
+    assert (first.cards_added, second.cards_added) == (30, 0)
+    assert await database.fetchone("SELECT COUNT(*), MAX(order_in_series) FROM cards") == (30, 30)
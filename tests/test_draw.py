@@ -0,0 +1,71 @@
+# tests/test_draw.py
+import random
+from collections import Counter
+
+from database.catalog import SeriesCards
+from database.rarity import build_alias, effective_weight
+
+DRAWS = 200_000
+
+
+def _series(weights) -> SeriesCards:
+    entry = SeriesCards(1, "Madoka", "anime")
+    for i, weight in enumerate(weights, start=1):
+        entry.card_ids.append(i)
+        entry.names.append(f"carta{i}")
+        entry.filenames.append(f"carta{i}.png")
+        entry.rarities.append("comum")
+        entry.weights.append(weight)
+    entry.build_table()
+    return entry
+
+
+def _frequencies(entry: SeriesCards, seed: int) -> dict[int, float]:
+    counts = Counter(card_id for card_id, *_ in entry.draw_many(DRAWS, random.Random(seed)))
+    return {card_id: counts[card_id] / DRAWS for card_id in entry.card_ids}
+
+
+def test_alias_table_follows_the_weights():
+    weights = [60.0, 25.0, 10.0, 4.0, 1.0]
+    entry = _series(weights)
+    assert entry.alias is not None
+
+    freqs = _frequencies(entry, seed=42)
+
+    total = sum(weights)
+    for card_id, weight in enumerate(weights, start=1):
+        expected = weight / total
+        # 200 mil sorteios: o desvio padrão da maior frequência é ~0,1 ponto percentual
+        assert abs(freqs[card_id] - expected) < 0.005, (card_id, freqs[card_id], expected)
+
+
+def test_same_seed_draws_the_same_sequence():
+    entry = _series([5.0, 3.0, 1.0, 1.0])
+    first = entry.draw_many(50, random.Random(7))
+    assert entry.draw_many(50, random.Random(7)) == first
+
+
+def test_zero_weight_card_is_never_drawn():
+    entry = _series([3.0, 0.0, 1.0])
+
+    freqs = _frequencies(entry, seed=1)
+
+    assert freqs[2] == 0
+    assert abs(freqs[1] - 0.75) < 0.005
+
+
+def test_uniform_weights_skip_the_table():
+    assert build_alias([2.0, 2.0, 2.0]) is None
+    assert build_alias([0.0, 0.0]) is None
+    entry = _series([1.0] * 4)
+    assert entry.alias is None
+
+    freqs = _frequencies(entry, seed=3)
+
+    assert all(abs(freq - 0.25) < 0.005 for freq in freqs.values())
+
+
+def test_card_weight_overrides_the_rarity():
+    assert effective_weight("lendaria", None) < effective_weight("comum", None)
+    assert effective_weight("lendaria", 50) == 50.0
+    assert effective_weight("comum", -3) == 0.0
@@ -0,0 +1,93 @@
+# tests/test_inventory.py
+from database.catalog_sync import sync_catalog
+from database.queries import get_user_inventory, pull_cards
+
+USER = 10
+PAGE = 3
+
+
+async def _fill(db, names):
+    """
+    Cartas com os nomes dados no inventário de USER, uma série por carta:
+    nomes repetidos (de séries diferentes) desempatam pelo id.
+    """
+    async with db.transaction() as conn:
+        for card_id, name in enumerate(names, start=1):
+            await conn.execute(
+                "INSERT INTO series (id, name, category) VALUES (?, ?, 'anime')", (card_id, f"série {card_id}")
+            )
+            await conn.execute(
+                "INSERT INTO cards (id, series_id, card_name, filename, order_in_series) VALUES (?, ?, ?, ?, 1)",
+                (card_id, card_id, name, f"{name}.png"),
+            )
+            await conn.execute(
+                "INSERT INTO user_cards (user_id, card_id, card_name, quantity) VALUES (?, ?, ?, ?)",
+                (USER, card_id, name, card_id),
+            )
+        await conn.execute(
+            "INSERT INTO user_wallet (user_id, distinct_cards, inventory_version) VALUES (?, ?, 1)", (USER, len(names))
+        )
+    return sorted((name, card_id) for card_id, name in enumerate(names, start=1))
+
+
+def _keys(rows):
+    return [(name, card_id) for card_id, name, _ in rows]
+
+
+async def test_keyset_pages_forward_and_back(database):
+    expected = await _fill(database, ["kyubey", "homura", "madoka", "sayaka", "homura", "mami", "kyoko", "madoka"])
+
+    pages = []
+    rows, total, version = await get_user_inventory(USER, PAGE)
+    assert (total, version) == (8, 1)
+    while rows:
+        pages.append(_keys(rows))
+        rows, _, _ = await get_user_inventory(USER, PAGE, after=rows[-1][0])
+
+    # Para frente: todas as cartas, cada uma uma vez, em ordem (nome, id)
+    assert [key for page in pages for key in page] == expected
+    assert [len(page) for page in pages] == [3, 3, 2]
+
+    # Para trás a partir da última página: as mesmas páginas
+    back = [pages[-1]]
+    first_id = pages[-1][0][1]
+    while True:
+        rows, _, _ = await get_user_inventory(USER, PAGE, before=first_id)
+        if not rows:
+            break
+        back.append(_keys(rows))
+        first_id = rows[0][0]
+    assert back[::-1] == pages
+
+
+async def test_pages_with_repeated_names_do_not_skip_cards(database):
+    expected = await _fill(database, ["madoka"] * 7)
+
+    rows, _, _ = await get_user_inventory(USER, PAGE)
+    seen = _keys(rows)
+    while rows:
+        rows, _, _ = await get_user_inventory(USER, PAGE, after=rows[-1][0])
+        seen += _keys(rows)
+
+    assert seen == expected
+
+
+async def test_empty_inventory(database):
+    assert await get_user_inventory(USER, PAGE) == ([], 0, 0)
+
+
+async def test_pulls_update_inventory_counters(database, assets):
+    assets.add("anime", "Madoka", "a.png", "b.png", "c.png")
+    await sync_catalog(assets.root)
+
+    results = await pull_cards(USER, "madoka", 10)
+
+    assert len(results) == 10
+    rows, total, version = await get_user_inventory(USER, 10)
+    assert sum(quantity for _, _, quantity in rows) == 10
+    assert total == len(rows) == len({r.card_id for r in results})
+    assert version == 1
+    # A quantidade de cada resultado é a que o usuário tinha logo após aquele sorteio
+    last = {r.card_id: r.quantity for r in results}
+    assert last == {card_id: quantity for card_id, _, quantity in rows}
+    assert await database.fetchone("SELECT total_pulls FROM user_wallet WHERE user_id = ?", (USER,)) == (10,)
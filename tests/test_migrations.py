@@ -0,0 +1,73 @@
+# tests/test_migrations.py
+import sqlite3
+
+import pytest
+
+from database.migrations import SCHEMA_VERSION, run_migrations
+
+# Banco do esquema antigo com lixo típico: inventário apontando para cartas que
+# já não existem, carteira com total_pulls NULL e usuário que puxou sem /username
+BASELINE_ROWS = """
+INSERT INTO users (id, username) VALUES (1, 'homura'), (2, 'madoka');
+INSERT INTO series (id, name) VALUES (1, 'Madoka'), (2, 'Zelda');
+INSERT INTO cards (id, series_id, card_name, filename, order_in_series) VALUES
+    (1, 1, 'a', 'a.png', 1), (2, 1, 'b', 'b.png', 2), (3, 2, 'link', 'link.png', 1);
+INSERT INTO user_cards (user_id, card_id, quantity) VALUES
+    (1, 1, 2), (1, 3, 1), (1, 99, 5),
+    (2, 2, 4), (2, 98, 1),
+    (3, 1, 1);
+INSERT INTO user_wallet (user_id, total_pulls) VALUES (1, 8), (2, NULL);
+"""
+
+
+async def test_baseline_db_is_migrated_and_cleaned(baseline_db):
+    db = await baseline_db(BASELINE_ROWS)
+
+    assert await db.fetchone("PRAGMA user_version") == (SCHEMA_VERSION,)
+    # Órfãs saem; o resto do inventário fica, com o nome denormalizado preenchido
+    assert await db.fetchall("SELECT user_id, card_id, quantity, card_name FROM user_cards ORDER BY 1, 2") == [
+        (1, 1, 2, "a"), (1, 3, 1, "link"), (2, 2, 4, "b"), (3, 1, 1, "a"),
+    ]
+    assert await db.fetchall("PRAGMA foreign_key_check") == []
+    assert await db.fetchall(
+        "SELECT user_id, total_pulls, distinct_cards, series_started, inventory_version FROM user_wallet ORDER BY 1"
+    ) == [(1, 8, 2, 2, 0), (2, 0, 1, 1, 0)]
+    assert await db.fetchall(
+        "SELECT user_id, series_id, series_name, owned, copies, series_size FROM user_series_progress ORDER BY 1, 2"
+    ) == [(1, 1, "Madoka", 1, 2, 2), (1, 2, "Zelda", 1, 1, 1), (2, 1, "Madoka", 1, 4, 2), (3, 1, "Madoka", 1, 1, 2)]
+    assert await db.fetchall("SELECT id, rarity, weight, hidden FROM cards ORDER BY id") == [
+        (1, "comum", None, 0), (2, "comum", None, 0), (3, "comum", None, 0),
+    ]
+
+
+async def test_cascade_and_nocase_index_after_migration(baseline_db):
+    db = await baseline_db(BASELINE_ROWS)
+
+    await db.execute("DELETE FROM cards WHERE id = 1")
+
+    assert await db.fetchall("SELECT user_id, card_id FROM user_cards WHERE card_id = 1") == []
+    assert await db.fetchone("SELECT id FROM series WHERE name = 'madoka' COLLATE NOCASE") == (1,)
+    with pytest.raises(sqlite3.IntegrityError):
+        await db.execute("INSERT INTO series (name) VALUES ('MADOKA')")
+
+
+async def test_migrations_are_idempotent(baseline_db):
+    db = await baseline_db(BASELINE_ROWS)
+    before = await db.fetchall("SELECT * FROM user_cards ORDER BY 1, 2")
+
+    await run_migrations()
+
+    assert await db.fetchone("PRAGMA user_version") == (SCHEMA_VERSION,)
+    assert await db.fetchall("SELECT * FROM user_cards ORDER BY 1, 2") == before
+
+
+async def test_inventory_collages_are_dropped_when_the_inventory_changes(database):
+    await database.execute("INSERT INTO user_wallet (user_id, inventory_version) VALUES (5, 1), (55, 1)")
+    for key in ("inv:5:0", "inv:5:1", "inv:55:0", "card:5"):
+        await database.execute("INSERT INTO media_cache VALUES (?, 'v1.1', 'file')", (key,))
+
+    await database.execute("UPDATE user_wallet SET total_pulls = 3 WHERE user_id = 5")
+    assert len(await database.fetchall("SELECT * FROM media_cache")) == 4
+
+    await database.execute("UPDATE user_wallet SET inventory_version = inventory_version + 1 WHERE user_id = 5")
+    assert await database.fetchall("SELECT media_key FROM media_cache ORDER BY 1") == [("card:5",), ("inv:55:0",)]
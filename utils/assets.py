@@ -0,0 +1,29 @@
+# utils/assets.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from utils.image_cache import get_card_image, load_image
+
+ASSET_IO_WORKERS = getattr(config, "ASSET_IO_WORKERS", 8)
+
+# Pool limitado só para I/O de arquivos, para nunca bloquear o event loop
+_pool = ThreadPoolExecutor(max_workers=ASSET_IO_WORKERS, thread_name_prefix="assets-io")
+
+
+async def run_io(fn, *args):
+    """Executa uma função bloqueante de arquivo no pool de I/O."""
+    return await asyncio.get_running_loop().run_in_executor(_pool, fn, *args)
+
+
+async def read_card_image(tipo: str, series: str, filename: str) -> bytes:
+    return await run_io(get_card_image, tipo, series, filename)
+
+
+async def read_file(path) -> bytes:
+    return await run_io(load_image, str(path))
+
+
+def shutdown_io():
+    _pool.shutdown(wait=True)
+
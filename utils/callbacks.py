@@ -0,0 +1,82 @@
+# utils/callbacks.py
+"""
+Protocolo compacto e sem estado para o callback_data dos botões.
+
+Formato: "<versão>.<op>.<n1>.<n2>..." só com inteiros, por exemplo
+"1.s.42.10" (série 42, 10 pulls). Tudo o que o handler precisa vai no próprio
+botão, então nada depende de context.user_data: funciona depois de um restart
+e com várias instâncias do bot. Trocar o formato = subir CALLBACK_VERSION;
+botões de versões antigas caem no handler de "botão expirado".
+
+O roteador mapeia cada op para exatamente um handler com um dict (O(1)) e é
+registrado como o único CallbackQueryHandler da aplicação.
+"""
+import inspect
+
+from utils.metrics import instrument_handler
+
+CALLBACK_VERSION = "1"
+MAX_CALLBACK_BYTES = 64  # limite do Telegram
+
+# ---------- ops ---------- #
+OP_CATEGORIA = "c"       # (id da categoria, quantidade)
+OP_PAGINA_SERIES = "p"   # (id da categoria, página, quantidade)
+OP_SERIE = "s"           # (id da série, quantidade)
+OP_INVENTARIO = "i"      # (1 = próxima / 0 = anterior, página, cursor)
+OP_COLECAO = "l"         # (1 = próxima / 0 = anterior, página, cursor = id da série)
+
+
+def encode(op: str, *args: int) -> str:
+    data = ".".join((CALLBACK_VERSION, op, *(str(int(a)) for a in args)))
+    if len(data.encode()) > MAX_CALLBACK_BYTES:
+        raise ValueError(f"callback_data com mais de {MAX_CALLBACK_BYTES} bytes: {data!r}")
+    return data
+
+
+def decode(data: str):
+    """(op, args) ou None se for de outra versão ou estiver malformado."""
+    parts = (data or "").split(".")
+    if len(parts) < 2 or parts[0] != CALLBACK_VERSION:
+        return None
+    try:
+        args = tuple(int(p) for p in parts[2:])
+    except ValueError:
+        return None
+    return parts[1], args
+
+
+class CallbackRouter:
+    def __init__(self):
+        self._routes: dict[str, tuple] = {}  # op -> (handler, nº de argumentos)
+        self._fallback = None
+
+    def route(self, op: str):
+        """Decorador: `async def handler(update, context, *args)` para a op."""
+        def decorator(func):
+            if op in self._routes:
+                raise ValueError(f"op de callback '{op}' já registrada")
+            arity = len(inspect.signature(func).parameters) - 2
+            # Cada rota é medida com o próprio nome no /stats
+            self._routes[op] = (instrument_handler(func), arity)
+            return func
+        return decorator
+
+    def fallback(self, func):
+        """Handler para callbacks de versões antigas, malformados ou de ops desconhecidas."""
+        self._fallback = instrument_handler(func)
+        return func
+
+    async def dispatch(self, update, context):
+        parsed = decode(update.callback_query.data)
+        route = self._routes.get(parsed[0]) if parsed else None
+        if route is None or len(parsed[1]) != route[1]:
+            if self._fallback is not None:
+                await self._fallback(update, context)
+            return
+        await route[0](update, context, *parsed[1])
+
+    # As rotas já são instrumentadas individualmente
+    dispatch.instrumented = True
+
+
+router = CallbackRouter()
@@ -0,0 +1,104 @@
+# utils/collage.py
+"""
+Colagem do /inventario: uma grade com as miniaturas das cartas da página.
+
+A montagem (decodificar as miniaturas do atlas, colar e gerar o JPEG) roda
+num ProcessPoolExecutor, fora do event loop e sem disputar o GIL com o bot.
+O resultado não é guardado aqui: quem envia grava o file_id do Telegram por
+(usuário, página) com a versão do inventário (ver utils/media_cache.py).
+"""
+import asyncio
+import threading
+import time
+
+import config
+from config import CARDS_DIR
+from database.catalog import catalog
+from utils import thumbnails
+from utils.assets import run_io
+from utils.thumbnails import thumbnail_atlas, render_collage
+
+COLLAGE_ENABLED = getattr(config, "INVENTORY_COLLAGE", True)
+COLLAGE_COLUMNS = getattr(config, "COLLAGE_COLUMNS", 5)
+COLLAGE_WORKERS = getattr(config, "COLLAGE_WORKERS", 2)
+# Geração do atlas em segundo plano: poucos processos e prioridade baixa
+ATLAS_WORKERS = getattr(config, "ATLAS_WORKERS", 1)
+ATLAS_NICE = 10
+
+_pool = None
+_build_cancel = threading.Event()
+_stats = {"renders": 0, "render_seconds": 0.0, "atlas_builds": 0}
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # Importado aqui: multiprocessing pesa no boot e só é preciso na primeira colagem
+        from concurrent.futures import ProcessPoolExecutor
+        _pool = ProcessPoolExecutor(max_workers=COLLAGE_WORKERS)
+    return _pool
+
+
+async def collage_available() -> bool:
+    # O atlas confere (e relê) o index.json: stat e leitura ficam no pool de I/O
+    return COLLAGE_ENABLED and await run_io(thumbnail_atlas.available)
+
+
+def collage_version() -> int:
+    """Geração do atlas atual: junto com a versão do inventário, forma a chave do cache."""
+    return thumbnail_atlas.generation
+
+
+async def render_inventory_page(cartas) -> bytes:
+    """JPEG da grade para as linhas (card_id, nome, quantidade) de uma página do inventário."""
+    rels = []
+    for card_id, _, _ in cartas:
+        location = catalog.card_location(card_id)
+        rels.append("/".join(location) if location else "")
+    atlas_file, _, entries = await run_io(thumbnail_atlas.locate, rels)
+    cells = [(entry, f"#{card_id}  x{qty}") for entry, (card_id, _, qty) in zip(entries, cartas)]
+
+    started = time.perf_counter()
+    data = await asyncio.get_running_loop().run_in_executor(
+        _get_pool(), render_collage, atlas_file, cells, COLLAGE_COLUMNS
+    )
+    _stats["renders"] += 1
+    _stats["render_seconds"] += time.perf_counter() - started
+    return data
+
+
+async def build_atlas() -> dict:
+    """Atualiza o atlas de miniaturas numa thread, com processos de baixa prioridade."""
+    _build_cancel.clear()
+    try:
+        summary = await asyncio.to_thread(
+            thumbnails.build, CARDS_DIR, workers=ATLAS_WORKERS, nice=ATLAS_NICE, cancel=_build_cancel
+        )
+    except asyncio.CancelledError:
+        _build_cancel.set()  # a thread não é cancelável: avisa para ela parar
+        raise
+    _stats["atlas_builds"] += 1
+    if summary["rewritten"]:
+        print(
+            f"🧩 Atlas de miniaturas: {summary['generated']} geradas, {summary['reused']} reaproveitadas, "
+            f"{summary['errors']} erros ({summary['seconds']}s)"
+        )
+    return summary
+
+
+def collage_stats() -> dict:
+    renders = _stats["renders"]
+    return {
+        "renders": renders,
+        "avg_render_ms": round(_stats["render_seconds"] / renders * 1000, 1) if renders else 0,
+        "atlas_builds": _stats["atlas_builds"],
+        **thumbnail_atlas.stats(),
+    }
+
+
+def shutdown_pool():
+    global _pool
+    _build_cancel.set()
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
@@ -0,0 +1,68 @@
+# utils/concurrency.py
+import asyncio
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processa updates de usuários diferentes em paralelo, mas os de um mesmo
+    usuário em ordem de chegada (um lock por usuário). Assim user_cards e
+    context.user_data nunca são mexidos por dois updates do mesmo usuário ao
+    mesmo tempo.
+
+    `max_concurrent` limita quantos handlers rodam de fato ao mesmo tempo.
+    O semáforo do PTB (`max_pending`) só limita quantos updates podem estar
+    em voo, contando os que esperam na fila do próprio usuário; por isso um
+    usuário que dispara vários comandos não ocupa as vagas de execução dos outros.
+    """
+
+    def __init__(self, max_concurrent: int, max_pending: int = None):
+        super().__init__(max_pending or max_concurrent * 16)
+        self._running = asyncio.BoundedSemaphore(max_concurrent)
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._users_waiting: dict[int, int] = {}
+
+    @staticmethod
+    def _key(update):
+        if isinstance(update, Update):
+            if update.effective_user:
+                return update.effective_user.id
+            if update.effective_chat:
+                return update.effective_chat.id
+        return None
+
+    async def do_process_update(self, update, coroutine):
+        key = self._key(update)
+        if key is None:
+            async with self._running:
+                await coroutine
+            return
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._users_waiting[key] = self._users_waiting.get(key, 0) + 1
+        try:
+            async with lock:
+                async with self._running:
+                    await coroutine
+        finally:
+            # Remove o lock quando não há mais updates desse usuário, para o dict não crescer
+            self._users_waiting[key] -= 1
+            if not self._users_waiting[key]:
+                del self._users_waiting[key]
+                del self._locks[key]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.current_concurrent_updates,
+            "users_with_pending": len(self._locks),
+        }
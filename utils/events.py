@@ -0,0 +1,60 @@
+# utils/events.py
+"""
+Eventos dentro do processo.
+
+Quem guarda em memória algo derivado do catálogo (índice de sorteio, caches
+de imagem e de hash, rankings, teclados) assina CATALOG_CHANGED; quem muda o
+catálogo por fora da sincronização (comandos de admin) emite um único evento
+depois do commit, com o que foi afetado.
+"""
+import inspect
+from collections import defaultdict
+from dataclasses import dataclass
+
+CATALOG_CHANGED = "catalog_changed"
+
+
+@dataclass(frozen=True)
+class CatalogChange:
+    """O que uma operação mudou no catálogo (já gravado no banco)."""
+
+    reason: str
+    card_ids: frozenset = frozenset()
+    series_ids: frozenset = frozenset()
+    user_ids: frozenset = frozenset()
+    # Arquivos das cartas que saíram: cópias em cache deles não servem mais
+    paths: tuple = ()
+
+
+class EventBus:
+    def __init__(self):
+        self._subscribers: dict[str, list] = defaultdict(list)
+        self.emitted: dict[str, int] = defaultdict(int)
+        self.failures = 0
+
+    def subscribe(self, event: str, handler):
+        """`handler(payload)` pode ser função comum ou corrotina; roda na ordem de inscrição."""
+        self._subscribers[event].append(handler)
+        return handler
+
+    async def emit(self, event: str, payload=None):
+        """Chama todos os inscritos; a falha de um é logada e não impede os outros."""
+        self.emitted[event] += 1
+        for handler in list(self._subscribers.get(event, ())):
+            try:
+                result = handler(payload)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                self.failures += 1
+                print(f"❌ Falha ao tratar o evento {event} em {getattr(handler, '__qualname__', handler)}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": {event: len(handlers) for event, handlers in self._subscribers.items()},
+            "emitted": dict(self.emitted),
+            "failures": self.failures,
+        }
+
+
+events = EventBus()
@@ -20,3 +20,15 @@ def formatar_categoria(nome: str) -> str:
 
 def formatar_card(filename: str) -> str:
     return Path(filename).stem.replace("_", " ").title()
+
+
+RARIDADE_LABELS = {
+    "comum": "Comum",
+    "incomum": "Incomum",
+    "rara": "⭐ Rara",
+    "epica": "💎 Épica",
+    "lendaria": "👑 Lendária",
+}
+
+def formatar_raridade(raridade: str) -> str:
+    return RARIDADE_LABELS.get(raridade) or raridade.replace("_", " ").title()
@@ -1,41 +1,177 @@
 # utils/image_cache.py
-from functools import lru_cache
+import asyncio
+import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from config import CARDS_DIR
-from PIL import Image
-from io import BytesIO
-from config import IMAGE_QUALITY
-import os
+import config
+from database.catalog import catalog
+from database.queries import get_popular_card_ids
+from utils.events import CATALOG_CHANGED, events
+from utils.optimize_assets import optimized_assets
+
+# Orçamento de memória do cache, em bytes (padrão: 64 MiB)
+IMAGE_CACHE_BYTES = getattr(config, "IMAGE_CACHE_BYTES", 64 * 1024 * 1024)
+# Quantas das cartas mais puxadas pré-carregar no boot (0 desativa)
+IMAGE_WARMUP_CARDS = getattr(config, "IMAGE_WARMUP_CARDS", 200)
+WARMUP_BATCH = 50
+
+
+class ImageCache:
+    """
+    Cache LRU de imagens limitado pelo total de bytes, não por número de itens.
+
+    A chave é (caminho, mtime_ns): se o arquivo for editado a versão antiga
+    deixa de ser usada e é descartada na próxima leitura.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[tuple[str, int], bytes] = OrderedDict()
+        self._versions: dict[str, int] = {}  # caminho -> mtime_ns em cache
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path) -> bytes:
+        path = str(path)
+        mtime_ns = os.stat(path).st_mtime_ns
+        key = (path, mtime_ns)
+
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+
+        with open(path, "rb") as f:
+            data = f.read()
+        self._put(key, data)
+        return data
+
+    def _put(self, key, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        path, mtime_ns = key
+        with self._lock:
+            old = self._versions.get(path)
+            if old is not None:
+                self._drop((path, old))
+            self._entries[key] = data
+            self._versions[path] = mtime_ns
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def _drop(self, key):
+        data = self._entries.pop(key, None)
+        if data is not None:
+            self.size -= len(data)
+            if self._versions.get(key[0]) == key[1]:
+                del self._versions[key[0]]
 
+    def invalidate(self, path):
+        with self._lock:
+            mtime_ns = self._versions.get(str(path))
+            if mtime_ns is not None:
+                self._drop((str(path), mtime_ns))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self.size = 0
+
+    def warmup(self, paths, fraction: float = 0.5) -> int:
+        """
+        Pré-carrega os caminhos na ordem dada (mais populares primeiro) até
+        ocupar `fraction` do orçamento. Arquivos que não cabem são pulados.
+        Retorna quantos foram carregados.
+        """
+        budget = int(self.max_bytes * fraction)
+        loaded = 0
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if self.size + st.st_size > budget:
+                continue
+            key = (str(path), st.st_mtime_ns)
+            with self._lock:
+                if key in self._entries:
+                    continue
+            with open(path, "rb") as f:
+                self._put(key, f.read())
+            loaded += 1
+        return loaded
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+image_cache = ImageCache(IMAGE_CACHE_BYTES)
+
+
+def _drop_changed_cards(change):
+    # Cartas removidas/mescladas: libera o espaço delas (e das versões otimizadas) no cache
+    for path in change.paths:
+        image_cache.invalidate(path)
+        rel = os.path.relpath(os.path.abspath(path), optimized_assets.root).replace(os.sep, "/")
+        optimized = optimized_assets.path_for(rel)
+        if optimized:
+            image_cache.invalidate(optimized)
+
+
+events.subscribe(CATALOG_CHANGED, _drop_changed_cards)
 
 
-@lru_cache(maxsize=100)  # Cache para 100 imagens
 def load_image(image_path: str) -> bytes:
     """Carrega a imagem em memória com cache"""
-    with open(image_path, 'rb') as f:
-        return f.read()
-    
-@lru_cache(maxsize=100)
-def load_optimized_image(image_path: str) -> BytesIO:
-    """Otimiza imagens convertendo para JPG"""
-    with Image.open(image_path) as img:
-        # Converte para RGB (necessário para JPG)
-        if img.mode in ('RGBA', 'P'):
-            img = img.convert('RGB')
-            
-        # Redimensiona se necessário (opcional)
-        if max(img.size) > 1024:
-            img.thumbnail((1024, 1024))
-            
-        buffer = BytesIO()
-        # Altere para JPEG e ajuste a qualidade
-        img.save(buffer, format='JPEG', quality=IMAGE_QUALITY)
-        buffer.seek(0)
-        return buffer  
+    return image_cache.get(image_path)
 
 def get_card_image(tipo: str, series: str, filename: str) -> bytes:
     # tipo pode ser: "animes", "series", "jogos"
     path = Path(CARDS_DIR) / tipo / series / filename
-    with path.open("rb") as f:
-        return f.read()
+    # Usa a versão pré-otimizada (python -m utils.optimize_assets) quando existir
+    optimized = optimized_assets.lookup(path, os.stat(path))
+    return image_cache.get(optimized or path)
+
+
+async def warmup_popular_cards(limit: int = IMAGE_WARMUP_CARDS, progress=None) -> int:
+    """
+    Pré-carrega no cache as cartas mais puxadas, sem bloquear o event loop.
 
+    Lê em lotes de WARMUP_BATCH: entre um lote e outro o aquecimento pode ser
+    cancelado e `progress(feitos, total)` é chamado, se passado.
+    """
+    if limit <= 0:
+        return 0
+    paths = []
+    for card_id in await get_popular_card_ids(limit):
+        location = catalog.card_location(card_id)
+        if location and location[0]:
+            paths.append(Path(CARDS_DIR).joinpath(*location))
+    loaded = 0
+    for i in range(0, len(paths), WARMUP_BATCH):
+        loaded += await asyncio.to_thread(image_cache.warmup, paths[i:i + WARMUP_BATCH])
+        if progress:
+            progress(min(i + WARMUP_BATCH, len(paths)), len(paths))
+    print(f"🖼️ Cache de imagens aquecido: {loaded} cartas, {image_cache.size / 1024 / 1024:.1f} MiB")
+    return loaded
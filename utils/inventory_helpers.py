@@ -1,6 +1,7 @@
 # utils/inventory_helpers.py
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from config import ITEMS_PER_PAGE
+from utils.callbacks import encode, OP_INVENTARIO
 
 def formatar_inventario_texto(cartas, page, total):
     linhas = []
@@ -11,14 +12,30 @@ def formatar_inventario_texto(cartas, page, total):
     texto += f"\n\nPágina {page + 1} de {(total + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE}"
     return texto
 
-def montar_teclado_paginacao(page, total):
+def barra_progresso(feitos, total, largura=10):
+    cheios = round(largura * feitos / total) if total else 0
+    return "▰" * cheios + "▱" * (largura - cheios)
+
+def formatar_colecao_texto(series, page, total):
+    linhas = ["📚 Sua coleção por série\n"]
+    for _, nome, distintas, copias, tamanho in series:
+        pct = distintas * 100 // tamanho if tamanho else 0
+        completa = " ✅" if tamanho and distintas >= tamanho else ""
+        linhas.append(f"{nome}{completa}\n{barra_progresso(distintas, tamanho)} {distintas}/{tamanho} ({pct}%) · {copias} cópias")
+
+    texto = "\n".join(linhas)
+    texto += f"\n\nPágina {page + 1} de {(total + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE}"
+    return texto
+
+def montar_teclado_paginacao(page, total, itens, op=OP_INVENTARIO):
+    # O cursor vai no callback: id do primeiro/último item da página (carta ou série)
     max_page = (total - 1) // ITEMS_PER_PAGE
     buttons = []
 
-    if page > 0:
-        buttons.append(InlineKeyboardButton("⬅️ Voltar", callback_data=f"inv_prev_{page}"))
-    if page < max_page:
-        buttons.append(InlineKeyboardButton("➡️ Avançar", callback_data=f"inv_next_{page}"))
+    if page > 0 and itens:
+        buttons.append(InlineKeyboardButton("⬅️ Voltar", callback_data=encode(op, 0, page, itens[0][0])))
+    if page < max_page and itens:
+        buttons.append(InlineKeyboardButton("➡️ Avançar", callback_data=encode(op, 1, page, itens[-1][0])))
 
     if buttons:
         return InlineKeyboardMarkup([buttons])
@@ -0,0 +1,170 @@
+# utils/media_cache.py
+import asyncio
+import hashlib
+import os
+
+from telegram import InputMediaPhoto
+from telegram.error import BadRequest
+
+from database.queries import (
+    get_media_file_id,
+    get_media_file_ids,
+    save_media_file_id,
+    save_media_file_ids,
+    delete_media_file_id,
+)
+from utils.assets import run_io, read_file
+from utils.events import CATALOG_CHANGED, events
+
+# path -> (mtime_ns, size, sha1) para não reler o arquivo a cada envio
+_hash_cache: dict[str, tuple[int, int, str]] = {}
+
+# métricas de envio (expostas em /stats)
+_stats = {"uploads": 0, "upload_bytes": 0, "file_id_hits": 0, "file_id_rejected": 0}
+
+
+def media_stats() -> dict:
+    return dict(_stats)
+
+
+def file_hash(path) -> str:
+    """Hash do conteúdo do arquivo, recalculado só quando mtime/tamanho mudam."""
+    path = str(path)
+    st = os.stat(path)
+    cached = _hash_cache.get(path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _hash_cache[path] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+
+def _forget_hashes(change):
+    # Os file_ids das cartas saem do banco na própria transação; aqui só os hashes em memória
+    for path in change.paths:
+        _hash_cache.pop(path, None)
+
+
+events.subscribe(CATALOG_CHANGED, _forget_hashes)
+
+
+def card_media_key(card_id: int) -> str:
+    return f"card:{card_id}"
+
+
+def inventory_media_key(user_id: int, page: int) -> str:
+    # Formato usado também pelo trigger da migração 9, que apaga as páginas quando o inventário muda
+    return f"inv:{user_id}:{page}"
+
+
+async def _send_cached(send, field: str, media_key: str, path, load_bytes, **kwargs):
+    """
+    Envia a mídia reaproveitando o file_id do Telegram quando possível.
+    Se o file_id for rejeitado, apaga do cache e faz o upload dos bytes.
+    `load_bytes` é uma corrotina sem argumentos que devolve o conteúdo.
+    """
+    content_hash = await run_io(file_hash, path)
+    return await _send_with_hash(send, field, media_key, content_hash, load_bytes, **kwargs)
+
+
+async def _send_with_hash(send, field: str, media_key: str, content_hash: str, load_bytes, **kwargs):
+    file_id = await get_media_file_id(media_key, content_hash)
+
+    if file_id:
+        try:
+            message = await send(**{field: file_id}, **kwargs)
+            _stats["file_id_hits"] += 1
+            return message
+        except BadRequest as e:
+            print(f"[MEDIA] file_id rejeitado para {media_key}: {e}")
+            _stats["file_id_rejected"] += 1
+            await delete_media_file_id(media_key)
+
+    data = await load_bytes()
+    message = await send(**{field: data}, **kwargs)
+    _stats["uploads"] += 1
+    _stats["upload_bytes"] += len(data)
+
+    media = getattr(message, field, None)
+    if isinstance(media, (tuple, list)):  # photo vem em vários tamanhos
+        media = media[-1] if media else None
+    if media is not None:
+        await save_media_file_id(media_key, content_hash, media.file_id)
+    return message
+
+
+async def send_photo_cached(chat, media_key: str, path, load_bytes, **kwargs):
+    """reply_photo com cache de file_id."""
+    return await _send_cached(chat.reply_photo, "photo", media_key, path, load_bytes, **kwargs)
+
+
+async def send_photo_versioned(send, media_key: str, version, render, **kwargs):
+    """
+    Foto gerada na hora (ex.: colagem do inventário): o file_id vale enquanto
+    `version` não mudar, e só então `render()` é chamada. `send` recebe
+    photo=... e os kwargs (reply_photo ou uma edição de mensagem).
+    """
+    return await _send_with_hash(send, "photo", media_key, f"v{version}", render, **kwargs)
+
+
+async def send_animation_cached(chat, media_key: str, path, **kwargs):
+    """reply_animation com cache de file_id."""
+    return await _send_cached(
+        chat.reply_animation, "animation", media_key, path, lambda: read_file(path), **kwargs
+    )
+
+
+async def send_media_group_cached(chat, items, caption: str = None):
+    """
+    Álbum de fotos (até 10) com cache de file_id, num único sendMediaGroup.
+
+    `items` é uma lista de (media_key, path, load_bytes). Os file_ids de todas
+    as fotos são buscados numa query só; as que não têm file_id válido vão como
+    upload e têm o file_id gravado depois, também numa transação só. Se o
+    Telegram rejeitar algum file_id, o álbum é reenviado todo por upload.
+    """
+    hashes = await asyncio.gather(*(run_io(file_hash, path) for _, path, _ in items))
+    key_hashes = {key: h for (key, _, _), h in zip(items, hashes)}
+    cached = await get_media_file_ids(key_hashes)
+
+    async def build(use_cache: bool):
+        media, uploaded = [], []
+        for i, (key, _, load_bytes) in enumerate(items):
+            file_id = cached.get(key) if use_cache else None
+            if file_id is None:
+                data = await load_bytes()
+                uploaded.append((i, len(data)))
+                file_id = data
+            media.append(InputMediaPhoto(file_id, caption=caption if i == 0 else None))
+        return media, uploaded
+
+    media, uploaded = await build(use_cache=True)
+    try:
+        messages = await chat.reply_media_group(media)
+    except BadRequest as e:
+        if len(uploaded) == len(items):
+            raise
+        print(f"[MEDIA] file_id rejeitado no álbum: {e}")
+        _stats["file_id_rejected"] += 1
+        cached.clear()
+        media, uploaded = await build(use_cache=False)
+        messages = await chat.reply_media_group(media)
+
+    _stats["file_id_hits"] += len(items) - len(uploaded)
+    _stats["uploads"] += len(uploaded)
+    _stats["upload_bytes"] += sum(size for _, size in uploaded)
+
+    rows = {}
+    for i, _ in uploaded:
+        photo = messages[i].photo if i < len(messages) else None
+        if photo:
+            key = items[i][0]
+            rows[key] = (key, key_hashes[key], photo[-1].file_id)
+    if rows:
+        await save_media_file_ids(list(rows.values()))
+    return messages
@@ -0,0 +1,256 @@
+# utils/metrics.py
+"""
+Instrumentação do caminho quente, barata o bastante para ficar ligada em produção.
+
+Cada handler registrado e cada função de database/queries.py alimenta um
+histograma de latência com buckets fixos (um bisect e três somas por chamada).
+Um contextvar conta quantas idas ao banco cada update fez. Os dados aparecem no
+/stats e, se METRICS_PORT estiver no config.py, num endpoint HTTP no formato
+texto do Prometheus.
+"""
+import asyncio
+import contextvars
+import functools
+import time
+from bisect import bisect_left
+
+import config
+
+# Endpoint Prometheus opcional (None desativa)
+METRICS_PORT = getattr(config, "METRICS_PORT", None)
+METRICS_HOST = getattr(config, "METRICS_HOST", "127.0.0.1")
+
+# Limites superiores dos buckets; o bucket +Inf é implícito
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROUNDTRIP_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 32)
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "count", "sum", "errors")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+
+    def observe(self, value: float, error: bool = False):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimativa por interpolação dentro do bucket, como o histogram_quantile do Prometheus."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i == len(self.bounds):  # caiu no +Inf
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+    def summary(self, scale: float = 1000.0) -> dict:
+        """count, média, p50, p99 (em ms por padrão) e erros."""
+        return {
+            "count": self.count,
+            "avg": round(self.sum / self.count * scale, 2) if self.count else 0,
+            "p50": round(self.quantile(0.50) * scale, 2),
+            "p99": round(self.quantile(0.99) * scale, 2),
+            "errors": self.errors,
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.handlers: dict[str, Histogram] = {}
+        self.queries: dict[str, Histogram] = {}
+        self.roundtrips = Histogram(ROUNDTRIP_BUCKETS)
+        self.started_at = time.time()
+        # Marcos do boot em segundos desde boot_started (main.py ajusta para o início do processo)
+        self.boot_started = time.perf_counter()
+        self.boot: dict[str, float] = {}
+
+    @staticmethod
+    def _observe(table: dict, name: str, seconds: float, error: bool):
+        hist = table.get(name)
+        if hist is None:
+            hist = table[name] = Histogram(LATENCY_BUCKETS)
+        hist.observe(seconds, error)
+
+    def observe_handler(self, name: str, seconds: float, error: bool = False):
+        self._observe(self.handlers, name, seconds, error)
+        if "first_response" not in self.boot:
+            self.mark_boot("first_response")
+
+    def observe_query(self, name: str, seconds: float, error: bool = False):
+        self._observe(self.queries, name, seconds, error)
+
+    def mark_boot(self, stage: str) -> float:
+        """Registra (e loga) quanto tempo após o início do processo o boot chegou em `stage`."""
+        elapsed = self.boot[stage] = round(time.perf_counter() - self.boot_started, 3)
+        print(f"⏱️ Boot: {stage} em {elapsed:.2f}s")
+        return elapsed
+
+    def snapshot(self) -> dict:
+        return {
+            "uptime_seconds": round(time.time() - self.started_at),
+            "boot_seconds": dict(self.boot),
+            "handlers": {name: h.summary() for name, h in sorted(self.handlers.items())},
+            "queries": {name: h.summary() for name, h in sorted(self.queries.items())},
+            "db_roundtrips_per_update": self.roundtrips.summary(scale=1),
+        }
+
+
+metrics = Metrics()
+
+# Contador de idas ao banco do update em andamento (None fora de um handler)
+_roundtrips: contextvars.ContextVar[list | None] = contextvars.ContextVar("db_roundtrips", default=None)
+
+
+def count_roundtrip():
+    """Chamado pela camada de banco a cada consulta ou transação."""
+    counter = _roundtrips.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+# ---------- decoradores ---------- #
+def instrument_handler(callback, name: str = None):
+    """Envolve um callback do PTB medindo latência, erros e idas ao banco do update."""
+    name = name or callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(update, context, *args):
+        counter = [0]
+        token = _roundtrips.set(counter)
+        started = time.perf_counter()
+        error = False
+        try:
+            return await callback(update, context, *args)
+        except Exception:
+            error = True
+            raise
+        finally:
+            metrics.observe_handler(name, time.perf_counter() - started, error)
+            metrics.roundtrips.observe(counter[0])
+            _roundtrips.reset(token)
+
+    wrapper.instrumented = True
+    return wrapper
+
+
+def instrument_handlers(app):
+    """Instrumenta todos os handlers já registrados na Application."""
+    for handlers in app.handlers.values():
+        for handler in handlers:
+            callback = getattr(handler, "callback", None)
+            if callback is not None and not getattr(callback, "instrumented", False):
+                handler.callback = instrument_handler(callback)
+
+
+def timed_query(func):
+    """Mede latência e erros de uma função assíncrona de acesso ao banco."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        error = False
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            metrics.observe_query(name, time.perf_counter() - started, error)
+
+    return wrapper
+
+
+# ---------- formato Prometheus ---------- #
+def _prom_histogram(lines: list, metric: str, label: str, table: dict):
+    lines.append(f"# TYPE {metric} histogram")
+    for name, hist in sorted(table.items()):
+        cumulative = 0
+        for bound, n in zip(hist.bounds + ("+Inf",), hist.counts):
+            cumulative += n
+            lines.append(f'{metric}_bucket{{{label}="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_sum{{{label}="{name}"}} {hist.sum}')
+        lines.append(f'{metric}_count{{{label}="{name}"}} {hist.count}')
+
+
+def _prom_gauges(lines: list, prefix: str, values: dict):
+    for key, value in values.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            _prom_gauges(lines, name, value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f"{name} {value}")
+
+
+def render_prometheus(gauges: dict = None) -> str:
+    lines = []
+    _prom_histogram(lines, "homucards_handler_seconds", "handler", metrics.handlers)
+    _prom_histogram(lines, "homucards_query_seconds", "query", metrics.queries)
+    _prom_histogram(lines, "homucards_update_db_roundtrips", "scope", {"update": metrics.roundtrips})
+    lines.append("# TYPE homucards_handler_errors_total counter")
+    for name, hist in sorted(metrics.handlers.items()):
+        lines.append(f'homucards_handler_errors_total{{handler="{name}"}} {hist.errors}')
+    lines.append("# TYPE homucards_query_errors_total counter")
+    for name, hist in sorted(metrics.queries.items()):
+        lines.append(f'homucards_query_errors_total{{query="{name}"}} {hist.errors}')
+    _prom_gauges(lines, "homucards", gauges or {})
+    return "\n".join(lines) + "\n"
+
+
+# ---------- endpoint HTTP ---------- #
+_server: asyncio.AbstractServer | None = None
+
+
+async def start_metrics_server(collect, port: int = METRICS_PORT, host: str = METRICS_HOST):
+    """
+    Serve GET /metrics. `collect` é uma função sem argumentos que devolve um
+    dict (aninhado) de valores numéricos, exportados como gauges.
+    """
+    global _server
+    if not port or _server is not None:
+        return
+
+    async def handle(reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode(errors="replace").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", render_prometheus(collect()).encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except Exception as e:
+            print(f"[METRICS] Erro ao responder: {e}")
+        finally:
+            writer.close()
+
+    _server = await asyncio.start_server(handle, host, port)
+    print(f"📈 Métricas Prometheus em http://{host}:{port}/metrics")
+
+
+async def stop_metrics_server():
+    global _server
+    if _server is not None:
+        _server.close()
+        await _server.wait_closed()
+        _server = None
@@ -0,0 +1,223 @@
+# utils/optimize_assets.py
+"""
+Pré-otimização das cartas (rodar fora do bot):
+
+    python -m utils.optimize_assets [--workers N] [--quality Q]
+
+Converte cada imagem de CARDS_DIR/<categoria>/<série>/ para um JPEG de no
+máximo 1024px, salvo em OPTIMIZED_DIR com o hash do original no nome. Só
+processa arquivos novos ou cujo conteúdo mudou. Em tempo de execução o bot
+envia a versão otimizada quando ela existe e ainda corresponde ao original.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+import config
+from config import CARDS_DIR, IMAGE_QUALITY
+from database.catalog_sync import scan_assets
+
+OPTIMIZED_DIR = getattr(config, "OPTIMIZED_DIR", os.path.join("cache", "optimized"))
+MANIFEST_FILE = os.path.join(OPTIMIZED_DIR, "manifest.json")
+MAX_SIDE = 1024
+# GIFs podem ser animados; convertê-los para JPEG perderia a animação
+OPTIMIZABLE_EXTS = (".png", ".jpg", ".jpeg")
+
+
+def _hash_file(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def optimize_file(src: str, out_dir: str, quality: int, known_hash: str | None = None) -> dict:
+    """Executado nos processos do pool: converte um arquivo e devolve os metadados."""
+    from PIL import Image
+
+    content_hash = _hash_file(src)
+    out_name = f"{content_hash}_q{quality}.jpg"
+    out_path = os.path.join(out_dir, out_name)
+    entry = {"hash": content_hash, "file": out_name, "size": os.path.getsize(src)}
+
+    if content_hash == known_hash and os.path.exists(out_path):
+        entry["skipped"] = True
+        return entry
+
+    started = time.perf_counter()
+    with Image.open(src) as img:
+        # Converte para RGB (necessário para JPG)
+        if img.mode in ("RGBA", "P", "LA"):
+            img = img.convert("RGB")
+        if max(img.size) > MAX_SIDE:
+            img.thumbnail((MAX_SIDE, MAX_SIDE))
+        tmp_path = out_path + ".tmp"
+        img.save(tmp_path, format="JPEG", quality=quality, optimize=True)
+    os.replace(tmp_path, out_path)
+
+    entry["optimized_size"] = os.path.getsize(out_path)
+    entry["encode_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return entry
+
+
+def build(root: str = CARDS_DIR, out_dir: str = OPTIMIZED_DIR, quality: int = IMAGE_QUALITY, workers=None) -> dict:
+    """Gera/atualiza as variantes otimizadas e o manifesto. Retorna um resumo."""
+    # Importados aqui: o bot só usa o lookup, e multiprocessing pesa no boot
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    started = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    old = _read_manifest(manifest_path)
+
+    found = {
+        rel: meta for rel, meta in scan_assets(root).items()
+        if rel.lower().endswith(OPTIMIZABLE_EXTS)
+    }
+    manifest = {}
+    pending = []
+    for rel, (_, _, _, mtime_ns, size) in found.items():
+        prev = old.get(rel)
+        if (
+            prev and prev.get("quality") == quality
+            and prev["mtime_ns"] == mtime_ns and prev["size"] == size
+            and os.path.exists(os.path.join(out_dir, prev["file"]))
+        ):
+            manifest[rel] = prev
+        else:
+            pending.append(rel)
+
+    summary = {"files": len(found), "converted": 0, "unchanged": len(found) - len(pending), "errors": 0}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                optimize_file, os.path.join(root, rel), out_dir, quality,
+                (old.get(rel) or {}).get("hash"),
+            ): rel
+            for rel in pending
+        }
+        for future in as_completed(futures):
+            rel = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                print(f"❌ Falha ao otimizar {rel}: {e}")
+                summary["errors"] += 1
+                continue
+            if entry.pop("skipped", False):
+                entry = {**old[rel], **entry}
+                summary["unchanged"] += 1
+            else:
+                summary["converted"] += 1
+            _, _, _, mtime_ns, _ = found[rel]
+            entry.update(mtime_ns=mtime_ns, quality=quality)
+            manifest[rel] = entry
+
+    # Remove variantes que nenhum original usa mais
+    used = {entry["file"] for entry in manifest.values()}
+    for name in os.listdir(out_dir):
+        if name.endswith(".jpg") and name not in used:
+            os.remove(os.path.join(out_dir, name))
+
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, manifest_path)
+
+    summary["bytes_original"] = sum(e["size"] for e in manifest.values())
+    summary["bytes_optimized"] = sum(min(e["optimized_size"], e["size"]) for e in manifest.values())
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    return summary
+
+
+def _read_manifest(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class OptimizedAssets:
+    """Consulta, em tempo de execução, qual variante otimizada serve cada original."""
+
+    def __init__(self, root: str = CARDS_DIR, out_dir: str = OPTIMIZED_DIR):
+        self.root = os.path.abspath(root)
+        self.out_dir = out_dir
+        self.manifest_path = os.path.join(out_dir, "manifest.json")
+        self._manifest: dict = {}
+        self._manifest_mtime = None
+        self._lock = threading.Lock()
+        self.served = 0
+        self.bytes_saved = 0
+        self.encode_ms_saved = 0.0
+
+    def _reload_if_changed(self):
+        try:
+            mtime_ns = os.stat(self.manifest_path).st_mtime_ns
+        except OSError:
+            self._manifest, self._manifest_mtime = {}, None
+            return
+        if mtime_ns != self._manifest_mtime:
+            self._manifest = _read_manifest(self.manifest_path)
+            self._manifest_mtime = mtime_ns
+            print(f"🗜️ Manifesto de imagens otimizadas carregado: {len(self._manifest)} arquivos")
+
+    def lookup(self, src_path, st: os.stat_result):
+        """Caminho da variante otimizada, ou None se não houver ou estiver desatualizada."""
+        with self._lock:
+            self._reload_if_changed()
+            if not self._manifest:
+                return None
+            rel = os.path.relpath(os.path.abspath(src_path), self.root).replace(os.sep, "/")
+            entry = self._manifest.get(rel)
+            if (
+                not entry or entry["mtime_ns"] != st.st_mtime_ns or entry["size"] != st.st_size
+                or entry["optimized_size"] >= entry["size"]
+            ):
+                return None
+            self.served += 1
+            self.bytes_saved += entry["size"] - entry["optimized_size"]
+            self.encode_ms_saved += entry.get("encode_ms", 0.0)
+        return os.path.join(self.out_dir, entry["file"])
+
+    def path_for(self, rel: str):
+        """Caminho da variante de `rel` no manifesto já carregado, sem conferir se está atualizada nem contar métricas."""
+        entry = self._manifest.get(rel)
+        return os.path.join(self.out_dir, entry["file"]) if entry else None
+
+    def stats(self) -> dict:
+        return {
+            "served": self.served,
+            "bytes_saved": self.bytes_saved,
+            "encode_ms_saved": round(self.encode_ms_saved, 1),
+        }
+
+
+optimized_assets = OptimizedAssets()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gera versões otimizadas das cartas.")
+    parser.add_argument("--workers", type=int, default=None, help="processos (padrão: nº de CPUs)")
+    parser.add_argument("--quality", type=int, default=IMAGE_QUALITY)
+    parser.add_argument("--out", default=OPTIMIZED_DIR)
+    args = parser.parse_args()
+
+    summary = build(out_dir=args.out, quality=args.quality, workers=args.workers)
+    saved = summary["bytes_original"] - summary["bytes_optimized"]
+    print(
+        f"✅ {summary['converted']} convertidas, {summary['unchanged']} sem mudança, "
+        f"{summary['errors']} erros em {summary['seconds']}s | "
+        f"{summary['bytes_original'] / 1024 / 1024:.1f} MiB -> "
+        f"{summary['bytes_optimized'] / 1024 / 1024:.1f} MiB ({saved / 1024 / 1024:.1f} MiB a menos)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+# utils/permissions.py
+import functools
+
+import config
+
+# IDs do Telegram com acesso aos comandos administrativos
+ADMIN_IDS = frozenset(getattr(config, "ADMIN_IDS", ()))
+
+
+def is_admin(user_id: int) -> bool:
+    return user_id in ADMIN_IDS
+
+
+def admin_only(handler):
+    """Decorador de handler: quem não é admin recebe um aviso e o handler não roda."""
+
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        user = update.effective_user
+        if user is None or not is_admin(user.id):
+            if update.effective_message:
+                await update.effective_message.reply_text("⛔ Comando restrito aos administradores.")
+            return
+        return await handler(update, context)
+
+    return wrapper
@@ -0,0 +1,165 @@
+# utils/quota.py
+import time
+from datetime import datetime, timezone
+
+import config
+from database.queries import get_quota_row, save_quota_rows
+
+PULLS_POR_HORA = getattr(config, "PULLS_POR_HORA", 10)
+PULLS_POR_DIA = getattr(config, "PULLS_POR_DIA", 50)
+# Token bucket contra rajadas: até PULL_BURST pedidos seguidos, 1 ficha a cada PULL_REFILL_SECONDS.
+# Um multi-pull (/pull N) gasta uma ficha só; as janelas de hora/dia contam os N pulls.
+PULL_BURST = getattr(config, "PULL_BURST", 3)
+PULL_REFILL_SECONDS = getattr(config, "PULL_REFILL_SECONDS", 5)
+
+HOUR = 3600
+DAY = 86400
+# Estados limpos sem uso há mais que isso saem da memória (recarregam do banco se voltarem)
+IDLE_EVICT_SECONDS = 2 * HOUR
+
+
+def _to_ts(value) -> float:
+    if not value:
+        return 0.0
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _to_iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+class QuotaState:
+    __slots__ = ("hour_start", "hour_count", "day_start", "day_count", "tokens", "refilled_at", "seen_at", "dirty")
+
+    def __init__(self, hour_start, hour_count, day_start, day_count, now):
+        self.hour_start = hour_start
+        self.hour_count = hour_count
+        self.day_start = day_start
+        self.day_count = day_count
+        self.tokens = float(PULL_BURST)
+        self.refilled_at = now
+        self.seen_at = now
+        self.dirty = False
+
+    def roll(self, now: float):
+        """Abre novas janelas de hora/dia e repõe fichas do bucket."""
+        hour_start = now - now % HOUR
+        if self.hour_start != hour_start:
+            self.hour_start, self.hour_count = hour_start, 0
+        day_start = now - now % DAY
+        if self.day_start != day_start:
+            self.day_start, self.day_count = day_start, 0
+
+        self.tokens = min(PULL_BURST, self.tokens + (now - self.refilled_at) / PULL_REFILL_SECONDS)
+        self.refilled_at = now
+        self.seen_at = now
+
+    def blocked(self, now: float, n: int):
+        """Mensagem explicando o bloqueio, ou None se `n` pulls cabem agora."""
+        if self.day_count + n > PULLS_POR_DIA:
+            wait = self.day_start + DAY - now
+            return f"⏳ Limite diário de {PULLS_POR_DIA} pulls atingido. Volte em {wait / 3600:.0f}h."
+        if self.hour_count + n > PULLS_POR_HORA:
+            wait = self.hour_start + HOUR - now
+            return f"⏳ Limite de {PULLS_POR_HORA} pulls por hora atingido. Tente em {wait / 60:.0f} min."
+        if self.tokens < 1:
+            wait = (1 - self.tokens) * PULL_REFILL_SECONDS
+            return f"🐢 Calma! Espere {wait:.0f}s antes do próximo pull."
+        return None
+
+
+class QuotaEngine:
+    """
+    Cotas de pull por hora, por dia e anti-rajada, todas checadas em memória.
+
+    O estado de cada usuário é lido de user_wallet só no primeiro comando
+    depois de um restart; as mudanças são gravadas em lote por flush(),
+    chamado periodicamente pelo agendador (Tasks/scheduler.py).
+    """
+
+    def __init__(self):
+        self._states: dict[int, QuotaState] = {}
+        self.blocked_count = 0
+
+    async def _state(self, user_id: int, now: float) -> QuotaState:
+        state = self._states.get(user_id)
+        if state is None:
+            row = await get_quota_row(user_id)
+            state = self._states.get(user_id)  # outro comando pode ter carregado enquanto esperávamos
+            if state is None:
+                if row:
+                    last_h, count_h, last_d, count_d = row
+                    state = QuotaState(_to_ts(last_h), count_h, _to_ts(last_d), count_d, now)
+                else:
+                    state = QuotaState(0.0, 0, 0.0, 0, now)
+                self._states[user_id] = state
+        state.roll(now)
+        return state
+
+    async def check(self, user_id: int, n: int = 1):
+        """Só verifica. Retorna a mensagem de bloqueio ou None."""
+        now = time.time()
+        motivo = (await self._state(user_id, now)).blocked(now, n)
+        if motivo:
+            self.blocked_count += 1
+        return motivo
+
+    async def consume(self, user_id: int, n: int = 1):
+        """Verifica e, se permitido, desconta `n` pulls. Retorna a mensagem de bloqueio ou None."""
+        now = time.time()
+        state = await self._state(user_id, now)
+        motivo = state.blocked(now, n)
+        if motivo:
+            self.blocked_count += 1
+            return motivo
+        state.hour_count += n
+        state.day_count += n
+        state.tokens -= 1
+        state.dirty = True
+        return None
+
+    def refund(self, user_id: int, n: int = 1):
+        """Devolve pulls que não chegaram a sortear carta (ex.: série inexistente)."""
+        state = self._states.get(user_id)
+        if state is None:
+            return
+        state.hour_count = max(0, state.hour_count - n)
+        state.day_count = max(0, state.day_count - n)
+        state.tokens = min(PULL_BURST, state.tokens + 1)
+        state.dirty = True
+
+    async def flush(self) -> int:
+        """Grava os estados alterados em user_wallet numa única transação."""
+        dirty = [(uid, st) for uid, st in self._states.items() if st.dirty]
+        if dirty:
+            for _, st in dirty:
+                st.dirty = False
+            rows = [
+                (uid, _to_iso(st.hour_start), st.hour_count, _to_iso(st.day_start), st.day_count)
+                for uid, st in dirty
+            ]
+            try:
+                await save_quota_rows(rows)
+            except Exception:
+                for _, st in dirty:
+                    st.dirty = True
+                raise
+
+        limite = time.time() - IDLE_EVICT_SECONDS
+        for uid in [uid for uid, st in self._states.items() if not st.dirty and st.seen_at < limite]:
+            del self._states[uid]
+        return len(dirty)
+
+    async def stop(self):
+        """Grava o que estiver pendente antes de desligar."""
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "users_in_memory": len(self._states),
+            "dirty": sum(1 for st in self._states.values() if st.dirty),
+            "blocked": self.blocked_count,
+        }
+
+
+quota = QuotaEngine()
@@ -0,0 +1,256 @@
+# utils/thumbnails.py
+"""
+Atlas de miniaturas das cartas, usado nas colagens do /inventario:
+
+    python -m utils.thumbnails [--workers N]
+
+Cada carta de CARDS_DIR vira um JPEG pequeno de tamanho fixo (THUMB_SIZE), e
+todos ficam concatenados num único arquivo atlas-<geração>.bin em THUMB_DIR.
+O index.json diz o offset/tamanho de cada miniatura, então montar uma
+colagem é um pread por carta, sem abrir nem redimensionar o original.
+
+A geração é incremental: miniaturas de arquivos com mesmo mtime/tamanho são
+copiadas do atlas anterior e só as novas ou alteradas são geradas, em
+paralelo num ProcessPoolExecutor. O bot também regenera o atlas em segundo
+plano depois de cada sincronização do catálogo.
+"""
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import CancelledError
+
+import config
+from config import CARDS_DIR
+from database.catalog_sync import scan_assets
+
+THUMB_DIR = getattr(config, "THUMB_DIR", os.path.join("cache", "thumbs"))
+THUMB_SIZE = (160, 224)  # proporção de carta (5:7)
+THUMB_QUALITY = 80
+LABEL_HEIGHT = 26
+BACKGROUND = (30, 30, 36)
+INDEX_NAME = "index.json"
+
+
+# ---------- executado nos processos do pool ---------- #
+def make_thumbnail(src: str) -> bytes:
+    """Miniatura JPEG de THUMB_SIZE com a carta inteira centralizada (sem cortar)."""
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as img:
+        img.seek(0)  # GIF: primeiro quadro
+        img = img.convert("RGBA")
+        fitted = ImageOps.contain(img, THUMB_SIZE)
+    canvas = Image.new("RGB", THUMB_SIZE, BACKGROUND)
+    offset = ((THUMB_SIZE[0] - fitted.width) // 2, (THUMB_SIZE[1] - fitted.height) // 2)
+    canvas.paste(fitted, offset, fitted)
+    out = io.BytesIO()
+    canvas.save(out, format="JPEG", quality=THUMB_QUALITY)
+    return out.getvalue()
+
+
+def render_collage(atlas_file: str, cells, columns: int, quality: int = 85) -> bytes:
+    """
+    Monta a grade de miniaturas. `cells` é uma lista de ((offset, tamanho) ou
+    None, legenda); cartas sem miniatura viram um quadro vazio com a legenda.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    w, h = THUMB_SIZE
+    cell_h = h + LABEL_HEIGHT
+    rows = max(1, -(-len(cells) // columns))
+    cols = min(columns, max(1, len(cells)))
+    sheet = Image.new("RGB", (cols * w, rows * cell_h), BACKGROUND)
+    draw = ImageDraw.Draw(sheet)
+    font = ImageFont.load_default(size=16)
+
+    fd = os.open(atlas_file, os.O_RDONLY)
+    try:
+        for i, (entry, label) in enumerate(cells):
+            x, y = (i % cols) * w, (i // cols) * cell_h
+            if entry is not None:
+                offset, length = entry
+                with Image.open(io.BytesIO(os.pread(fd, length, offset))) as thumb:
+                    sheet.paste(thumb, (x, y))
+            else:
+                draw.rectangle((x + 4, y + 4, x + w - 5, y + h - 5), outline=(90, 90, 100), width=2)
+            draw.text((x + w // 2, y + h + LABEL_HEIGHT // 2), label, fill=(235, 235, 240), font=font, anchor="mm")
+    finally:
+        os.close(fd)
+
+    out = io.BytesIO()
+    sheet.save(out, format="JPEG", quality=quality)
+    return out.getvalue()
+
+
+# ---------- geração do atlas ---------- #
+def _read_index(out_dir: str) -> dict:
+    try:
+        with open(os.path.join(out_dir, INDEX_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def build(root: str = CARDS_DIR, out_dir: str = THUMB_DIR, workers=None, nice: int = 0, cancel=None) -> dict:
+    """
+    Gera/atualiza o atlas e o índice. Retorna um resumo.
+
+    `nice` baixa a prioridade dos processos do pool (o bot gera o atlas em
+    segundo plano sem disputar CPU com os handlers) e `cancel`, um
+    threading.Event, interrompe a geração entre uma miniatura e outra.
+    """
+    started = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    index = _read_index(out_dir)
+    old_file = os.path.join(out_dir, index["file"]) if index.get("file") else None
+    old_cards = index.get("cards", {}) if index.get("cell") == list(THUMB_SIZE) else {}
+    if old_file and not os.path.exists(old_file):
+        old_cards = {}
+
+    found = scan_assets(root)
+    reused, pending = {}, []
+    for rel, (_, _, _, mtime_ns, size) in found.items():
+        prev = old_cards.get(rel)
+        if prev and prev[2] == mtime_ns and prev[3] == size:
+            reused[rel] = prev
+        else:
+            pending.append(rel)
+
+    summary = {"cards": len(found), "generated": 0, "reused": len(reused), "errors": 0, "rewritten": False}
+    if not pending and len(reused) == len(old_cards):
+        summary["seconds"] = round(time.perf_counter() - started, 2)
+        return summary
+
+    thumbs = {}
+    if pending:
+        # Importado aqui: o bot só usa o lookup, e multiprocessing pesa no boot
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=os.nice if nice else None, initargs=(nice,) if nice else ()
+        )
+        try:
+            futures = {rel: pool.submit(make_thumbnail, os.path.join(root, rel)) for rel in pending}
+            for rel, future in futures.items():
+                if cancel is not None and cancel.is_set():
+                    raise CancelledError()  # abandona sem gravar nada
+                try:
+                    thumbs[rel] = future.result()
+                except Exception as e:
+                    print(f"❌ Falha ao gerar miniatura de {rel}: {e}")
+                    summary["errors"] += 1
+        finally:
+            pool.shutdown(cancel_futures=True)
+    summary["generated"] = len(thumbs)
+
+    # Novo atlas com outro nome: colagens em andamento continuam lendo o anterior
+    generation = index.get("generation", 0) + 1
+    name = f"atlas-{generation}.bin"
+    cards = {}
+    with open(os.path.join(out_dir, name), "wb") as out:
+        old = open(old_file, "rb") if reused else None
+        try:
+            for rel in sorted(found):
+                if rel in thumbs:
+                    data = thumbs[rel]
+                elif rel in reused:
+                    offset, length = reused[rel][:2]
+                    old.seek(offset)
+                    data = old.read(length)
+                else:
+                    continue
+                _, _, _, mtime_ns, size = found[rel]
+                cards[rel] = [out.tell(), len(data), mtime_ns, size]
+                out.write(data)
+        finally:
+            if old:
+                old.close()
+
+    tmp = os.path.join(out_dir, INDEX_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"generation": generation, "file": name, "cell": list(THUMB_SIZE), "cards": cards}, f)
+    os.replace(tmp, os.path.join(out_dir, INDEX_NAME))
+
+    # Mantém a geração anterior (pode estar sendo lida agora) e apaga as mais velhas
+    keep = {name, index.get("file")}
+    for entry in os.listdir(out_dir):
+        if entry.startswith("atlas-") and entry.endswith(".bin") and entry not in keep:
+            os.remove(os.path.join(out_dir, entry))
+
+    summary["rewritten"] = True
+    summary["bytes"] = sum(length for _, length, _, _ in cards.values())
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    return summary
+
+
+class ThumbnailAtlas:
+    """
+    Consulta, em tempo de execução, onde está a miniatura de cada carta.
+    available() e locate() fazem stat (e às vezes leem) o index.json: no bot,
+    são chamados pelo pool de I/O (utils.assets.run_io), nunca no event loop.
+    """
+
+    def __init__(self, out_dir: str = THUMB_DIR):
+        self.out_dir = out_dir
+        self.index_path = os.path.join(out_dir, INDEX_NAME)
+        self.file_path = None
+        self.generation = 0  # muda a cada atlas novo; entra na chave do cache das colagens
+        self._cards: dict = {}
+        self._index_mtime = None
+        self._lock = threading.Lock()
+
+    def _reload_if_changed(self):
+        try:
+            mtime_ns = os.stat(self.index_path).st_mtime_ns
+        except OSError:
+            self._cards, self.file_path, self._index_mtime, self.generation = {}, None, None, 0
+            return
+        if mtime_ns != self._index_mtime:
+            index = _read_index(self.out_dir)
+            self._index_mtime = mtime_ns
+            if index.get("cell") != list(THUMB_SIZE) or not index.get("file"):
+                self._cards, self.file_path = {}, None
+                return
+            self._cards = index["cards"]
+            self.file_path = os.path.join(self.out_dir, index["file"])
+            self.generation = index.get("generation", 0)
+            print(f"🧩 Atlas de miniaturas carregado: {len(self._cards)} cartas")
+
+    def available(self) -> bool:
+        with self._lock:
+            self._reload_if_changed()
+            return bool(self._cards)
+
+    def locate(self, rels):
+        """(arquivo do atlas, geração, [(offset, tamanho) ou None por carta]), lidos do mesmo índice."""
+        with self._lock:
+            self._reload_if_changed()
+            entries = [self._cards.get(rel) for rel in rels]
+            return self.file_path, self.generation, [(e[0], e[1]) if e else None for e in entries]
+
+    def stats(self) -> dict:
+        return {"cards": len(self._cards), "generation": self.generation}
+
+
+thumbnail_atlas = ThumbnailAtlas()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gera o atlas de miniaturas das cartas.")
+    parser.add_argument("--workers", type=int, default=None, help="processos (padrão: nº de CPUs)")
+    parser.add_argument("--out", default=THUMB_DIR)
+    args = parser.parse_args()
+
+    summary = build(out_dir=args.out, workers=args.workers)
+    print(
+        f"✅ {summary['generated']} miniaturas geradas, {summary['reused']} reaproveitadas, "
+        f"{summary['errors']} erros em {summary['seconds']}s"
+    )
+
+
+if __name__ == "__main__":
+    main()